@@ -1,13 +1,19 @@
 import os
+import time
+import hashlib
+import threading
 import httpx
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from models import TokenData, User, UserCreate
-from database import engine
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from http_client import get_http_client
+from jwks import google_jwks, microsoft_jwks
 import msal
 
 # JWT Configuration
@@ -15,6 +21,13 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Verified tokens kept in memory so each one is only decoded once
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# Let the first user and emails on ADMIN_EMAILS create their own admin account
+# on first login; otherwise accounts are only created by an administrator
+ALLOW_ADMIN_SIGNUP = os.getenv("ALLOW_ADMIN_SIGNUP", "false").lower() == "true"
+
 # Google OAuth Configuration - using existing env var names
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
@@ -23,8 +36,55 @@ GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 MICROSOFT_CLIENT_ID = os.getenv("MICROSOFT_CLIENT_ID")
 MICROSOFT_CLIENT_SECRET = os.getenv("MICROSOFT_CLIENT_SECRET")
 MICROSOFT_TENANT_ID = os.getenv("MICROSOFT_TENANT_ID", "common")
+MICROSOFT_GRAPH_ME_URL = os.getenv("MICROSOFT_GRAPH_ME_URL", "https://graph.microsoft.com/v1.0/me")
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+class TokenCache:
+    """Bounded LRU of verified tokens, keyed by token digest
+
+    Entries are dropped once the token's exp has passed, so a cached
+    token is never accepted for longer than it would be when decoded.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[TokenData]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token_data, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token_data
+
+    def set(self, token: str, token_data: TokenData, expires_at: float):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (token_data, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
@@ -38,8 +98,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> TokenData:
-    """Verify JWT token and return token data"""
+def decode_token(token: str):
+    """Decode and verify a JWT; returns (TokenData, exp timestamp)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -56,12 +116,22 @@ def verify_token(token: str) -> TokenData:
             raise credentials_exception
         
         token_data = TokenData(email=email, user_id=user_id, role=role)
-        return token_data
+        # Tokens without exp are never cached
+        return token_data, payload.get("exp") or 0
     except JWTError:
         raise credentials_exception
 
+def verify_token(token: str) -> TokenData:
+    """Verify JWT token and return token data, using the token cache"""
+    token_data = token_cache.get(token)
+    if token_data is None:
+        token_data, expires_at = decode_token(token)
+        if expires_at > time.time():
+            token_cache.set(token, token_data, expires_at)
+    return token_data
+
 async def verify_google_token(id_token: str) -> dict:
-    """Verify Google ID token and return user info"""
+    """Verify Google ID token locally against Google's signing keys and return user info"""
     if not GOOGLE_CLIENT_ID:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -69,35 +139,45 @@ async def verify_google_token(id_token: str) -> dict:
         )
     
     try:
-        # Verify the token with Google
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://oauth2.googleapis.com/tokeninfo?id_token={id_token}"
-            )
-            response.raise_for_status()
-            token_info = response.json()
-            
-            # Verify the token is for our app
-            if token_info.get("aud") != GOOGLE_CLIENT_ID:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token audience"
-                )
-            
-            return {
-                "email": token_info.get("email"),
-                "name": token_info.get("name"),
-                "picture": token_info.get("picture"),
-                "email_verified": token_info.get("email_verified", False)
-            }
-    except httpx.HTTPStatusError as e:
+        # Checks signature, expiry, audience (our client id) and issuer
+        token_info = await google_jwks.decode(id_token, audience=GOOGLE_CLIENT_ID, issuer=GOOGLE_ISSUERS)
+    except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid Google token"
         )
+    except httpx.HTTPError as e:
+        print(f"🔐 Could not fetch Google signing keys: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Google sign-in temporarily unavailable"
+        )
+    
+    return {
+        "email": token_info.get("email"),
+        "name": token_info.get("name"),
+        "picture": token_info.get("picture"),
+        "email_verified": token_info.get("email_verified", False)
+    }
+
+async def verify_microsoft_id_token(id_token: str) -> dict:
+    """Verify a Microsoft ID token locally and return its claims"""
+    claims = await microsoft_jwks.decode(id_token, audience=MICROSOFT_CLIENT_ID)
+    
+    # With the multi-tenant endpoints the issuer depends on the user's tenant
+    tenant_id = claims.get("tid")
+    if claims.get("iss") != f"https://login.microsoftonline.com/{tenant_id}/v2.0":
+        raise JWTError("Invalid issuer")
+    if MICROSOFT_TENANT_ID not in ("common", "organizations", "consumers") and tenant_id != MICROSOFT_TENANT_ID:
+        raise JWTError("Token is from another tenant")
+    return claims
 
 async def verify_microsoft_token(access_token: str, id_token: str) -> dict:
-    """Verify Microsoft access token and ID token and return user info"""
+    """Verify Microsoft ID token and return user info
+
+    The ID token is verified locally. Graph is only called when the token
+    carries no email claim.
+    """
     if not MICROSOFT_CLIENT_ID:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -107,19 +187,18 @@ async def verify_microsoft_token(access_token: str, id_token: str) -> dict:
     try:
         print(f"🔐 Verifying Microsoft token for client ID: {MICROSOFT_CLIENT_ID}")
         
-        # Verify the access token with Microsoft Graph API
-        async with httpx.AsyncClient() as client:
-            headers = {
-                'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
-            }
-            
-            print("🔐 Making request to Microsoft Graph API...")
-            
-            # Get user info from Microsoft Graph
-            response = await client.get(
-                'https://graph.microsoft.com/v1.0/me',
-                headers=headers
+        claims = await verify_microsoft_id_token(id_token)
+        name = claims.get("name", "Unknown User")
+        email = claims.get("email") or claims.get("preferred_username")
+        
+        if not email:
+            print("🔐 No email in ID token, asking Microsoft Graph...")
+            response = await get_http_client().get(
+                MICROSOFT_GRAPH_ME_URL,
+                headers={
+                    'Authorization': f'Bearer {access_token}',
+                    'Content-Type': 'application/json'
+                }
             )
             
             print(f"🔐 Microsoft Graph response status: {response.status_code}")
@@ -131,33 +210,36 @@ async def verify_microsoft_token(access_token: str, id_token: str) -> dict:
                     detail=f"Microsoft Graph API error: {response.status_code}"
                 )
             
-            response.raise_for_status()
             user_info = response.json()
-            
-            print(f"🔐 Microsoft user info: {user_info}")
-            
-            # For now, we'll trust the access token verification
-            # In production, you should properly verify the ID token
-            
             email = user_info.get("mail") or user_info.get("userPrincipalName")
-            if not email:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email not found in Microsoft user info"
-                )
-            
-            return {
-                "email": email,
-                "name": user_info.get("displayName", "Unknown User"),
-                "picture": None,  # Microsoft Graph doesn't provide profile picture in basic endpoint
-                "email_verified": True  # Assume verified for Microsoft accounts
-            }
-    except httpx.HTTPStatusError as e:
-        print(f"🔐 HTTP error during Microsoft token verification: {e}")
+            name = user_info.get("displayName", name)
+        
+        if not email:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email not found in Microsoft user info"
+            )
+        
+        return {
+            "email": email,
+            "name": name,
+            "picture": None,  # Microsoft Graph doesn't provide profile picture in basic endpoint
+            "email_verified": True  # Assume verified for Microsoft accounts
+        }
+    except HTTPException:
+        raise
+    except JWTError as e:
+        print(f"🔐 Invalid Microsoft ID token: {e}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid Microsoft token: {str(e)}"
         )
+    except httpx.HTTPError as e:
+        print(f"🔐 HTTP error during Microsoft token verification: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Microsoft sign-in temporarily unavailable"
+        )
     except Exception as e:
         print(f"🔐 Unexpected error during Microsoft token verification: {e}")
         raise HTTPException(
@@ -165,11 +247,20 @@ async def verify_microsoft_token(access_token: str, id_token: str) -> dict:
             detail=f"Error verifying Microsoft token: {str(e)}"
         )
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenData:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenData:
     """Get current user from JWT token"""
     return verify_token(credentials.credentials)
 
-def require_admin(current_user: TokenData = Depends(get_current_user)):
+async def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)) -> Optional[TokenData]:
+    """Get current user if a valid bearer token is present, otherwise None"""
+    if credentials is None:
+        return None
+    try:
+        return verify_token(credentials.credentials)
+    except HTTPException:
+        return None
+
+async def require_admin(current_user: TokenData = Depends(get_current_user)):
     """Require admin role for endpoint access"""
     if current_user.role != "admin":
         raise HTTPException(
@@ -178,80 +269,88 @@ def require_admin(current_user: TokenData = Depends(get_current_user)):
         )
     return current_user
 
-async def get_or_create_user(user_info: dict) -> User:
-    """Get existing user or create new user"""
+# List of admin emails (you can add your email here)
+ADMIN_EMAILS = [
+    "chinmaydhamapurkar25@gmail.com",  # Your email
+    "admin@realestatecrm.com",
+    "chinmay@zero2one.ai"
+]
+
+# Serializes admin sign-ups while the users table may still be empty
+FIRST_USER_LOCK_ID = 74232002
+
+# Set once a users row has been seen; the table does not go back to empty
+_users_exist = False
+
+# Refreshes last_login of an existing user
+LOGIN_QUERY = """
+    UPDATE users SET last_login = NOW()
+    WHERE email = :email
+    RETURNING *
+"""
+
+# Used with ALLOW_ADMIN_SIGNUP: LOGIN_QUERY, creating the user when they may sign up
+SIGNUP_LOGIN_QUERY = """
+    WITH existing AS (
+        UPDATE users SET last_login = NOW()
+        WHERE email = :email
+        RETURNING *
+    ), created AS (
+        INSERT INTO users (email, name, role, profile_picture, created_at, last_login)
+        SELECT :email, :name, 'admin', :picture, NOW(), NOW()
+        WHERE NOT EXISTS (SELECT 1 FROM existing)
+          AND (:is_admin_email OR NOT EXISTS (SELECT 1 FROM users))  -- First user becomes admin
+        -- A concurrent first login of the same admin email
+        ON CONFLICT (email) DO UPDATE SET last_login = NOW()
+        RETURNING *
+    )
+    SELECT * FROM existing
+    UNION ALL
+    SELECT * FROM created
+"""
+
+async def get_or_create_user(conn: AsyncConnection, user_info: dict) -> Optional[User]:
+    """Log a user in with a single statement; None when they have no account
+
+    Existing users get last_login refreshed. Accounts are otherwise
+    created by an administrator; only with ALLOW_ADMIN_SIGNUP can the
+    very first user and emails on the admin list sign up, both as admin.
+    Runs on the caller's connection; the caller commits.
+    """
+    global _users_exist
     email = user_info["email"]
     
-    # Check if user exists
-    with engine.begin() as conn:
-        result = conn.execute(
-            text("SELECT * FROM users WHERE email = :email"),
-            {"email": email}
-        ).fetchone()
+    if not ALLOW_ADMIN_SIGNUP:
+        result = (await conn.execute(text(LOGIN_QUERY), {"email": email})).fetchone()
+    else:
+        if not _users_exist:
+            # Until the first user exists, concurrent signups take turns so only
+            # one of them can see an empty table. The lock is held until commit.
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": FIRST_USER_LOCK_ID})
         
-        if result:
-            # Update last login
-            conn.execute(
-                text("UPDATE users SET last_login = NOW() WHERE email = :email"),
-                {"email": email}
-            )
-            
-            return User(
-                user_id=result.user_id,
-                email=result.email,
-                name=result.name,
-                role=result.role,
-                profile_picture=result.profile_picture,
-                created_at=result.created_at,
-                last_login=datetime.utcnow()
-            )
-        else:
-            # Determine initial role based on email or domain
-            initial_role = determine_initial_role(email)
-            
-            # Create new user
-            result = conn.execute(
-                text("""
-                    INSERT INTO users (email, name, role, profile_picture, created_at, last_login)
-                    VALUES (:email, :name, :role, :picture, NOW(), NOW())
-                    RETURNING *
-                """),
-                {
-                    "email": email,
-                    "name": user_info["name"],
-                    "role": initial_role,
-                    "picture": user_info.get("picture")
-                }
-            ).fetchone()
-            
-            return User(
-                user_id=result.user_id,
-                email=result.email,
-                name=result.name,
-                role=result.role,
-                profile_picture=result.profile_picture,
-                created_at=result.created_at,
-                last_login=result.last_login
-            )
-
-def determine_initial_role(email: str) -> str:
-    """Determine initial role based on email or domain"""
-    # List of admin emails (you can add your email here)
-    admin_emails = [
-        "chinmaydhamapurkar25@gmail.com",  # Your email
-        "admin@realestatecrm.com",
-        "chinmay@zero2one.ai"
-    ]
-    
-    # Check if email is in admin list
-    if email.lower() in [admin.lower() for admin in admin_emails]:
-        return "admin"
-    
-    # Check if it's the first user (make them admin)
-    with engine.begin() as conn:
-        user_count = conn.execute(text("SELECT COUNT(*) FROM users")).fetchone()[0]
-        if user_count == 0:
-            return "admin"  # First user becomes admin
+        result = (await conn.execute(
+            text(SIGNUP_LOGIN_QUERY),
+            {
+                "email": email,
+                "name": user_info["name"],
+                "is_admin_email": is_admin_email(email),
+                "picture": user_info.get("picture")
+            }
+        )).fetchone()
+    if result is None:
+        return None
+    _users_exist = True
     
-    # Default to agent for all other users
-    return "agent" 
\ No newline at end of file
+    return User(
+        user_id=result.user_id,
+        email=result.email,
+        name=result.name,
+        role=result.role,
+        profile_picture=result.profile_picture,
+        created_at=result.created_at,
+        last_login=result.last_login
+    )
+
+def is_admin_email(email: str) -> bool:
+    """Whether email is on the admin list"""
+    return email.lower() in [admin.lower() for admin in ADMIN_EMAILS]
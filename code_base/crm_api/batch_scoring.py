@@ -0,0 +1,141 @@
+import os
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from scoring_config import ScoringConfig, get_scoring_config
+
+# Leads scored and written back per transaction
+BATCH_SCORE_CHUNK_ROWS = int(os.getenv('BATCH_SCORE_CHUNK_ROWS', '50000'))
+
+LEAD_CHUNK_QUERY = """
+    SELECT
+        l.lead_id,
+        u.display_name as customer_name,
+        l.user_id as email,
+        l.lead_comments,
+        l.created_date,
+        l.lead_score,
+        l.score_version
+    FROM lead_info l
+    LEFT JOIN user_basic_info u ON l.user_id = u.email_id
+    WHERE l.lead_id > :after {version_filter}
+    ORDER BY l.lead_id
+    LIMIT :limit
+"""
+
+# The separators of str.split(), spelled out so re and pyarrow's re2 agree
+_WHITESPACE = "\t\n\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000"
+TWO_WORDS = f"[^{_WHITESPACE}][{_WHITESPACE}]+[^{_WHITESPACE}]"
+
+def _text_column(values: pd.Series) -> pd.Series:
+    return values.fillna('').astype(str)
+
+def lead_chunk_query(stale_only=False) -> str:
+    return LEAD_CHUNK_QUERY.format(
+        version_filter="AND l.score_version IS DISTINCT FROM :version" if stale_only else ""
+    )
+
+def _free_mail(emails: pd.Series, config: ScoringConfig) -> np.ndarray:
+    # Few distinct emails per chunk, so apply the exact domain rule to each once
+    codes, uniques = pd.factorize(emails)
+    free = np.array(
+        [email.split('@')[-1].lower() in config.free_mail_domains for email in uniques], dtype=bool
+    )
+    return free[codes] if len(uniques) else np.zeros(len(emails), dtype=bool)
+
+def interaction_bonus(counts: pd.DataFrame, config: ScoringConfig) -> pd.Series:
+    """Interaction points per email from (email, action_type) rows with a positive count
+
+    Like calculate_lead_score over fetch_interaction_counts, every action
+    type the visitor has done counts once, whatever its count.
+    """
+    if counts.empty:
+        return pd.Series(dtype='int64')
+    weights = counts['action_type'].map(config.action_points).fillna(0).astype('int64')
+    return weights.groupby(counts['email'].to_numpy()).sum()
+
+def score_frame(leads: pd.DataFrame, bonus: pd.Series, config: ScoringConfig) -> np.ndarray:
+    """Vectorized calculate_lead_score over a frame of leads
+
+    leads needs email, customer_name, lead_comments and created_date
+    columns; bonus is interaction_bonus() for (at least) their emails.
+    """
+    comments = _text_column(leads['lead_comments'])
+    emails = _text_column(leads['email'])
+    names = _text_column(leads['customer_name'])
+
+    message_length = comments.str.len().to_numpy()
+    message_table = np.array(config.message_table, dtype='int64')
+    message_points = message_table[np.minimum(message_length, len(message_table) - 1)]
+
+    has_email = (emails != '').to_numpy()
+    email_points = np.where(
+        has_email, np.where(_free_mail(emails, config), config.free_mail, config.business_email), 0
+    )
+
+    name_points = np.where(names.str.contains(TWO_WORDS, regex=True).to_numpy(), config.full_name, 0)
+    date_points = np.where(leads['created_date'].notna().to_numpy(), config.created_date, 0)
+
+    interaction_points = np.where(
+        has_email, emails.map(bonus).fillna(0).to_numpy(dtype='int64'), 0
+    )
+
+    score = config.base + message_points + email_points + name_points + date_points + interaction_points
+    return np.minimum(score, config.max_score).astype('int64')
+
+def load_interaction_bonus(conn, config: ScoringConfig) -> pd.Series:
+    """interaction_bonus() for every email in interaction_counts"""
+    counts = pd.read_sql(text("""
+        SELECT email, action_type
+        FROM interaction_counts
+        WHERE email IS NOT NULL AND interaction_count > 0
+    """), conn)
+    return interaction_bonus(counts, config)
+
+def write_score_chunk(conn, lead_ids, scores, version):
+    """Write scores for a chunk of leads in one UPDATE, skipping unchanged ones"""
+    result = conn.execute(text("""
+        UPDATE lead_info AS l
+        SET lead_score = v.score, score_version = :version
+        FROM unnest(CAST(:lead_ids AS INTEGER[]), CAST(:scores AS INTEGER[])) AS v(lead_id, score)
+        WHERE l.lead_id = v.lead_id
+          AND (l.lead_score IS DISTINCT FROM v.score OR l.score_version IS DISTINCT FROM :version)
+    """), {"lead_ids": [int(i) for i in lead_ids], "scores": [int(s) for s in scores], "version": version})
+    return result.rowcount
+
+def batch_rescore_leads(engine, chunk_rows: int = BATCH_SCORE_CHUNK_ROWS, dry_run=False, stale_only=False,
+                        progress=None):
+    """Rescore every lead, committing one keyset chunk at a time
+
+    With stale_only, only leads whose score_version is not the current
+    weights version are read. Returns (leads scored, rows changed); a
+    row changes when its score or its version differs. With dry_run the
+    changes are counted but not written.
+    """
+    config = get_scoring_config()
+    with engine.connect() as conn:
+        bonus = load_interaction_bonus(conn, config)
+
+    query = text(lead_chunk_query(stale_only))
+    scored = changed = 0
+    after = 0
+    while True:
+        with engine.begin() as conn:
+            leads = pd.read_sql(query, conn, params={"after": after, "limit": chunk_rows, "version": config.version})
+            if leads.empty:
+                break
+
+            scores = score_frame(leads, bonus, config)
+            stale = (
+                (leads['lead_score'].to_numpy(dtype='float64', na_value=np.nan) != scores)
+                | (leads['score_version'] != config.version).to_numpy()
+            )
+            if not dry_run and stale.any():
+                write_score_chunk(conn, leads['lead_id'].to_numpy()[stale], scores[stale], config.version)
+
+        scored += len(leads)
+        changed += int(stale.sum())
+        after = int(leads['lead_id'].iloc[-1])
+        if progress:
+            progress(scored, changed)
+    return scored, changed
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+API Benchmark Harness
+Seeds a throwaway Postgres database with production-sized data, replays a
+mixed traffic profile against the API and reports throughput and
+p50/p95/p99 latency per endpoint as JSON, so runs can be diffed between
+commits.
+
+Point the API at a dedicated database with CLOUD_POSTGRES_DB (seeding
+truncates every table it fills):
+    export CLOUD_POSTGRES_DB=crm_bench
+    python bench_api.py seed [--scale 1.0] [--create]
+    python bench_api.py run [--duration 60] [--concurrency 20] [--url URL] [--output FILE]
+    python bench_api.py compare base.json head.json [--threshold 10]
+
+Without --url, run starts its own uvicorn server against the same database.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import statistics
+import subprocess
+from datetime import datetime, timezone
+import httpx
+from sqlalchemy import create_engine, text
+from database import engine, POSTGRES_DB
+from migrations import migrate
+from lead_scoring import rebuild_interaction_counts
+from auth_utils import create_access_token
+from load_test_enquiry import percentile
+
+# Row counts at --scale 1.0
+SEED_VOLUMES = {
+    "agents": 500,
+    "properties": 100_000,
+    "customers": 200_000,
+    "leads": 1_000_000,
+    "interactions": 10_000_000,
+}
+
+# user_interactions rows inserted per transaction
+INTERACTION_BATCH_ROWS = 1_000_000
+
+# Tables the API reads that predate migrations.py (only created if missing)
+LEGACY_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS user_basic_info (
+        email_id VARCHAR(255) PRIMARY KEY,
+        first_name VARCHAR(100),
+        last_name VARCHAR(100),
+        display_name VARCHAR(255)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS lead_info (
+        lead_id SERIAL PRIMARY KEY,
+        user_id VARCHAR(255),
+        price NUMERIC,
+        status VARCHAR(50) DEFAULT 'new',
+        category VARCHAR(50),
+        sub_category VARCHAR(50),
+        lead_scode VARCHAR(50),
+        lead_comments TEXT,
+        created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        property_interested VARCHAR(255),
+        assigned_agent_id INTEGER,
+        lead_score INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS lead_additional_info (
+        id SERIAL PRIMARY KEY,
+        lead_id INTEGER,
+        created_by VARCHAR(255),
+        created_date DATE,
+        created_time TIME,
+        source VARCHAR(50)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS property_info (
+        property_id INTEGER PRIMARY KEY,
+        label VARCHAR(255)
+    )
+    """,
+]
+
+AREAS = ["Downtown", "Uptown", "Midtown", "Riverside", "Suburbs", "Harbor", "Old Town", "Hills"]
+ACTIONS = [
+    "page_view", "property_view", "property_detail_view", "contact_click",
+    "enquiry_form_open", "enquiry_submitted", "phone_click", "email_click"
+]
+
+def _sql_array(values):
+    return "ARRAY[" + ", ".join(f"'{value}'" for value in values) + "]"
+
+def create_database():
+    """Create the benchmark database if it does not exist yet"""
+    server = engine.url.set(database="postgres")
+    admin_engine = create_engine(server, isolation_level="AUTOCOMMIT")
+    try:
+        with admin_engine.connect() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": POSTGRES_DB}
+            ).scalar()
+            if not exists:
+                print(f"📋 Creating database {POSTGRES_DB}...")
+                conn.execute(text(f'CREATE DATABASE "{POSTGRES_DB}"'))
+    finally:
+        admin_engine.dispose()
+
+def seed(scale=1.0, seed_value=0.42):
+    """Truncate and refill the benchmark tables; returns the row counts"""
+    volumes = {name: max(1, int(count * scale)) for name, count in SEED_VOLUMES.items()}
+    print(f"🔄 Seeding {POSTGRES_DB}: {volumes}")
+
+    with engine.begin() as conn:
+        for ddl in LEGACY_TABLES:
+            conn.execute(text(ddl))
+    migrate()
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text("""
+            TRUNCATE users, properties, property_info, user_basic_info, lead_info,
+                     lead_additional_info, user_interactions, interaction_counts
+            RESTART IDENTITY CASCADE
+        """))
+        # Same data on every run, so results stay comparable between commits
+        conn.execute(text("SELECT setseed(:seed)"), {"seed": seed_value})
+
+        print("📋 Users...")
+        conn.execute(text("""
+            INSERT INTO users (email, name, role, created_at, last_login)
+            VALUES ('bench-admin@bench.example', 'Bench Admin', 'admin', NOW(), NOW())
+        """))
+        conn.execute(text("""
+            INSERT INTO users (email, name, role, created_at, last_login)
+            SELECT 'agent' || g || '@bench.example', 'Agent ' || g, 'agent', NOW(), NOW()
+            FROM generate_series(1, :agents) g
+        """), volumes)
+        first_agent = conn.execute(text("SELECT MIN(user_id) FROM users WHERE role = 'agent'")).scalar()
+        params = dict(volumes, first_agent=first_agent)
+
+        print("📋 Properties...")
+        conn.execute(text(f"""
+            INSERT INTO properties (
+                label, description, address, area, beds, baths, price, property_type,
+                status, assigned_agent_id, created_by, created_at, updated_at
+            )
+            SELECT
+                'Bench Property ' || g,
+                'Seeded property ' || g,
+                g || ' Bench Street',
+                ({_sql_array(AREAS)})[1 + g % {len(AREAS)}],
+                1 + g % 5,
+                1 + g % 3,
+                (50000 + random() * 950000)::numeric(12,2),
+                (ARRAY['apartment', 'house', 'villa', 'penthouse', 'flat'])[1 + g % 5],
+                CASE g % 10 WHEN 0 THEN 'pending' WHEN 1 THEN 'sold' ELSE 'active' END,
+                :first_agent + g % :agents,
+                :first_agent + g % :agents,
+                created_at,
+                created_at
+            FROM (
+                SELECT g, NOW() - random() * INTERVAL '730 days' AS created_at
+                FROM generate_series(1, :properties) g
+            ) s
+        """), params)
+        conn.execute(text("""
+            INSERT INTO property_info (property_id, label)
+            SELECT property_id, label FROM properties
+        """))
+
+        print("📋 Customers...")
+        conn.execute(text("""
+            INSERT INTO user_basic_info (email_id, first_name, last_name, display_name)
+            SELECT 'customer' || g || '@bench.example', 'Customer', 'No' || g, 'Customer No' || g
+            FROM generate_series(1, :customers) g
+        """), params)
+
+        print("📋 Leads...")
+        conn.execute(text("""
+            INSERT INTO lead_info (
+                user_id, status, lead_comments, created_date, property_interested,
+                assigned_agent_id, lead_score
+            )
+            SELECT
+                'customer' || (1 + g % :customers) || '@bench.example',
+                CASE g % 5 WHEN 0 THEN 'contacted' WHEN 1 THEN 'qualified' ELSE 'new' END,
+                'Interested in viewing, please call back',
+                NOW() - random() * INTERVAL '730 days',
+                'Bench Property ' || (1 + g % :properties),
+                CASE WHEN g % 3 = 0 THEN NULL ELSE :first_agent + g % :agents END,
+                (random() * 100)::int
+            FROM generate_series(1, :leads) g
+        """), params)
+
+    print("📋 Interactions...")
+    for start in range(1, volumes["interactions"] + 1, INTERACTION_BATCH_ROWS):
+        end = min(start + INTERACTION_BATCH_ROWS - 1, volumes["interactions"])
+        with engine.begin() as conn:
+            conn.execute(text("SELECT setseed(:seed)"), {"seed": seed_value})
+            conn.execute(text(f"""
+                INSERT INTO user_interactions (
+                    session_id, action_type, page_url, property_id, email, user_agent,
+                    timestamp, engagement_score
+                )
+                SELECT
+                    md5((g / 20)::text),
+                    ({_sql_array(ACTIONS)})[1 + g % {len(ACTIONS)}],
+                    '/properties/' || (1 + g % :properties),
+                    (1 + g % :properties)::text,
+                    CASE WHEN g % 10 < 7 THEN 'customer' || (1 + g % :customers) || '@bench.example' END,
+                    'bench',
+                    NOW() - random() * INTERVAL '730 days',
+                    (random() * 30)::int
+                FROM generate_series(:start, :end) g
+            """), dict(params, start=start, end=end))
+        print(f"   {end:,} / {volumes['interactions']:,}")
+
+    with engine.begin() as conn:
+        print("📋 Interaction counts...")
+        rebuild_interaction_counts(conn)
+        conn.execute(text("REFRESH MATERIALIZED VIEW dashboard_stats"))
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+
+    print(f"🎉 Seeded in {time.perf_counter() - started:.0f}s")
+    return volumes
+
+def table_counts():
+    """Approximate row counts of the seeded tables"""
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT relname, reltuples::bigint AS estimate
+            FROM pg_class
+            WHERE relname IN ('users', 'properties', 'lead_info', 'user_basic_info', 'user_interactions')
+        """))
+        return {row.relname: row.estimate for row in rows}
+
+class TrafficMix:
+    """Builds randomized requests for each benchmarked endpoint"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        with engine.connect() as conn:
+            self.max_property_id = conn.execute(text("SELECT COALESCE(MAX(property_id), 1) FROM properties")).scalar()
+            self.customers = conn.execute(text("SELECT COUNT(*) FROM user_basic_info")).scalar() or 1
+            admin = conn.execute(text("SELECT user_id, email FROM users WHERE role = 'admin' LIMIT 1")).fetchone()
+            self.agents = conn.execute(text("SELECT user_id, email FROM users WHERE role = 'agent' LIMIT 50")).fetchall()
+        if admin is None or not self.agents:
+            raise SystemExit("❌ No admin/agent users found; run `python bench_api.py seed` first")
+        self.admin_headers = self._headers(admin, "admin")
+
+    def _headers(self, user, role):
+        token = create_access_token({"sub": user.email, "user_id": user.user_id, "role": role})
+        return {"Authorization": f"Bearer {token}"}
+
+    def agent_headers(self):
+        return self._headers(self.rng.choice(self.agents), "agent")
+
+    def customer_email(self):
+        return f"customer{self.rng.randint(1, self.customers)}@bench.example"
+
+    # (endpoint, weight, request builder) - builders return (method, path, kwargs)
+    def endpoints(self):
+        return [
+            ("GET /properties", 20, self.list_properties),
+            ("GET /properties/{id}", 25, self.get_property),
+            ("GET /leads", 8, self.list_leads),
+            ("POST /enquiry", 8, self.enquiry),
+            ("POST /track-interaction", 30, self.track_interaction),
+            ("GET /admin/stats", 3, lambda: ("GET", "/admin/stats", {"headers": self.admin_headers})),
+            ("GET /agent/stats", 3, lambda: ("GET", "/agent/stats", {"headers": self.agent_headers()})),
+            ("GET /leads/stats/summary", 3, lambda: ("GET", "/leads/stats/summary", {})),
+        ]
+
+    def list_properties(self):
+        params = {"page_size": 50}
+        if self.rng.random() < 0.5:
+            params["area"] = self.rng.choice(AREAS)
+        return "GET", "/properties", {"params": params}
+
+    def get_property(self):
+        return "GET", f"/properties/{self.rng.randint(1, self.max_property_id)}", {}
+
+    def list_leads(self):
+        return "GET", "/leads", {"params": {"page_size": 50}, "headers": self.agent_headers()}
+
+    def enquiry(self):
+        n = self.rng.randint(1, self.customers)
+        return "POST", "/enquiry", {"json": {
+            "name": f"Customer No{n}",
+            "email": f"customer{n}@bench.example",
+            "message": "Benchmark enquiry",
+            "property_id": self.rng.randint(1, self.max_property_id)
+        }}
+
+    def track_interaction(self):
+        property_id = self.rng.randint(1, self.max_property_id)
+        return "POST", "/track-interaction", {"json": {
+            "sessionId": f"bench-{self.rng.randint(1, 100000)}",
+            "action": self.rng.choice(ACTIONS),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "page": f"/properties/{property_id}",
+            "userAgent": "bench",
+            "propertyId": str(property_id),
+            "email": self.customer_email() if self.rng.random() < 0.7 else None
+        }}
+
+def summarize(latencies, errors, elapsed):
+    """Throughput and latency percentiles (ms) for one endpoint"""
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+async def replay(url, duration, concurrency, warmup, rng_seed):
+    """Send the traffic mix for warmup + duration seconds; returns per-endpoint stats"""
+    mix = TrafficMix(random.Random(rng_seed))
+    endpoints = mix.endpoints()
+    names = [name for name, _, _ in endpoints]
+    weights = [weight for _, weight, _ in endpoints]
+    builders = {name: builder for name, _, builder in endpoints}
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    recording = False
+
+    async def worker(client, deadline):
+        while time.perf_counter() < deadline:
+            name = mix.rng.choices(names, weights)[0]
+            method, path, kwargs = builders[name]()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                failed = response.status_code >= 400 and response.status_code != 404
+            except httpx.HTTPError:
+                failed = True
+            if recording:
+                latencies[name].append((time.perf_counter() - start) * 1000)
+                errors[name] += failed
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        if warmup:
+            print(f"🔄 Warming up for {warmup}s...")
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(*(worker(client, deadline) for _ in range(concurrency)))
+
+        print(f"🔄 Replaying mixed traffic for {duration}s ({concurrency} concurrent)...")
+        recording = True
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(worker(client, deadline) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    results = {name: summarize(latencies[name], errors[name], elapsed) for name in names}
+    overall = summarize([ms for name in names for ms in latencies[name]], sum(errors.values()), elapsed)
+    return results, overall
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server():
+    """Start uvicorn on a free port against the configured database; returns (process, url)"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        if process.poll() is not None:
+            raise SystemExit("❌ API server exited during startup")
+        try:
+            httpx.get(url + "/", timeout=1)
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("❌ API server did not start")
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(url=None, duration=60, concurrency=20, warmup=10, output=None, rng_seed=42):
+    """Benchmark the API and write the JSON report; returns the report"""
+    process = None
+    if url is None:
+        process, url = start_server()
+    try:
+        endpoints, overall = asyncio.run(replay(url, duration, concurrency, warmup, rng_seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"url": url, "duration_s": duration, "concurrency": concurrency, "warmup_s": warmup, "seed": rng_seed},
+        "database": {"name": POSTGRES_DB, "rows": table_counts()},
+        "endpoints": endpoints,
+        "overall": overall,
+    }
+
+    output = output or f"bench-{commit or 'local'}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'endpoint':<28}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for name, stats in list(endpoints.items()) + [("overall", overall)]:
+        if stats["requests"]:
+            print(f"{name:<28}{stats['throughput_rps']:>9}{stats['p50_ms']:>9}"
+                  f"{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['errors']:>8}")
+    print(f"✅ Report written to {output}")
+    return report
+
+def compare(base_path, head_path, threshold=None):
+    """Print per-endpoint changes between two reports; returns False if p95 regressed past threshold"""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+
+    print(f"📊 {base.get('commit')} -> {head.get('commit')}")
+    print(f"{'endpoint':<28}{'req/s':>16}{'p50 ms':>16}{'p95 ms':>16}{'p99 ms':>16}")
+    ok = True
+    names = list(base["endpoints"]) + [name for name in head["endpoints"] if name not in base["endpoints"]]
+    for name in names + ["overall"]:
+        before = base["overall"] if name == "overall" else base["endpoints"].get(name, {})
+        after = head["overall"] if name == "overall" else head["endpoints"].get(name, {})
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if key in before and key in after and before[key]:
+                change = (after[key] - before[key]) / before[key] * 100
+                cells.append(f"{after[key]:>8} {change:+6.1f}%")
+            else:
+                cells.append(f"{after.get(key, '-'):>16}")
+        print(f"{name:<28}" + "".join(cells))
+
+        if threshold is not None and before.get("p95_ms") and after.get("p95_ms"):
+            if after["p95_ms"] > before["p95_ms"] * (1 + threshold / 100):
+                ok = False
+
+    if not ok:
+        print(f"❌ p95 regressed by more than {threshold}% on at least one endpoint")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed and benchmark the CRM API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="fill the benchmark database")
+    seed_parser.add_argument("--scale", type=float, default=1.0, help="fraction of the default volumes")
+    seed_parser.add_argument("--create", action="store_true", help="create the database if it is missing")
+    seed_parser.add_argument("--force", action="store_true", help="seed a database without 'bench' in its name")
+
+    run_parser = commands.add_parser("run", help="replay mixed traffic and write a JSON report")
+    run_parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    run_parser.add_argument("--duration", type=int, default=60)
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--warmup", type=int, default=10)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output")
+
+    compare_parser = commands.add_parser("compare", help="diff two JSON reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, help="fail if any p95 grows by more than this percent")
+
+    args = parser.parse_args()
+    if args.command == "seed":
+        # Seeding truncates users, properties and leads
+        if "bench" not in POSTGRES_DB and not args.force:
+            raise SystemExit(f"❌ Refusing to seed {POSTGRES_DB}; set CLOUD_POSTGRES_DB to a benchmark database or pass --force")
+        if args.create:
+            create_database()
+        seed(args.scale)
+    elif args.command == "run":
+        run(args.url, args.duration, args.concurrency, args.warmup, args.output, args.seed)
+    else:
+        sys.exit(0 if compare(args.base, args.head, args.threshold) else 1)
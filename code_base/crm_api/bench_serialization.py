@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Listing Serialization Microbenchmark
+Compares the old listing path (a dict built field by field per row, then
+jsonable_encoder and json.dumps) with RowEncoder plus orjson, on rows
+shaped like GET /properties fetched from the configured database.
+
+Usage:
+    python bench_serialization.py [rows] [iterations]
+"""
+
+import sys
+import json
+import timeit
+from sqlalchemy import text
+from fastapi.encoders import jsonable_encoder
+from database import engine
+from serialization import RowEncoder, dumps_json
+
+PROPERTY_COLUMNS = RowEncoder(
+    "property_id", "label", "description", "address", "area", "beds", "baths", "price",
+    "property_type", "status", "assigned_agent_id", "agent_name", "created_by",
+    "created_at", "updated_at", "image_url"
+)
+
+def fetch_rows(count):
+    """count synthetic rows with the column types of the property listing"""
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT
+                g AS property_id,
+                'Property ' || g AS label,
+                'A bright two bedroom flat close to the station' AS description,
+                g || ' Main Street' AS address,
+                'Downtown' AS area,
+                2 AS beds,
+                1 AS baths,
+                (100000 + g * 10.5)::numeric(12,2) AS price,
+                'apartment' AS property_type,
+                'active' AS status,
+                7 AS assigned_agent_id,
+                'Agent Smith' AS agent_name,
+                7 AS created_by,
+                NOW()::timestamp - g * INTERVAL '1 minute' AS created_at,
+                NOW()::timestamp AS updated_at,
+                NULL::text AS image_url
+            FROM generate_series(1, :count) g
+        """), {"count": count}).fetchall()
+
+def old_encode(rows):
+    properties = [{
+        "property_id": row.property_id,
+        "label": row.label,
+        "description": row.description,
+        "address": row.address,
+        "area": row.area,
+        "beds": row.beds,
+        "baths": row.baths,
+        "price": row.price,
+        "property_type": row.property_type,
+        "status": row.status,
+        "assigned_agent_id": row.assigned_agent_id,
+        "agent_name": row.agent_name,
+        "created_by": row.created_by,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "image_url": row.image_url
+    } for row in rows]
+    return json.dumps(
+        jsonable_encoder(properties), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode()
+
+def new_encode(rows):
+    return dumps_json(PROPERTY_COLUMNS.dicts(rows))
+
+def bench_serialization(count: int = 5000, iterations: int = 10):
+    """Time both encoders over the same rows and check they agree"""
+    rows = fetch_rows(count)
+    if json.loads(old_encode(rows)) != json.loads(new_encode(rows)):
+        raise SystemExit("❌ Encoders disagree")
+
+    print(f"🔄 Encoding {count} property rows {iterations} times...")
+    old = timeit.timeit(lambda: old_encode(rows), number=iterations) / iterations
+    new = timeit.timeit(lambda: new_encode(rows), number=iterations) / iterations
+
+    print(f"📊 dict + jsonable_encoder + json: {old * 1000:8.2f} ms per listing")
+    print(f"📊 RowEncoder + orjson:            {new * 1000:8.2f} ms per listing")
+    print(f"✅ {old / new:.1f}x faster ({new / old * 100:.0f}% of the CPU time)")
+    return old, new
+
+if __name__ == "__main__":
+    bench_serialization(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    )
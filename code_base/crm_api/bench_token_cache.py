@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Token Verification Microbenchmark
+Compares a full JWT decode (HMAC check plus TokenData construction) with
+a token cache hit, which is what every request after the first pays.
+
+Usage:
+    python bench_token_cache.py [iterations]
+"""
+
+import sys
+import timeit
+from auth_utils import create_access_token, decode_token, verify_token, token_cache
+
+def bench_token_cache(iterations: int = 20000):
+    """Time uncached and cached verification of the same token"""
+    token = create_access_token({"sub": "agent@example.com", "user_id": 42, "role": "agent"})
+
+    print(f"🔄 Verifying one token {iterations} times...")
+    uncached = timeit.timeit(lambda: decode_token(token), number=iterations) / iterations
+
+    token_cache.clear()
+    verify_token(token)
+    cached = timeit.timeit(lambda: verify_token(token), number=iterations) / iterations
+
+    print(f"📊 Full decode:  {uncached * 1e6:8.2f} µs per request")
+    print(f"📊 Cache hit:    {cached * 1e6:8.2f} µs per request")
+    print(f"✅ Saves {(uncached - cached) * 1e6:.2f} µs per authenticated request ({uncached / cached:.1f}x faster)")
+    return uncached, cached
+
+if __name__ == "__main__":
+    bench_token_cache(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
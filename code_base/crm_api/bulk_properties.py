@@ -0,0 +1,174 @@
+import os
+from sqlalchemy import text
+
+# Most items accepted by one /admin/properties/bulk request
+MAX_BULK_ITEMS = int(os.getenv("MAX_BULK_ITEMS", "10000"))
+
+# Array type of each property column passed through unnest()
+COLUMN_TYPES = {
+    "property_id": "INTEGER",
+    "label": "TEXT",
+    "description": "TEXT",
+    "address": "TEXT",
+    "area": "TEXT",
+    "beds": "INTEGER",
+    "baths": "INTEGER",
+    "price": "NUMERIC",
+    "property_type": "TEXT",
+    "status": "TEXT",
+    "image_url": "TEXT",
+    "agent_id": "INTEGER"
+}
+
+CREATE_FIELDS = ("label", "description", "address", "area", "beds", "baths", "price", "property_type", "image_url")
+UPDATE_FIELDS = CREATE_FIELDS + ("status",)
+
+def unnest(columns) -> str:
+    """unnest() of one array parameter per column, named like the columns"""
+    arrays = ", ".join(f"CAST(:{column} AS {COLUMN_TYPES[column]}[])" for column in columns)
+    return f"unnest({arrays})"
+
+def result(index: int, property_id, status: str, detail: str = None) -> dict:
+    item = {"index": index, "property_id": property_id, "status": status}
+    if detail:
+        item["detail"] = detail
+    return item
+
+def error(index: int, property_id, detail: str) -> dict:
+    return result(index, property_id, "error", detail)
+
+async def lock_properties(conn, property_ids) -> dict:
+    """Lock the given properties for the transaction; property_id -> (status, assigned_agent_id)"""
+    rows = await conn.execute(text("""
+        SELECT property_id, status, assigned_agent_id
+        FROM properties
+        WHERE property_id = ANY(:property_ids)
+        ORDER BY property_id
+        FOR UPDATE
+    """), {"property_ids": list(set(property_ids))})
+    return {row.property_id: row for row in rows}
+
+def check_properties(property_ids, existing: dict, results: list) -> list:
+    """Indexes of the items that name an existing property once; errors for the rest go in results"""
+    valid, seen = [], set()
+    for index, property_id in enumerate(property_ids):
+        if property_id in seen:
+            results[index] = error(index, property_id, "Duplicate property_id in batch")
+        elif property_id not in existing:
+            results[index] = error(index, property_id, "Property not found")
+        else:
+            valid.append(index)
+        seen.add(property_id)
+    return valid
+
+async def bulk_create(conn, items, created_by: int, status: str = "active"):
+    """Insert every item in one statement; returns (results, property_ids)"""
+    if not items:
+        return [], []
+    # Ids are drawn first and inserted explicitly, so each one is known to belong to its item
+    property_ids = (await conn.execute(
+        text("SELECT nextval(pg_get_serial_sequence('properties', 'property_id')) FROM generate_series(1, :count)"),
+        {"count": len(items)}
+    )).scalars().all()
+    columns = ("property_id",) + CREATE_FIELDS
+    params = {field: [getattr(item, field) for item in items] for field in CREATE_FIELDS}
+    await conn.execute(text(f"""
+        INSERT INTO properties ({', '.join(columns)}, created_by, status)
+        SELECT {', '.join('v.' + column for column in columns)}, :created_by, :status
+        FROM {unnest(columns)} AS v({', '.join(columns)})
+    """), {**params, "property_id": property_ids, "created_by": created_by, "status": status})
+    return [result(index, property_id, "created") for index, property_id in enumerate(property_ids)], property_ids
+
+async def bulk_update(conn, items):
+    """Apply each item's non-null fields to its property in one statement
+
+    Returns (results, property_ids, agent_ids) with agent_ids the agents
+    of the updated properties.
+    """
+    results = [None] * len(items)
+    existing = await lock_properties(conn, [item.property_id for item in items])
+    valid = []
+    for index in check_properties([item.property_id for item in items], existing, results):
+        item = items[index]
+        if all(getattr(item, field) is None for field in UPDATE_FIELDS):
+            results[index] = error(index, item.property_id, "No fields to update")
+        else:
+            valid.append(index)
+
+    # Only the fields some item sets; COALESCE keeps the rest of each row
+    fields = [field for field in UPDATE_FIELDS if any(getattr(items[index], field) is not None for index in valid)]
+    if valid:
+        columns = ("property_id",) + tuple(fields)
+        await conn.execute(text(f"""
+            UPDATE properties p
+            SET {', '.join(f'{field} = COALESCE(v.{field}, p.{field})' for field in fields)}, updated_at = NOW()
+            FROM {unnest(columns)} AS v({', '.join(columns)})
+            WHERE p.property_id = v.property_id
+        """), {column: [getattr(items[index], column) for index in valid] for column in columns})
+
+    property_ids = [items[index].property_id for index in valid]
+    for index in valid:
+        results[index] = result(index, items[index].property_id, "updated")
+    return results, property_ids, [existing[property_id].assigned_agent_id for property_id in property_ids]
+
+async def bulk_approve(conn, property_ids):
+    """Make pending properties active; returns (results, property_ids, agent_ids)"""
+    results = [None] * len(property_ids)
+    existing = await lock_properties(conn, property_ids)
+    valid = []
+    for index in check_properties(property_ids, existing, results):
+        if existing[property_ids[index]].status != "pending":
+            results[index] = error(index, property_ids[index], "Property is not pending")
+        else:
+            valid.append(index)
+
+    approved = [property_ids[index] for index in valid]
+    if approved:
+        await conn.execute(text("""
+            UPDATE properties
+            SET status = 'active', updated_at = NOW()
+            WHERE property_id = ANY(:property_ids)
+        """), {"property_ids": approved})
+
+    for index in valid:
+        results[index] = result(index, property_ids[index], "approved")
+    return results, approved, [existing[property_id].assigned_agent_id for property_id in approved]
+
+async def bulk_assign(conn, assignments):
+    """Assign each property to its agent in one statement
+
+    Returns (results, property_ids, agent_ids) with agent_ids both the
+    previous and the new agents.
+    """
+    results = [None] * len(assignments)
+    existing = await lock_properties(conn, [item.property_id for item in assignments])
+    agents = await conn.execute(
+        text("SELECT user_id FROM users WHERE user_id = ANY(:agent_ids) AND role = 'agent'"),
+        {"agent_ids": list({item.agent_id for item in assignments})}
+    )
+    agent_ids = {row.user_id for row in agents}
+
+    valid = []
+    for index in check_properties([item.property_id for item in assignments], existing, results):
+        if assignments[index].agent_id not in agent_ids:
+            results[index] = error(index, assignments[index].property_id, "Agent not found")
+        else:
+            valid.append(index)
+
+    if valid:
+        await conn.execute(text(f"""
+            UPDATE properties p
+            SET assigned_agent_id = v.agent_id, updated_at = NOW()
+            FROM {unnest(("property_id", "agent_id"))} AS v(property_id, agent_id)
+            WHERE p.property_id = v.property_id
+        """), {
+            "property_id": [assignments[index].property_id for index in valid],
+            "agent_id": [assignments[index].agent_id for index in valid]
+        })
+
+    property_ids = [assignments[index].property_id for index in valid]
+    for index in valid:
+        results[index] = result(index, assignments[index].property_id, "assigned")
+    changed_agents = {existing[property_id].assigned_agent_id for property_id in property_ids}
+    changed_agents.update(assignments[index].agent_id for index in valid)
+    return results, property_ids, list(changed_agents)
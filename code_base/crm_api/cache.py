@@ -0,0 +1,164 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import Response
+from serialization import dumps_json
+
+# Cache configuration; CACHE_URL selects Redis, otherwise an in-process cache is used
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+
+class MemoryCache:
+    """In-process LRU cache with a per-entry TTL
+
+    Invalidations only reach the current process, so with several workers
+    a stale entry can survive elsewhere for up to ttl seconds.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+class RedisCache:
+    """Cache stored in Redis
+
+    client is anything with the redis.asyncio get/set/delete API, so a
+    local stand-in such as fakeredis can be passed in.
+    """
+
+    def __init__(self, client, ttl: int = CACHE_TTL, prefix: str = "crm:cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes):
+        await self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+def create_cache_backend(url: str = CACHE_URL):
+    """Build the backend selected by CACHE_URL"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        # Optional dependency, only needed when Redis is configured
+        import redis.asyncio as redis
+        return RedisCache(redis.from_url(url))
+    return MemoryCache()
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+class ResponseCache:
+    """Read-through cache of JSON response bodies, served with ETags
+
+    Entries are stored as the ETag and the encoded body so a hit needs no
+    serialization. A backend error is logged and treated as a miss.
+
+    A load that overlaps an invalidation of its key is served but not
+    stored, since it may have read the data from before the write. This
+    is tracked per process, like MemoryCache invalidations.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        # key -> [loads in flight, invalidations seen]
+        self._loading = {}
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            print(f"⚠️ Cache read failed for {key}: {e}")
+            return None
+
+    async def _set(self, key: str, value: bytes):
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            print(f"⚠️ Cache write failed for {key}: {e}")
+
+    async def respond(self, request: Request, key: str, load) -> Response:
+        """Serve key from the cache, calling load() to build it on a miss
+
+        load returns the response data; exceptions it raises (such as a
+        404) are passed through and nothing is cached.
+        """
+        entry = await self._get(key)
+        if entry is None:
+            loading = self._loading.setdefault(key, [0, 0])
+            loading[0] += 1
+            generation = loading[1]
+            try:
+                body = dumps_json(await load())
+            finally:
+                loading[0] -= 1
+                if not loading[0]:
+                    del self._loading[key]
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            entry = etag.encode() + b"\n" + body
+            if loading[1] == generation:
+                await self._set(key, entry)
+
+        etag, body = entry.split(b"\n", 1)
+        headers = {"ETag": etag.decode(), "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *keys: str):
+        for key in keys:
+            if key in self._loading:
+                self._loading[key][1] += 1
+        try:
+            await self.backend.delete(*keys)
+        except Exception as e:
+            print(f"❌ Cache invalidation failed for {', '.join(keys)}: {e}")
+
+def property_key(property_id: int) -> str:
+    return f"property:{property_id}"
+
+def agent_page_key(public_url: str) -> str:
+    return f"agent_page:{public_url}"
+
+response_cache = ResponseCache(create_cache_backend())
@@ -0,0 +1,379 @@
+import os
+import time
+import asyncio
+import asyncpg
+from datetime import timedelta
+from sqlalchemy import text
+from database import DATABASE_URL, db_connection
+from serialization import dumps_json
+from cache import response_cache, property_key, agent_page_key
+
+# In-process snapshot of properties for the public read endpoints (off by default)
+PROPERTY_CATALOG = os.getenv("PROPERTY_CATALOG", "false").lower() == "true"
+# Seconds between updated_at watermark polls, the backstop for missed notifications
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "30"))
+# Reads fall back to the database when the catalog has not synced for this long
+CATALOG_MAX_STALENESS = float(os.getenv("CATALOG_MAX_STALENESS", "60"))
+
+# Channel the triggers from migration 7 notify with "property:<id>" or "agent:<user_id>"
+CATALOG_CHANNEL = "catalog_changes"
+
+# Re-read rows updated this long before the last poll, for transactions still in flight then
+WATERMARK_OVERLAP = 10
+
+# Fields of the GET /properties response, in order
+PROPERTY_FIELDS = (
+    "property_id", "label", "description", "address", "area", "beds", "baths", "price",
+    "property_type", "status", "assigned_agent_id", "agent_name", "created_by",
+    "created_at", "updated_at", "image_url"
+)
+
+# Fields of a property on an agent's public page
+PUBLIC_PROPERTY_FIELDS = (
+    "property_id", "label", "description", "address", "area", "beds", "baths", "price",
+    "property_type"
+)
+
+PROPERTY_QUERY = f"""
+    SELECT {', '.join('p.' + field for field in PROPERTY_FIELDS if field != 'agent_name')},
+           u.name as agent_name
+    FROM properties p
+    LEFT JOIN users u ON p.assigned_agent_id = u.user_id
+"""
+
+PROFILE_QUERY = """
+    SELECT ap.user_id, ap.public_url, ap.bio, ap.phone, ap.profile_picture, u.name, u.email
+    FROM agent_profiles ap
+    JOIN users u ON ap.user_id = u.user_id
+    WHERE ap.is_active = TRUE
+"""
+
+class CatalogProperty:
+    """One property row, with its GET /properties JSON encoded once"""
+    __slots__ = PROPERTY_FIELDS + ("price_value", "area_key", "json")
+
+    def __init__(self, row):
+        for field in PROPERTY_FIELDS:
+            setattr(self, field, getattr(row, field))
+        # Comparisons the way Postgres does them: numeric price as float8, LOWER(area)
+        self.price_value = float(self.price) if self.price is not None else None
+        self.area_key = str(self.area).lower() if self.area is not None else None
+        self.json = dumps_json(self.dict())
+
+    def dict(self) -> dict:
+        return {field: getattr(self, field) for field in PROPERTY_FIELDS}
+
+    def public_dict(self) -> dict:
+        return {field: getattr(self, field) for field in PUBLIC_PROPERTY_FIELDS}
+
+def _sorted(entries, sort: str, descending: bool) -> list:
+    """Order like ORDER BY {sort} {direction} [NULLS LAST], property_id {direction}"""
+    present = [entry for entry in entries if getattr(entry, sort) is not None]
+    missing = [entry for entry in entries if getattr(entry, sort) is None]
+    key = "price_value" if sort == "price" else sort
+    present.sort(key=lambda entry: (getattr(entry, key), entry.property_id), reverse=descending)
+    missing.sort(key=lambda entry: entry.property_id, reverse=descending)
+    # Postgres puts NULLs first in a DESC sort unless NULLS LAST is given; only created_at omits it
+    if sort == "created_at" and descending:
+        return missing + present
+    return present + missing
+
+class PropertyCatalog:
+    """Every property and active agent profile, indexed for the public read endpoints
+
+    Kept current by LISTEN on CATALOG_CHANNEL, with an updated_at watermark
+    poll every CATALOG_REFRESH_INTERVAL as a backstop and a full reload
+    whenever the listener (re)connects. Until it has loaded, or when it has
+    not synced for CATALOG_MAX_STALENESS, ready is False and callers query
+    the database instead.
+    """
+
+    def __init__(self, enabled: bool = PROPERTY_CATALOG, refresh_interval: float = CATALOG_REFRESH_INTERVAL,
+                 max_staleness: float = CATALOG_MAX_STALENESS):
+        self.enabled = enabled
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.properties = {}
+        self.by_agent = {}
+        self.by_status = {}
+        self.by_type = {}
+        self.profiles = {}
+        self._orderings = {}
+        self._watermark = None
+        self._synced_at = None
+        self._listener = None
+        self._pending = set()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return self._synced_at is not None and time.monotonic() - self._synced_at < self.max_staleness
+
+    # Indexes
+
+    def _index(self, entry: CatalogProperty):
+        self.properties[entry.property_id] = entry
+        self._orderings = {}
+        for index, value in ((self.by_agent, entry.assigned_agent_id), (self.by_status, entry.status),
+                             (self.by_type, entry.property_type)):
+            index.setdefault(value, set()).add(entry.property_id)
+
+    def _unindex(self, property_id: int):
+        entry = self.properties.pop(property_id, None)
+        if entry is None:
+            return
+        self._orderings = {}
+        for index, value in ((self.by_agent, entry.assigned_agent_id), (self.by_status, entry.status),
+                             (self.by_type, entry.property_type)):
+            ids = index.get(value)
+            if ids is not None:
+                ids.discard(property_id)
+                if not ids:
+                    del index[value]
+
+    # Loading
+
+    async def load(self):
+        """Replace the catalog with a full snapshot"""
+        async with db_connection() as conn:
+            now = (await conn.execute(text("SELECT NOW()::timestamp"))).scalar()
+            property_rows = (await conn.execute(text(PROPERTY_QUERY))).fetchall()
+            profile_rows = (await conn.execute(text(PROFILE_QUERY))).fetchall()
+
+        self.properties, self.by_agent, self.by_status, self.by_type = {}, {}, {}, {}
+        for row in property_rows:
+            self._index(CatalogProperty(row))
+        self.profiles = {row.public_url: row for row in profile_rows}
+        self._watermark = now
+        self._synced_at = time.monotonic()
+
+    async def _read(self, conn, property_ids, agent_ids):
+        """Current property and profile rows for apply()"""
+        rows = []
+        if property_ids or agent_ids:
+            rows = (await conn.execute(
+                text(f"{PROPERTY_QUERY} WHERE p.property_id = ANY(:ids) OR p.assigned_agent_id = ANY(:agent_ids)"),
+                {"ids": list(property_ids), "agent_ids": list(agent_ids)}
+            )).fetchall()
+        profile_rows = []
+        if agent_ids:
+            profile_rows = (await conn.execute(
+                text(f"{PROFILE_QUERY} AND ap.user_id = ANY(:agent_ids)"), {"agent_ids": list(agent_ids)}
+            )).fetchall()
+        return rows, profile_rows
+
+    async def apply(self, property_ids=(), agent_ids=(), conn=None):
+        """Re-read the given properties and agents (their profile and properties)
+
+        Reads on conn when given, otherwise on a pooled connection of its own.
+        """
+        property_ids, agent_ids = set(property_ids), set(agent_ids)
+        for agent_id in agent_ids:
+            property_ids |= self.by_agent.get(agent_id, set())
+
+        if conn is None:
+            async with db_connection() as conn:
+                rows, profile_rows = await self._read(conn, property_ids, agent_ids)
+        else:
+            rows, profile_rows = await self._read(conn, property_ids, agent_ids)
+
+        # Agents whose public pages show any of these properties, before or after the change
+        page_agents = set(agent_ids)
+        page_agents.update(self.properties[property_id].assigned_agent_id
+                           for property_id in property_ids if property_id in self.properties)
+        page_agents.update(row.assigned_agent_id for row in rows)
+        stale_keys = {property_key(property_id) for property_id in property_ids}
+        stale_keys.update(property_key(row.property_id) for row in rows)
+
+        # Properties that no longer exist were deleted
+        for property_id in property_ids - {row.property_id for row in rows}:
+            self._unindex(property_id)
+        for row in rows:
+            self._unindex(row.property_id)
+            self._index(CatalogProperty(row))
+
+        public_urls = [
+            public_url for public_url, profile in self.profiles.items() if profile.user_id in page_agents
+        ]
+        if agent_ids:
+            self.profiles = {
+                public_url: profile for public_url, profile in self.profiles.items()
+                if profile.user_id not in agent_ids
+            }
+            self.profiles.update((row.public_url, row) for row in profile_rows)
+
+        # Cached responses may have been built from the old entries after a write invalidated them
+        stale_keys.update(agent_page_key(public_url) for public_url in public_urls)
+        stale_keys.update(
+            agent_page_key(public_url) for public_url, profile in self.profiles.items()
+            if profile.user_id in page_agents
+        )
+        if stale_keys:
+            await response_cache.invalidate(*stale_keys)
+
+    async def refresh(self, conn, property_ids=(), agent_ids=()):
+        """Apply a write committed by this process now, ahead of its notification
+
+        Gives the process that made a change read-your-writes; other
+        processes pick it up from CATALOG_CHANNEL. Reads on conn, the
+        connection the write was committed on, so a write request holds
+        only the one pooled connection.
+        """
+        if self.ready:
+            await self.apply(property_ids, agent_ids, conn)
+
+    async def poll(self):
+        """Apply everything updated since the last watermark"""
+        async with db_connection() as conn:
+            now = (await conn.execute(text("SELECT NOW()::timestamp"))).scalar()
+            since = {"since": self._watermark - timedelta(seconds=WATERMARK_OVERLAP)}
+            property_ids = (await conn.execute(
+                text("SELECT property_id FROM properties WHERE updated_at >= :since"), since
+            )).scalars().all()
+            agent_ids = (await conn.execute(
+                text("SELECT user_id FROM agent_profiles WHERE updated_at >= :since"), since
+            )).scalars().all()
+
+        await self.apply(property_ids, agent_ids)
+        self._watermark = now
+        self._synced_at = time.monotonic()
+
+    # Change feed
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._pending.add(payload)
+        self._wakeup.set()
+
+    async def _listen(self):
+        """Connect the LISTEN connection; the caller reloads afterwards to cover the gap"""
+        self._listener = await asyncpg.connect(DATABASE_URL)
+        self._listener.add_termination_listener(lambda connection: self._wakeup.set())
+        await self._listener.add_listener(CATALOG_CHANNEL, self._on_notify)
+
+    async def _close_listener(self):
+        if self._listener is not None:
+            try:
+                await self._listener.close()
+            except Exception:
+                pass
+            self._listener = None
+
+    async def _apply_pending(self):
+        pending, self._pending = self._pending, set()
+        property_ids, agent_ids = set(), set()
+        for payload in pending:
+            kind, _, key = payload.partition(":")
+            (property_ids if kind == "property" else agent_ids).add(int(key))
+        await self.apply(property_ids, agent_ids)
+        if self._listener is not None:
+            # Notifications are delivered in commit order, so the catalog is current
+            self._synced_at = time.monotonic()
+
+    async def _run(self):
+        next_poll = time.monotonic() + self.refresh_interval
+        while True:
+            try:
+                if self._listener is None or self._listener.is_closed():
+                    await self._close_listener()
+                    await self._listen()
+                    await self.load()
+                    next_poll = time.monotonic() + self.refresh_interval
+
+                timeout = max(next_poll - time.monotonic(), 0)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                if self._pending:
+                    await self._apply_pending()
+                if time.monotonic() >= next_poll:
+                    await self.poll()
+                    next_poll = time.monotonic() + self.refresh_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Property catalog refresh failed: {e}")
+                await self._close_listener()
+                await asyncio.sleep(min(self.refresh_interval, 5))
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_listener()
+
+    # Reads
+
+    def _ordering(self, sort: str, descending: bool) -> list:
+        """Every property in listing order, kept until the next change"""
+        key = (sort, descending)
+        if key not in self._orderings:
+            self._orderings[key] = _sorted(self.properties.values(), sort, descending)
+        return self._orderings[key]
+
+    def listing(self, sort: str = "created_at", order: str = "desc", agent_id=None, status=None,
+                property_type=None, area=None, min_price=None, max_price=None, min_beds=None,
+                min_baths=None) -> list:
+        """Properties matching the GET /properties filters, in its sort order"""
+        candidates = None
+        for index, value, wanted in ((self.by_agent, agent_id, agent_id is not None),
+                                     (self.by_status, status, bool(status)),
+                                     (self.by_type, property_type, bool(property_type))):
+            if wanted:
+                ids = index.get(value, set())
+                candidates = ids if candidates is None else candidates & ids
+
+        # Sort a small index hit directly; otherwise filter the cached full ordering
+        if candidates is not None and len(candidates) * 4 < len(self.properties):
+            entries = _sorted([self.properties[property_id] for property_id in candidates], sort, order == "desc")
+        else:
+            entries = self._ordering(sort, order == "desc")
+            if candidates is not None:
+                entries = [entry for entry in entries if entry.property_id in candidates]
+
+        area_key = area.lower() if area else None
+        if area_key is None and min_price is None and max_price is None and min_beds is None and min_baths is None:
+            return entries
+        return [
+            entry for entry in entries
+            if (area_key is None or entry.area_key == area_key)
+            and (min_price is None or (entry.price_value is not None and entry.price_value >= min_price))
+            and (max_price is None or (entry.price_value is not None and entry.price_value <= max_price))
+            and (min_beds is None or (entry.beds is not None and entry.beds >= min_beds))
+            and (min_baths is None or (entry.baths is not None and entry.baths >= min_baths))
+        ]
+
+    def get(self, property_id: int):
+        return self.properties.get(property_id)
+
+    def agent_page(self, public_url: str):
+        """(profile, active properties newest first) for an agent's public page, or None"""
+        profile = self.profiles.get(public_url)
+        if profile is None:
+            return None
+        entries = [
+            self.properties[property_id] for property_id in self.by_agent.get(profile.user_id, ())
+            if self.properties[property_id].status == "active"
+        ]
+        return profile, _sorted(entries, "created_at", True)
+
+def encode_entries(entries) -> bytes:
+    """A JSON array of the entries' pre-encoded GET /properties objects"""
+    return b"[" + b",".join(entry.json for entry in entries) + b"]"
+
+def encode_page(entries, **fields) -> bytes:
+    """{"properties": [entries...], **fields} without re-encoding the entries"""
+    return b'{"properties":' + encode_entries(entries) + b"," + dumps_json(fields)[1:]
+
+property_catalog = PropertyCatalog()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Query Plan Check Script
+Runs EXPLAIN on the API's hot queries with sequential scans disabled and
+fails if any of them still needs one, i.e. no index can serve it. Small
+development tables are seq-scanned by choice, so disabling them shows
+whether the indexes would be used once the tables are large.
+"""
+
+import sys
+from datetime import datetime
+from sqlalchemy import text
+from database import engine
+from queries import (
+    PROPERTY_DETAIL_QUERY, AGENT_PROPERTY_COUNT_QUERY, AGENT_PROFILE_QUERY, AGENT_PAGE_PROPERTIES_QUERY,
+    AGENT_LEAD_COUNT_QUERY, SEARCH_FILTER, SEARCH_RANK, keyset_filter, property_order_by, lead_order_by,
+    property_query, search_query, agent_property_query, agent_lead_query, lead_query
+)
+from lead_scoring import INTERACTION_COUNTS_QUERY, LATEST_LEADS_QUERY
+from auth_utils import LOGIN_QUERY, SIGNUP_LOGIN_QUERY
+
+CURSOR = {"cursor_created_at": datetime.now(), "cursor_id": 1000000}
+EMAILS = {"emails": ["visitor@example.com"]}
+
+# (name, query, params) - built from the statements main.py, lead_scoring.py and auth_utils.py run
+QUERIES = [
+    ("GET /properties", property_query(
+        order_by=property_order_by(), page_clause="LIMIT :limit"
+    ), {"limit": 51}),
+    ("GET /properties (cursor)", property_query(
+        [keyset_filter("p.created_at", "p.property_id")], property_order_by(), "LIMIT :limit"
+    ), {**CURSOR, "limit": 51}),
+    ("GET /properties (agent)", property_query(
+        ["p.assigned_agent_id = :agent_id"], property_order_by(), "LIMIT :limit"
+    ), {"agent_id": 1, "limit": 51}),
+    ("GET /agent/properties", agent_property_query(
+        page_clause="LIMIT :limit OFFSET :offset"
+    ), {"agent_id": 1, "limit": 11, "offset": 0}),
+    ("GET /agent/properties count", AGENT_PROPERTY_COUNT_QUERY, {"agent_id": 1}),
+    ("GET /agent/{public_url} profile", AGENT_PROFILE_QUERY, {"public_url": "agent"}),
+    ("GET /agent/{public_url} properties", AGENT_PAGE_PROPERTIES_QUERY, {"agent_id": 1}),
+    ("GET /properties/{id}", PROPERTY_DETAIL_QUERY, {"property_id": 1}),
+    ("GET /leads", lead_query(
+        order_by=lead_order_by(), page_clause="LIMIT :limit"
+    ), {"limit": 51}),
+    ("GET /leads (agent)", lead_query(
+        ["l.assigned_agent_id = :agent_id"], lead_order_by(), "LIMIT :limit"
+    ), {"agent_id": 1, "limit": 51}),
+    ("GET /agent/leads", agent_lead_query(
+        page_clause="LIMIT :limit OFFSET :offset"
+    ), {"agent_id": 1, "limit": 11, "offset": 0}),
+    ("GET /agent/leads count", AGENT_LEAD_COUNT_QUERY, {"agent_id": 1}),
+    ("GET /properties/search", search_query(
+        [SEARCH_FILTER], SEARCH_RANK, "rank DESC, p.property_id"
+    ), {"q": "garden flat", "limit": 50, "offset": 0}),
+    ("rescore_emails", LATEST_LEADS_QUERY, EMAILS),
+    ("fetch_interaction_counts", INTERACTION_COUNTS_QUERY, EMAILS),
+    ("login", LOGIN_QUERY, {"email": "visitor@example.com"}),
+    ("login (ALLOW_ADMIN_SIGNUP)", SIGNUP_LOGIN_QUERY, {
+        "email": "visitor@example.com", "name": "Visitor", "picture": None, "is_admin_email": False
+    }),
+]
+
+def seq_scans(plan):
+    """Relations read with a Seq Scan anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+def check_query_plans(queries=QUERIES):
+    """EXPLAIN every query; returns a list of (name, tables) that still seq scan"""
+    print("🔍 Checking query plans...")
+    failures = []
+
+    with engine.connect() as conn:
+        try:
+            # Only makes seq scans a last resort, so any left have no index to use
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+            for name, query, params in queries:
+                plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params).scalar()
+                tables = seq_scans(plan[0]["Plan"])
+                if tables:
+                    print(f"❌ {name}: sequential scan on {', '.join(tables)}")
+                    failures.append((name, tables))
+                else:
+                    print(f"✅ {name}")
+        finally:
+            conn.rollback()
+
+    if failures:
+        print(f"❌ {len(failures)} of {len(queries)} queries still need a sequential scan")
+    else:
+        print(f"🎉 All {len(queries)} queries can use an index")
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if check_query_plans() else 0)
@@ -0,0 +1,116 @@
+import os
+import asyncio
+from sqlalchemy import text
+from database import db_connection
+
+# Dashboard numbers may lag the tables by at most this many seconds
+STATS_MAX_AGE = float(os.getenv("STATS_MAX_AGE", "30"))
+
+# One row per scope: agent_id 0 holds the global counts, every other row
+# the counts for that agent. refreshed_at records when the row was built.
+STATS_VIEW_QUERY = """
+    SELECT
+        0 AS agent_id,
+        (SELECT COUNT(*) FROM properties) AS total_properties,
+        (SELECT COUNT(*) FROM properties WHERE status = 'pending') AS pending_properties,
+        (SELECT COUNT(*) FROM users) AS total_users,
+        (SELECT COUNT(*) FROM leads) AS total_leads,
+        (SELECT COUNT(*) FROM lead_info) AS lead_count,
+        (SELECT COUNT(*) FROM lead_info WHERE status = 'new') AS new_lead_count,
+        (
+            SELECT COALESCE(jsonb_object_agg(status, count), '{}'::jsonb)
+            FROM (
+                SELECT COALESCE(status, 'null') AS status, COUNT(*) AS count
+                FROM lead_info
+                GROUP BY 1
+            ) s
+        ) AS lead_status_breakdown,
+        (SELECT AVG(lead_score) FROM lead_info WHERE lead_score IS NOT NULL) AS average_lead_score,
+        NOW() AS refreshed_at
+    UNION ALL
+    SELECT
+        agent_id,
+        SUM(is_property) AS total_properties,
+        0 AS pending_properties,
+        0 AS total_users,
+        0 AS total_leads,
+        SUM(is_lead) AS lead_count,
+        SUM(is_new_lead) AS new_lead_count,
+        NULL AS lead_status_breakdown,
+        NULL AS average_lead_score,
+        NOW() AS refreshed_at
+    FROM (
+        SELECT assigned_agent_id AS agent_id, 1 AS is_property, 0 AS is_lead, 0 AS is_new_lead
+        FROM properties
+        WHERE assigned_agent_id IS NOT NULL
+        UNION ALL
+        SELECT assigned_agent_id, 0, 1, CASE WHEN status = 'new' THEN 1 ELSE 0 END
+        FROM lead_info
+        WHERE assigned_agent_id IS NOT NULL
+    ) agent_rows
+    GROUP BY agent_id
+"""
+
+def create_stats_view(conn):
+    """Create and populate the dashboard_stats materialized view"""
+    conn.execute(text(f"CREATE MATERIALIZED VIEW IF NOT EXISTS dashboard_stats AS {STATS_VIEW_QUERY}"))
+    # REFRESH ... CONCURRENTLY needs a unique index
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_dashboard_stats_agent ON dashboard_stats (agent_id)"))
+
+def rebuild_stats_view(conn):
+    """Drop and recreate dashboard_stats, e.g. after changing STATS_VIEW_QUERY"""
+    conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS dashboard_stats"))
+    create_stats_view(conn)
+
+async def read_stats(conn, agent_id: int = 0):
+    """The stats row for agent_id (0 for the global row), or None if the agent has none"""
+    return (await conn.execute(
+        text("SELECT * FROM dashboard_stats WHERE agent_id = :agent_id"),
+        {"agent_id": agent_id}
+    )).fetchone()
+
+async def refresh_stats(max_age: float = 0) -> bool:
+    """Refresh dashboard_stats unless it is younger than max_age; returns True if refreshed"""
+    async with db_connection() as conn:
+        age = (await conn.execute(text(
+            "SELECT EXTRACT(EPOCH FROM NOW() - refreshed_at) FROM dashboard_stats WHERE agent_id = 0"
+        ))).scalar()
+        if age is not None and age < max_age:
+            # Another worker refreshed it recently
+            return False
+        await conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY dashboard_stats"))
+        await conn.commit()
+        return True
+
+class StatsRefresher:
+    """Background task that keeps dashboard_stats within STATS_MAX_AGE"""
+
+    def __init__(self, max_age: float = STATS_MAX_AGE):
+        self.max_age = max_age
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # Checking every half period keeps the view within max_age even when
+        # several workers share the database and skip each other's refreshes
+        interval = self.max_age / 2
+        while True:
+            try:
+                await refresh_stats(max_age=interval)
+            except Exception as e:
+                print(f"⚠️ Failed to refresh dashboard stats: {e}")
+            await asyncio.sleep(interval)
+
+stats_refresher = StatsRefresher()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Index Migration Script
+Creates the indexes behind the API's hot queries with CREATE INDEX
+CONCURRENTLY, so it can run against a live database without blocking
+writes. Safe to re-run: existing indexes are skipped and indexes left
+invalid by an interrupted build are rebuilt.
+"""
+
+from psycopg2 import errors
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from database import engine
+
+# GET /properties/search: full-text match on the generated search_vector column
+SEARCH_INDEX = ("idx_properties_search", "properties", "USING GIN (search_vector)")
+
+# (index name, table, definition) - each matches a query in main.py or lead_scoring.py
+INDEXES = [
+    # GET /properties and GET /admin/properties: ORDER BY created_at DESC, property_id DESC
+    ("idx_properties_created", "properties",
+     "(created_at DESC, property_id DESC)"),
+    # GET /agent/properties, agent-filtered /properties and /agent/stats counts
+    ("idx_properties_agent_created", "properties",
+     "(assigned_agent_id, created_at DESC, property_id DESC) INCLUDE (status)"),
+    # GET /agent/{public_url}: an agent's active properties, newest first
+    ("idx_properties_active_agent", "properties",
+     "(assigned_agent_id, created_at DESC) WHERE status = 'active'"),
+    # GET /agent/{public_url}: profile lookup
+    ("idx_agent_profiles_active_url", "agent_profiles",
+     "(public_url) WHERE is_active = TRUE"),
+    # GET /leads: ORDER BY created_date DESC, lead_id DESC
+    ("idx_lead_info_created", "lead_info",
+     "(created_date DESC, lead_id DESC)"),
+    # Agent-filtered GET /leads and the /agent/stats lead counts
+    ("idx_lead_info_agent_created", "lead_info",
+     "(assigned_agent_id, created_date DESC, lead_id DESC) INCLUDE (status)"),
+    # rescore_emails: DISTINCT ON (user_id) ... ORDER BY user_id, created_date DESC
+    ("idx_lead_info_user_created", "lead_info",
+     "(user_id, created_date DESC)"),
+    # Lead listings join display names by email
+    ("idx_user_basic_info_email", "user_basic_info",
+     "(email_id)"),
+    # GET /agent/leads: ORDER BY created_at DESC, lead_id DESC per agent
+    ("idx_leads_agent_created", "leads",
+     "(assigned_agent_id, created_at DESC, lead_id DESC)"),
+    # Interaction history by visitor; also covers rebuild_interaction_counts
+    ("idx_user_interactions_email_action", "user_interactions",
+     "(email, action_type) WHERE email IS NOT NULL"),
+    SEARCH_INDEX,
+]
+
+def create_index(conn, name, table, definition):
+    """Create one index concurrently; returns True if it was built"""
+    exists = conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table}).scalar()
+    if not exists:
+        print(f"⚠️ Skipping {name}: table {table} does not exist")
+        return False
+
+    valid = conn.execute(text("""
+        SELECT i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name
+    """), {"name": name}).scalar()
+    if valid:
+        print(f"✅ {name} already exists")
+        return False
+    if valid is False:
+        # Left behind by a failed CONCURRENTLY build
+        print(f"🔧 Dropping invalid index {name}")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    print(f"🚀 Creating {name} on {table}...")
+    try:
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}"))
+    except ProgrammingError as e:
+        # Tables created outside this repo may not have every column yet
+        if not isinstance(e.orig, errors.UndefinedColumn):
+            raise
+        print(f"⚠️ Skipping {name}: {e.orig}")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        return False
+    return True
+
+def apply_indexes(conn, indexes=INDEXES):
+    """Create every index in indexes on an autocommit connection; returns the number built"""
+    built = 0
+    for name, table, definition in indexes:
+        if create_index(conn, name, table, definition):
+            built += 1
+
+    for table in sorted({table for _, table, _ in indexes}):
+        if conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table}).scalar():
+            conn.execute(text(f"ANALYZE {table}"))
+    return built
+
+def create_indexes(indexes=INDEXES):
+    """Create every index in indexes; returns the number built"""
+    print("🔄 Creating query indexes...")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            built = apply_indexes(conn, indexes)
+            print(f"🎉 Index migration completed: {built} index(es) created")
+            return built
+
+        except Exception as e:
+            print(f"❌ Error creating indexes: {e}")
+            raise
+
+if __name__ == "__main__":
+    create_indexes()
@@ -0,0 +1,242 @@
+import os
+import re
+import time
+import logging
+import threading
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Statements slower than this are written to the slow-query log (0 disables it)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+slow_query_logger = logging.getLogger("crm.slow_query")
+
+# Histogram buckets: request duration in seconds, statements per request
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+class RequestStats:
+    """Database and serialization work done while serving one request"""
+    __slots__ = ("statements", "db_time", "pool_wait", "serialize_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.serialize_time = 0.0
+
+# Set by QueryMetricsMiddleware for the duration of each request
+_request_stats: ContextVar[RequestStats] = ContextVar("request_stats", default=None)
+
+def record_pool_wait(seconds: float):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+def record_serialization(seconds: float):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.serialize_time += seconds
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class QueryMetrics:
+    """Per-route request, SQL and serialization metrics in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.routes = {}
+        self.statements_total = 0
+        self.db_time_total = 0.0
+        self.slow_queries = 0
+
+    def record_statement(self, seconds: float):
+        with self._lock:
+            self.statements_total += 1
+            self.db_time_total += seconds
+
+    def record_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def record_request(self, method, route, status, duration, stats: RequestStats):
+        with self._lock:
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            entry = self.routes.get((method, route))
+            if entry is None:
+                entry = self.routes[(method, route)] = {
+                    "duration": Histogram(DURATION_BUCKETS),
+                    "statements": Histogram(STATEMENT_BUCKETS),
+                    "db_time": 0.0,
+                    "pool_wait": 0.0,
+                    "serialize_time": 0.0
+                }
+            entry["duration"].observe(duration)
+            entry["statements"].observe(stats.statements)
+            entry["db_time"] += stats.db_time
+            entry["pool_wait"] += stats.pool_wait
+            entry["serialize_time"] += stats.serialize_time
+
+    def render(self, gauges: dict = None) -> str:
+        """Exposition text; gauges adds extra {name: (help, value)} gauges"""
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, help_text, attr):
+            header(name, "histogram", help_text)
+            for (method, route), entry in sorted(self.routes.items()):
+                hist = entry[attr]
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {count}")
+                lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {hist.count}")
+                lines.append(f"{name}_sum{_labels(method=method, route=route)} {_number(hist.sum)}")
+                lines.append(f"{name}_count{_labels(method=method, route=route)} {hist.count}")
+
+        def per_route_counter(name, help_text, attr):
+            header(name, "counter", help_text)
+            for (method, route), entry in sorted(self.routes.items()):
+                lines.append(f"{name}{_labels(method=method, route=route)} {_number(entry[attr])}")
+
+        with self._lock:
+            header("crm_http_requests_total", "counter", "HTTP requests by route and status")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"crm_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+            histogram("crm_http_request_duration_seconds", "Time to serve a request, including a streamed body", "duration")
+            histogram("crm_db_statements_per_request", "SQL statements issued per request", "statements")
+            per_route_counter("crm_db_time_seconds_total", "Time spent executing SQL statements", "db_time")
+            per_route_counter("crm_db_pool_wait_seconds_total", "Time spent waiting for a pooled connection", "pool_wait")
+            per_route_counter("crm_serialization_seconds_total", "Time spent encoding JSON responses", "serialize_time")
+
+            header("crm_db_statements_total", "counter", "SQL statements issued, including background work")
+            lines.append(f"crm_db_statements_total {self.statements_total}")
+            header("crm_db_statement_seconds_total", "counter", "Time spent in SQL statements, including background work")
+            lines.append(f"crm_db_statement_seconds_total {_number(self.db_time_total)}")
+            header("crm_db_slow_queries_total", "counter", f"Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms)")
+            lines.append(f"crm_db_slow_queries_total {self.slow_queries}")
+
+        for name, (help_text, value) in (gauges or {}).items():
+            header(name, "gauge", help_text)
+            lines.append(f"{name} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+query_metrics = QueryMetrics()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+def redact_statement(statement: str) -> str:
+    """Collapse whitespace and replace inline string literals"""
+    return " ".join(_STRING_LITERAL.sub("'?'", statement).split())
+
+def redact_parameters(parameters, executemany=False):
+    """Keep parameter names and types, never values"""
+    if executemany and parameters:
+        # Describe the first row only
+        return [redact_parameters(parameters[0]), f"... {len(parameters)} rows"]
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    query_metrics.record_statement(elapsed)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        query_metrics.record_slow_query()
+        slow_query_logger.warning(
+            "Slow query (%.1f ms): %s params=%s",
+            elapsed * 1000, redact_statement(statement), redact_parameters(parameters, executemany)
+        )
+
+def _handle_error(exception_context):
+    # The statement failed, so after_cursor_execute will not pop its start time
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+def instrument_engine(engine):
+    """Time every statement run through engine (sync, or an AsyncEngine's sync_engine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+class QueryMetricsMiddleware:
+    """ASGI middleware that attributes SQL, pool and serialization time to each route
+
+    Pure ASGI rather than BaseHTTPMiddleware so streamed bodies, whose
+    queries run after the handler returns, are included.
+    """
+
+    def __init__(self, app, metrics: QueryMetrics = query_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get("route")
+            # Label by route template to keep the number of series bounded
+            self.metrics.record_request(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status,
+                time.perf_counter() - started,
+                stats
+            )
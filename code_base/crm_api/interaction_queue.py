@@ -0,0 +1,248 @@
+import os
+import json
+import asyncio
+from sqlalchemy import text
+from database import async_engine
+from lead_scoring import record_interaction_counts, rescore_emails
+
+INTERACTION_COLUMNS = [
+    "session_id", "action_type", "element_id", "page_url", "property_id",
+    "property_label", "phone", "email", "referrer", "user_agent", "engagement_score"
+]
+
+# asyncpg accepts at most 32767 bind parameters per statement
+MAX_INTERACTION_BATCH_SIZE = 32767 // len(INTERACTION_COLUMNS)
+
+# Queue configuration
+INTERACTION_BATCH_SIZE = min(int(os.getenv("INTERACTION_BATCH_SIZE", "500")), MAX_INTERACTION_BATCH_SIZE)
+INTERACTION_FLUSH_INTERVAL = float(os.getenv("INTERACTION_FLUSH_INTERVAL", "1.0"))
+INTERACTION_MAX_PENDING = int(os.getenv("INTERACTION_MAX_PENDING", "10000"))
+# Retries (with doubling backoff) of a flush that fails during shutdown
+INTERACTION_SHUTDOWN_RETRIES = int(os.getenv("INTERACTION_SHUTDOWN_RETRIES", "3"))
+# JSON lines file that interactions still unwritten at shutdown are appended
+# to and requeued from at the next start; empty drops them instead
+INTERACTION_SPILL_PATH = os.getenv("INTERACTION_SPILL_PATH", "interaction_spill.jsonl")
+
+def insert_interactions(conn, records):
+    """Insert interaction records with a single multi-row INSERT"""
+    values = []
+    params = {}
+    for i, record in enumerate(records):
+        values.append("(" + ", ".join(f":{column}_{i}" for column in INTERACTION_COLUMNS) + ")")
+        for column in INTERACTION_COLUMNS:
+            params[f"{column}_{i}"] = record.get(column)
+
+    conn.execute(text(f"""
+        INSERT INTO user_interactions ({', '.join(INTERACTION_COLUMNS)})
+        VALUES {', '.join(values)}
+    """), params)
+
+def flush_interactions(conn, records):
+    """Write a batch of interactions and update the affected lead scores"""
+    insert_interactions(conn, records)
+    record_interaction_counts(conn, records)
+    rescore_emails(conn, (record.get("email") for record in records))
+
+def is_record_error(e) -> bool:
+    """Whether a failed flush is the data's fault (SQLSTATE class 22 or 23) rather than the database's"""
+    sqlstate = getattr(getattr(e, "orig", None), "sqlstate", None) or ""
+    return sqlstate[:2] in ("22", "23")
+
+# Marks the end of the queue during shutdown
+_STOP = object()
+
+class InteractionQueue:
+    """In-process buffer that writes tracked interactions in batches
+
+    Interactions are accepted immediately by enqueue() and a background
+    worker flushes them every flush_interval seconds or as soon as
+    batch_size records are waiting. Lead scores are recomputed once per
+    flush for the emails that appeared in the batch.
+
+    A batch that fails twice is written in halves, recursively, so a
+    record the database rejects is dropped (counted in dead_lettered and
+    logged) instead of blocking every record queued behind it.
+
+    On shutdown a failing flush is retried shutdown_retries times; what
+    is still unwritten after that is spilled to spill_path and requeued
+    by the next start().
+    """
+
+    def __init__(self, batch_size=INTERACTION_BATCH_SIZE,
+                 flush_interval=INTERACTION_FLUSH_INTERVAL,
+                 max_pending=INTERACTION_MAX_PENDING,
+                 shutdown_retries=INTERACTION_SHUTDOWN_RETRIES,
+                 spill_path=INTERACTION_SPILL_PATH):
+        self.batch_size = min(batch_size, MAX_INTERACTION_BATCH_SIZE)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.shutdown_retries = shutdown_retries
+        self.spill_path = spill_path
+        self._queue = None
+        self._worker = None
+        self._accepting = False
+        self.dead_lettered = 0
+
+    def enqueue(self, record) -> bool:
+        """Accept an interaction; returns False when the queue is full or stopped"""
+        if not self._accepting:
+            return False
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Start the background flush worker, requeuing interactions spilled at the last shutdown"""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._requeue_spilled()
+        self._worker = asyncio.create_task(self._run())
+        self._accepting = True
+
+    async def stop(self):
+        """Stop accepting work and wait until everything queued is flushed"""
+        if self._worker is None:
+            return
+        self._accepting = False
+        await self._queue.put(_STOP)
+        await self._worker
+        self._worker = None
+        self._queue = None
+
+    async def _collect(self):
+        """Wait for the next batch; returns (batch, stopping)"""
+        record = await self._queue.get()
+        if record is _STOP:
+            return [], True
+
+        batch = [record]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                record = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if record is _STOP:
+                return batch, True
+            batch.append(record)
+        return batch, False
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            failures = 0
+            while batch:
+                if failures:
+                    # Failed before: write it in pieces so one bad record can't block the rest
+                    batch = await self._flush_isolating(batch)
+                    if not batch:
+                        break
+                    error = "database unavailable"
+                else:
+                    try:
+                        await self._flush(batch)
+                        break
+                    except Exception as e:
+                        error = e
+                failures += 1
+                if stopping or not self._accepting:
+                    if failures > self.shutdown_retries:
+                        # Nothing else will be written either; keep it all for the next start
+                        self._spill(batch + self._drain(), error)
+                        stopping = True
+                        break
+                    delay = self.flush_interval * 2 ** (failures - 1)
+                    print(f"❌ Failed to flush {len(batch)} interactions at shutdown, retrying in {delay:g}s: {error}")
+                    await asyncio.sleep(delay)
+                    continue
+                print(f"❌ Failed to flush {len(batch)} interactions, retrying: {error}")
+                await asyncio.sleep(self.flush_interval)
+
+    def _drain(self):
+        """Take every record still queued, up to the stop marker"""
+        records = []
+        while not self._queue.empty():
+            record = self._queue.get_nowait()
+            if record is _STOP:
+                break
+            records.append(record)
+        return records
+
+    def _spill(self, records, error):
+        """Append records to spill_path for the next start(), or drop them without one"""
+        if self.spill_path:
+            try:
+                with open(self.spill_path, "a") as f:
+                    f.writelines(json.dumps(record) + "\n" for record in records)
+                print(f"⚠️ Spilled {len(records)} unwritten interactions to {self.spill_path}: {error}")
+                return
+            except OSError as e:
+                error = e
+        print(f"❌ Dropping {len(records)} interactions after failed final flush: {error}")
+
+    def _requeue_spilled(self):
+        """Queue the interactions a previous shutdown spilled, keeping any that don't fit"""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        # Claim the file first so another worker process doesn't requeue it too
+        claimed = f"{self.spill_path}.{os.getpid()}"
+        try:
+            os.replace(self.spill_path, claimed)
+        except FileNotFoundError:
+            return
+        records = []
+        with open(claimed) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A line cut short when the process died mid-spill
+                    print(f"❌ Skipping unreadable spilled interaction: {line!r}")
+        for index, record in enumerate(records):
+            try:
+                self._queue.put_nowait(record)
+            except asyncio.QueueFull:
+                self._spill(records[index:], "queue full")
+                break
+        os.remove(claimed)
+        print(f"🔄 Requeued {min(len(records), self.max_pending)} interactions spilled at the last shutdown")
+
+    async def _flush_isolating(self, batch):
+        """Flush batch in ever smaller pieces, dropping records that fail on their own
+
+        Returns the records still unwritten when an error that isn't
+        about the data (such as a lost connection) stops it.
+        """
+        pieces = [batch]
+        while pieces:
+            piece = pieces.pop()
+            try:
+                await self._flush(piece)
+            except Exception as e:
+                if len(piece) > 1:
+                    middle = len(piece) // 2
+                    pieces += [piece[middle:], piece[:middle]]
+                elif is_record_error(e):
+                    self.dead_lettered += 1
+                    print(f"❌ Dropping interaction rejected by the database: {piece[0]!r}: {e}")
+                else:
+                    return [record for rest in pieces for record in rest] + piece
+        return []
+
+    async def _flush(self, batch):
+        async with async_engine.begin() as conn:
+            await conn.run_sync(flush_interactions, batch)
+
+interaction_queue = InteractionQueue()
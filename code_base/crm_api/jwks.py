@@ -0,0 +1,100 @@
+import os
+import time
+import asyncio
+from jose import jwt, JWTError
+from http_client import get_http_client
+
+# Signing keys for Google and Microsoft ID tokens
+GOOGLE_JWKS_URL = os.getenv("GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+MICROSOFT_JWKS_URL = os.getenv(
+    "MICROSOFT_JWKS_URL",
+    f"https://login.microsoftonline.com/{os.getenv('MICROSOFT_TENANT_ID', 'common')}/discovery/v2.0/keys"
+)
+JWKS_REFRESH_INTERVAL = float(os.getenv("JWKS_REFRESH_INTERVAL", "3600"))
+
+# Unknown key ids trigger a refetch at most this often
+JWKS_MIN_REFETCH_INTERVAL = 60
+
+class JWKSCache:
+    """Signing keys from a provider's JWKS endpoint, keyed by kid"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys = {}
+        self._fetched_at = None
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        response = await get_http_client().get(self.url)
+        response.raise_for_status()
+        self._keys = {key["kid"]: key for key in response.json().get("keys", []) if "kid" in key}
+        self._fetched_at = time.monotonic()
+
+    def _can_refetch(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at >= JWKS_MIN_REFETCH_INTERVAL
+
+    async def get_key(self, kid: str):
+        """Key for kid, refetching once when it is not known (e.g. after rotation)"""
+        key = self._keys.get(kid)
+        if key is None and self._can_refetch():
+            async with self._lock:
+                if kid not in self._keys and self._can_refetch():
+                    await self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    async def decode(self, token: str, audience: str, issuer=None) -> dict:
+        """Verify a token's signature and standard claims locally; returns its claims"""
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = await self.get_key(kid)
+        if key is None:
+            raise JWTError("Unknown signing key")
+        # The algorithm comes from the key, never from the token header
+        return jwt.decode(
+            token, key,
+            algorithms=[key.get("alg", "RS256")],
+            audience=audience,
+            issuer=issuer,
+            options={"verify_at_hash": False}
+        )
+
+google_jwks = JWKSCache(GOOGLE_JWKS_URL)
+microsoft_jwks = JWKSCache(MICROSOFT_JWKS_URL)
+
+class JWKSRefresher:
+    """Background task that keeps the JWKS caches warm"""
+
+    def __init__(self, caches, interval: float = JWKS_REFRESH_INTERVAL):
+        self.caches = caches
+        self.interval = interval
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            for cache in self.caches:
+                try:
+                    await cache.refresh()
+                except Exception as e:
+                    print(f"⚠️ Failed to refresh signing keys from {cache.url}: {e}")
+            await asyncio.sleep(self.interval)
+
+# Only providers with a configured client id are kept warm
+jwks_refresher = JWKSRefresher([
+    cache for cache, client_id in (
+        (google_jwks, os.getenv("GOOGLE_CLIENT_ID")),
+        (microsoft_jwks, os.getenv("MICROSOFT_CLIENT_ID"))
+    ) if client_id
+])
@@ -0,0 +1,172 @@
+from sqlalchemy import text
+from scoring_config import get_scoring_config
+
+# Max rows per bulk UPDATE statement
+SCORE_UPDATE_CHUNK_SIZE = 1000
+
+INTERACTION_COUNTS_QUERY = """
+    SELECT email, action_type, interaction_count as count
+    FROM interaction_counts
+    WHERE email = ANY(:emails) AND interaction_count > 0
+"""
+
+# The most recent lead of each email, which provides the lead features
+LATEST_LEADS_QUERY = """
+    SELECT DISTINCT ON (l.user_id)
+        l.user_id as email,
+        l.lead_comments,
+        u.display_name as customer_name,
+        l.created_date
+    FROM lead_info l
+    LEFT JOIN user_basic_info u ON l.user_id = u.email_id
+    WHERE l.user_id = ANY(:emails)
+    ORDER BY l.user_id, l.created_date DESC
+"""
+
+# Lead scoring function
+def calculate_lead_score(lead_data, interactions=None, config=None):
+    """Score a lead with the current weights (see scoring_config.py)"""
+    return (config or get_scoring_config()).score(lead_data, interactions)
+
+def fetch_interaction_counts(conn, emails):
+    """Get per-action interaction counts for a set of emails in one query
+
+    Reads the running totals in interaction_counts, so the cost does not
+    grow with each visitor's interaction history.
+    """
+    emails = [email for email in set(emails) if email]
+    if not emails:
+        return {}
+
+    result = conn.execute(text(INTERACTION_COUNTS_QUERY), {"emails": emails})
+
+    interactions_by_email = {}
+    for r in result:
+        interactions_by_email.setdefault(r.email, []).append(
+            {"action_type": r.action_type, "count": r.count}
+        )
+    return interactions_by_email
+
+def record_interaction_counts(conn, records):
+    """Add the interactions in a batch to the running per-email counts"""
+    deltas = {}
+    for record in records:
+        if record.get("email"):
+            key = (record["email"], record["action_type"])
+            deltas[key] = deltas.get(key, 0) + 1
+    if not deltas:
+        return
+
+    values = []
+    params = {}
+    # Sorted so concurrent flushes lock the count rows in the same order
+    for i, ((email, action_type), count) in enumerate(sorted(deltas.items())):
+        values.append(f"(:email_{i}, :action_type_{i}, :count_{i})")
+        params[f"email_{i}"] = email
+        params[f"action_type_{i}"] = action_type
+        params[f"count_{i}"] = count
+
+    conn.execute(text(f"""
+        INSERT INTO interaction_counts (email, action_type, interaction_count)
+        VALUES {', '.join(values)}
+        ON CONFLICT (email, action_type)
+        DO UPDATE SET
+            interaction_count = interaction_counts.interaction_count + EXCLUDED.interaction_count,
+            updated_at = NOW()
+    """), params)
+
+def write_lead_scores(conn, scores, key="lead_id", version=None):
+    """Bulk update lead_info scores from (key, score) pairs
+
+    key is either lead_id or user_id (the lead's email). Each score is
+    stamped with version, the weights version it was computed with.
+    """
+    key_type = {"lead_id": "INTEGER", "user_id": "VARCHAR"}[key]
+    version = version or get_scoring_config().version
+    # Sorted by key so concurrent writers lock the lead rows in the same order
+    scores = sorted(scores, key=lambda pair: pair[0])
+    for start in range(0, len(scores), SCORE_UPDATE_CHUNK_SIZE):
+        chunk = scores[start:start + SCORE_UPDATE_CHUNK_SIZE]
+        values = []
+        params = {"version": version}
+        for i, (key_value, score) in enumerate(chunk):
+            values.append(f"(CAST(:key_{i} AS {key_type}), CAST(:score_{i} AS INTEGER))")
+            params[f"key_{i}"] = key_value
+            params[f"score_{i}"] = score
+
+        conn.execute(text(f"""
+            UPDATE lead_info AS l
+            SET lead_score = v.score, score_version = :version
+            FROM (VALUES {', '.join(values)}) AS v(key, score)
+            WHERE l.{key} = v.key
+              AND (l.lead_score IS DISTINCT FROM v.score OR l.score_version IS DISTINCT FROM :version)
+        """), params)
+    return len(scores)
+
+def score_leads(conn, rows):
+    """Score a batch of lead rows and persist only the scores that changed
+
+    Each row needs lead_id, email, customer_name, lead_comments, created_date,
+    lead_score and score_version. Returns a dict of lead_id -> score.
+    """
+    config = get_scoring_config()
+    interactions_by_email = fetch_interaction_counts(conn, (row.email for row in rows))
+
+    scores = {}
+    changed = []
+    for row in rows:
+        lead_data = {
+            "lead_comments": row.lead_comments,
+            "user_id": row.email,
+            "customer_name": row.customer_name,
+            "created_date": row.created_date
+        }
+        lead_score = calculate_lead_score(lead_data, interactions_by_email.get(row.email), config)
+        scores[row.lead_id] = lead_score
+        if row.lead_score != lead_score or row.score_version != config.version:
+            changed.append((row.lead_id, lead_score))
+
+    write_lead_scores(conn, changed, version=config.version)
+    return scores
+
+def rescore_emails(conn, emails):
+    """Recompute lead scores for every lead belonging to the given emails
+
+    Mirrors the per-interaction update: the most recent lead for an email
+    provides the lead features and the score is written to all its leads.
+    Returns a dict of email -> score.
+    """
+    emails = [email for email in set(emails) if email]
+    if not emails:
+        return {}
+
+    result = conn.execute(text(LATEST_LEADS_QUERY), {"emails": emails})
+    rows = result.fetchall()
+
+    config = get_scoring_config()
+    interactions_by_email = fetch_interaction_counts(conn, (row.email for row in rows))
+
+    scores = {}
+    for row in rows:
+        lead_data = {
+            "lead_comments": row.lead_comments,
+            "user_id": row.email,
+            "customer_name": row.customer_name,
+            "created_date": row.created_date
+        }
+        scores[row.email] = calculate_lead_score(lead_data, interactions_by_email.get(row.email), config)
+
+    write_lead_scores(conn, scores.items(), key="user_id", version=config.version)
+    return scores
+
+def rebuild_interaction_counts(conn):
+    """Recompute interaction_counts from the full user_interactions history"""
+    conn.execute(text("DELETE FROM interaction_counts"))
+    result = conn.execute(text("""
+        INSERT INTO interaction_counts (email, action_type, interaction_count)
+        SELECT email, action_type, COUNT(*)
+        FROM user_interactions
+        WHERE email IS NOT NULL
+        GROUP BY email, action_type
+    """))
+    return result.rowcount
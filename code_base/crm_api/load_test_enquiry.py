@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Enquiry Load Test
+Fires concurrent POST /enquiry requests at a running API and reports
+latency percentiles. Half the requests are sent as an agent (the path
+that also creates and assigns a customer) when --agent-email is given.
+
+Usage:
+    python load_test_enquiry.py [--url URL] [--requests N] [--concurrency C]
+                                [--property-id ID] [--agent-email EMAIL]
+"""
+
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+import httpx
+from sqlalchemy import text
+from database import engine
+from auth_utils import create_access_token
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    return samples[min(len(samples) - 1, max(0, round(pct / 100 * len(samples)) - 1))]
+
+def agent_headers(email):
+    """Bearer header for an existing agent, or {} if there is none"""
+    if not email:
+        return {}
+    with engine.connect() as conn:
+        user_id = conn.execute(
+            text("SELECT user_id FROM users WHERE email = :email AND role = 'agent'"),
+            {"email": email}
+        ).scalar()
+    if user_id is None:
+        raise SystemExit(f"❌ No agent with email {email}")
+    token = create_access_token({"sub": email, "user_id": user_id, "role": "agent"})
+    return {"Authorization": f"Bearer {token}"}
+
+async def load_test_enquiry(url, requests, concurrency, property_id=None, agent_email=None):
+    """Send requests enquiries with at most concurrency in flight; returns latencies in ms"""
+    headers = agent_headers(agent_email)
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def send(client, i):
+        nonlocal errors
+        payload = {
+            "name": f"Load Test {i}",
+            "email": f"loadtest-{run_id}-{i}@example.com",
+            "message": "Load test enquiry",
+            "property_id": property_id
+        }
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/enquiry", json=payload, headers=headers if i % 2 else {})
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    print(f"🔄 Sending {requests} enquiries to {url} ({concurrency} concurrent)...")
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(send(client, i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"📊 {requests / elapsed:.0f} req/s, {errors} error(s)")
+    print(f"📊 p50 {percentile(latencies, 50):.1f} ms  p95 {percentile(latencies, 95):.1f} ms  "
+          f"p99 {percentile(latencies, 99):.1f} ms  mean {statistics.mean(latencies):.1f} ms")
+    return latencies
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test POST /enquiry")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--property-id", type=int)
+    parser.add_argument("--agent-email")
+    args = parser.parse_args()
+    asyncio.run(load_test_enquiry(args.url, args.requests, args.concurrency, args.property_id, args.agent_email))
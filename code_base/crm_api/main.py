@@ -1,32 +1,54 @@
 from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, Response
+from pydantic import BaseModel, Field
 from typing import List, Optional
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
 import os
 from dotenv import load_dotenv
 from datetime import datetime
-from database import engine
+from database import async_engine, get_db, db_connection, pool_metrics
+from migrations import check_schema_version
+from instrumentation import QueryMetricsMiddleware, query_metrics
+from serialization import FastJSONResponse
+from http_client import close_http_client
+from jwks import jwks_refresher
+from dashboard_stats import read_stats, stats_refresher
+from lead_scoring import score_leads
+from scoring_config import scoring_config, get_scoring_config
+from interaction_queue import interaction_queue
+from pagination import decode_cursor, next_cursor, count_rows
+from property_search import PRICE_BUCKETS, facet_query, build_facets
+from streaming import STREAM_CHUNK_SIZE, stream_rows, stream_json_array
+from cache import response_cache, property_key, agent_page_key
+from bulk_properties import MAX_BULK_ITEMS, bulk_create, bulk_update, bulk_approve, bulk_assign
+from catalog import property_catalog, encode_entries, encode_page
+from queries import (
+    PROPERTY_COLUMNS, AGENT_PROPERTY_COLUMNS, PUBLIC_PROPERTY_COLUMNS, LEAD_COLUMNS, PROPERTY_DETAIL_QUERY,
+    AGENT_PROPERTY_COUNT_QUERY, AGENT_PROFILE_QUERY, AGENT_PAGE_PROPERTIES_QUERY, AGENT_LEAD_COUNT_QUERY,
+    SEARCH_FILTER, SEARCH_RANK, keyset_filter, property_order_by, lead_order_by, property_query,
+    property_count_query, search_query, agent_property_query, agent_lead_query, lead_query, lead_count_query
+)
 from auth_utils import (
     verify_google_token, 
     verify_microsoft_token,
     create_access_token, 
     get_or_create_user,
     get_current_user,
-    require_admin,
-    verify_token,
-    security
+    get_optional_user,
+    require_admin
 )
 from models import (
     GoogleAuthRequest, MicrosoftAuthRequest, LoginResponse, User, Property, PropertyCreate, PropertyUpdate,
-    PropertyAssignment, AgentProfile, AgentProfileCreate, AgentProfileUpdate,
+    PropertyAssignment, PropertyBulkCreate, PropertyBulkUpdate, PropertyBulkApprove, PropertyBulkAssign, AgentProfile, AgentProfileCreate, AgentProfileUpdate,
     Lead, LeadCreate, LeadUpdate, EnquiryCreate, Enquiry, TokenData
 )
 
 load_dotenv()
 
-app = FastAPI(title="Real Estate CRM API")
+app = FastAPI(title="Real Estate CRM API", default_response_class=FastJSONResponse)
 
 # Dynamic CORS middleware - allows all subdomains of z21crm.com and localhost
 app.add_middleware(
@@ -37,6 +59,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route statement counts, DB/pool/serialization time for /metrics
+app.add_middleware(QueryMetricsMiddleware)
+
+@app.on_event("startup")
+async def verify_schema_version():
+    # Migrations run from update_database_schema.py, not on import
+    await check_schema_version(async_engine)
+
+@app.on_event("startup")
+async def load_scoring_config():
+    # Fail fast on a bad SCORING_CONFIG_PATH; later changes are picked up without a restart
+    config = scoring_config.reload(force=True)
+    print(f"✅ Lead scoring weights version {config.version}")
+
+@app.on_event("startup")
+async def start_jwks_refresher():
+    # Fetches OAuth signing keys in the background so logins verify locally
+    await jwks_refresher.start()
+
+@app.on_event("startup")
+async def start_stats_refresher():
+    # Keeps the dashboard_stats view within STATS_MAX_AGE
+    await stats_refresher.start()
+
+@app.on_event("startup")
+async def start_interaction_queue():
+    await interaction_queue.start()
+
+@app.on_event("startup")
+async def start_property_catalog():
+    # With PROPERTY_CATALOG=true, public property reads are served from memory once it has loaded
+    await property_catalog.start()
+
+@app.on_event("shutdown")
+async def drain_interaction_queue():
+    # Flush every queued interaction before the worker exits
+    await interaction_queue.stop()
+
+@app.on_event("shutdown")
+async def stop_stats_refresher():
+    await stats_refresher.stop()
+
+@app.on_event("shutdown")
+async def stop_property_catalog():
+    await property_catalog.stop()
+
+@app.on_event("shutdown")
+async def close_database_pool():
+    await async_engine.dispose()
+
+@app.on_event("shutdown")
+async def close_outbound_clients():
+    await jwks_refresher.stop()
+    await close_http_client()
+
 # Pydantic models for existing functionality
 class Enquiry(BaseModel):
     name: str
@@ -70,22 +147,23 @@ class LeadDetail(BaseModel):
     created_date: Optional[str] = None
     lead_comments: Optional[str] = None
 
+# Limits match the user_interactions columns, so a queued interaction can't fail its insert
 class Interaction(BaseModel):
-    sessionId: str
-    action: str
+    sessionId: str = Field(max_length=255)
+    action: str = Field(max_length=50)
     timestamp: str
-    page: str
+    page: str = Field(max_length=500)
     userAgent: str
-    element: Optional[str] = None
-    propertyId: Optional[str] = None
-    propertyLabel: Optional[str] = None
-    phone: Optional[str] = None
-    email: Optional[str] = None
-    referrer: Optional[str] = None
+    element: Optional[str] = Field(None, max_length=100)
+    propertyId: Optional[str] = Field(None, max_length=50)
+    propertyLabel: Optional[str] = Field(None, max_length=255)
+    phone: Optional[str] = Field(None, max_length=50)
+    email: Optional[str] = Field(None, max_length=255)
+    referrer: Optional[str] = Field(None, max_length=500)
 
 # Authentication endpoints
 @app.post("/auth/google", response_model=LoginResponse)
-async def google_auth(request: GoogleAuthRequest):
+async def google_auth(request: GoogleAuthRequest, conn: AsyncConnection = Depends(get_db)):
     """Authenticate user with Google OAuth"""
     try:
         # Verify Google token
@@ -97,21 +175,14 @@ async def google_auth(request: GoogleAuthRequest):
                 detail="Email not verified with Google"
             )
         
-        # Check if user exists in database
-        with engine.begin() as conn:
-            result = conn.execute(
-                text("SELECT * FROM users WHERE email = :email"),
-                {"email": user_info["email"]}
-            ).fetchone()
-            
-            if not result:
-                raise HTTPException(
-                    status_code=401, 
-                    detail="User not found. Please contact an administrator to create your account."
-                )
-        
-        # Get existing user (don't create new ones)
-        user = await get_or_create_user(user_info)
+        # Log in an existing user; admins sign up only with ALLOW_ADMIN_SIGNUP
+        user = await get_or_create_user(conn, user_info)
+        if not user:
+            raise HTTPException(
+                status_code=401, 
+                detail="User not found. Please contact an administrator to create your account."
+            )
+        await conn.commit()
         
         # Create access token
         access_token = create_access_token(
@@ -124,7 +195,7 @@ async def google_auth(request: GoogleAuthRequest):
         raise HTTPException(status_code=400, detail="Authentication failed")
 
 @app.post("/auth/microsoft", response_model=LoginResponse)
-async def microsoft_auth(request: MicrosoftAuthRequest):
+async def microsoft_auth(request: MicrosoftAuthRequest, conn: AsyncConnection = Depends(get_db)):
     """Authenticate user with Microsoft OAuth"""
     try:
         print(f"🔐 Microsoft auth request received for access token: {request.access_token[:20]}...")
@@ -139,24 +210,15 @@ async def microsoft_auth(request: MicrosoftAuthRequest):
                 detail="Email not verified with Microsoft"
             )
         
-        # Check if user exists in database
-        with engine.begin() as conn:
-            result = conn.execute(
-                text("SELECT * FROM users WHERE email = :email"),
-                {"email": user_info["email"]}
-            ).fetchone()
-            
-            if not result:
-                print(f"🔐 User not found in database: {user_info['email']}")
-                raise HTTPException(
-                    status_code=401, 
-                    detail="User not found. Please contact an administrator to create your account."
-                )
-            
-            print(f"🔐 User found in database: {result.email}")
-        
-        # Get existing user (don't create new ones)
-        user = await get_or_create_user(user_info)
+        # Log in an existing user; admins sign up only with ALLOW_ADMIN_SIGNUP
+        user = await get_or_create_user(conn, user_info)
+        if not user:
+            print(f"🔐 User not found in database: {user_info['email']}")
+            raise HTTPException(
+                status_code=401, 
+                detail="User not found. Please contact an administrator to create your account."
+            )
+        await conn.commit()
         print(f"🔐 User object created: {user.email}")
         
         # Create access token
@@ -189,306 +251,376 @@ async def logout():
 
 # Admin-only endpoints
 @app.get("/admin/users")
-async def list_users(current_user = Depends(require_admin)):
+async def list_users(current_user = Depends(require_admin), conn: AsyncConnection = Depends(get_db)):
     """List all users (admin only)"""
-    with engine.begin() as conn:
-        result = conn.execute(text("SELECT * FROM users ORDER BY created_at DESC"))
-        users = result.fetchall()
-        
-        return [
-            {
-                "user_id": user.user_id,
-                "email": user.email,
-                "name": user.name,
-                "role": user.role,
-                "profile_picture": user.profile_picture,
-                "created_at": user.created_at,
-                "last_login": user.last_login,
-                "is_active": user.is_active
-            }
-            for user in users
-        ]
+    result = await conn.execute(text("SELECT * FROM users ORDER BY created_at DESC"))
+    users = result.fetchall()
+    
+    return [
+        {
+            "user_id": user.user_id,
+            "email": user.email,
+            "name": user.name,
+            "role": user.role,
+            "profile_picture": user.profile_picture,
+            "created_at": user.created_at,
+            "last_login": user.last_login,
+            "is_active": user.is_active
+        }
+        for user in users
+    ]
 
 @app.post("/admin/users")
 async def create_user(
     user_data: dict,
-    current_user = Depends(require_admin)
+    current_user = Depends(require_admin),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Create new user (admin only)"""
     try:
-        with engine.begin() as conn:
-            # Check if email already exists
-            existing_user = conn.execute(
-                text("SELECT user_id FROM users WHERE email = :email"),
-                {"email": user_data["email"]}
-            ).fetchone()
-            
-            if existing_user:
-                raise HTTPException(status_code=400, detail="User with this email already exists")
-            
-            # Create new user
-            result = conn.execute(text("""
-                INSERT INTO users (email, name, role, created_at, last_login)
-                VALUES (:email, :name, :role, NOW(), NOW())
-                RETURNING *
-            """), {
-                "email": user_data["email"],
-                "name": user_data["name"],
-                "role": user_data.get("role", "agent")
-            })
-            
-            new_user = result.fetchone()
-            
-                    # Create agent profile if role is agent
+        # Check if email already exists
+        existing_user = (await conn.execute(
+            text("SELECT user_id FROM users WHERE email = :email"),
+            {"email": user_data["email"]}
+        )).fetchone()
+        
+        if existing_user:
+            raise HTTPException(status_code=400, detail="User with this email already exists")
+        
+        # Create new user
+        result = await conn.execute(text("""
+            INSERT INTO users (email, name, role, created_at, last_login)
+            VALUES (:email, :name, :role, NOW(), NOW())
+            RETURNING *
+        """), {
+            "email": user_data["email"],
+            "name": user_data["name"],
+            "role": user_data.get("role", "agent")
+        })
+        
+        new_user = result.fetchone()
+        
+        # Create agent profile if role is agent
         if user_data.get("role") == "agent":
             try:
                 # Generate a unique public_url based on user name
                 public_url = f"agent-{new_user.user_id}-{user_data.get('name', '').lower().replace(' ', '-')}"
                 
-                conn.execute(text("""
-                    INSERT INTO agent_profiles (
-                        user_id, public_url, phone, specialization, bio, created_at
-                    ) VALUES (
-                        :user_id, :public_url, :phone, :specialization, :bio, NOW()
-                    )
-                """), {
-                    "user_id": new_user.user_id,
-                    "public_url": public_url,
-                    "phone": user_data.get("phone", ""),
-                    "specialization": user_data.get("specialization", ""),
-                    "bio": user_data.get("bio", "")
-                })
+                # Savepoint so a failed profile insert keeps the new user
+                async with conn.begin_nested():
+                    await conn.execute(text("""
+                        INSERT INTO agent_profiles (
+                            user_id, public_url, phone, specialization, bio, created_at
+                        ) VALUES (
+                            :user_id, :public_url, :phone, :specialization, :bio, NOW()
+                        )
+                    """), {
+                        "user_id": new_user.user_id,
+                        "public_url": public_url,
+                        "phone": user_data.get("phone", ""),
+                        "specialization": user_data.get("specialization", ""),
+                        "bio": user_data.get("bio", "")
+                    })
             except Exception as e:
                 # Continue without agent profile if table doesn't exist
                 pass
-            
-            return {
-                "message": "User created successfully",
-                "user_id": new_user.user_id,
-                "email": new_user.email,
-                "name": new_user.name,
-                "role": new_user.role
-            }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-
-@app.get("/admin/stats")
-async def get_admin_stats(current_user = Depends(require_admin)):
-    """Get admin dashboard stats"""
-    with engine.begin() as conn:
-        # Get total properties
-        properties_result = conn.execute(text("SELECT COUNT(*) FROM properties"))
-        total_properties = properties_result.fetchone()[0]
-        
-        # Get total users
-        users_result = conn.execute(text("SELECT COUNT(*) FROM users"))
-        total_users = users_result.fetchone()[0]
-        
-        # Get total leads
-        leads_result = conn.execute(text("SELECT COUNT(*) FROM leads"))
-        total_leads = leads_result.fetchone()[0]
         
-        # Get pending properties (created by agents, not yet approved)
-        pending_result = conn.execute(text("SELECT COUNT(*) FROM properties WHERE status = 'pending'"))
-        pending_properties = pending_result.fetchone()[0]
+        await conn.commit()
         
         return {
-            "totalProperties": total_properties,
-            "totalUsers": total_users,
-            "totalLeads": total_leads,
-            "pendingProperties": pending_properties
+            "message": "User created successfully",
+            "user_id": new_user.user_id,
+            "email": new_user.email,
+            "name": new_user.name,
+            "role": new_user.role
         }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get("/admin/stats")
+async def get_admin_stats(current_user = Depends(require_admin), conn: AsyncConnection = Depends(get_db)):
+    """Get admin dashboard stats (from dashboard_stats, at most STATS_MAX_AGE old)"""
+    stats = await read_stats(conn)
+    
+    return {
+        "totalProperties": stats.total_properties,
+        "totalUsers": stats.total_users,
+        "totalLeads": stats.total_leads,
+        # Created by agents, not yet approved
+        "pendingProperties": stats.pending_properties
+    }
+
+@app.get("/admin/db-pool")
+async def get_db_pool_stats(current_user = Depends(require_admin)):
+    """Get connection pool usage and checkout-wait stats (admin only)"""
+    return pool_metrics.snapshot(async_engine)
+
+@app.get("/admin/scoring")
+async def get_scoring_weights(current_user = Depends(require_admin), conn: AsyncConnection = Depends(get_db)):
+    """Current lead scoring weights and how many stored scores were computed with other weights"""
+    config = get_scoring_config()
+    stale_scores = (await conn.execute(text("""
+        SELECT COUNT(*) FROM lead_info WHERE score_version IS DISTINCT FROM :version
+    """), {"version": config.version})).scalar()
+    
+    return {
+        "version": config.version,
+        "weights": config.weights,
+        "stale_scores": stale_scores
+    }
+
+@app.post("/admin/scoring/reload")
+async def reload_scoring_weights(current_user = Depends(require_admin)):
+    """Reload SCORING_CONFIG_PATH now instead of within SCORING_RELOAD_INTERVAL"""
+    try:
+        config = scoring_config.reload(force=True)
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not load scoring weights: {e}")
+    
+    return {"version": config.version, "weights": config.weights}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics: per-route SQL statements and timings plus pool usage"""
+    pool = pool_metrics.snapshot(async_engine)
+    return query_metrics.render({
+        "crm_db_pool_checked_out": ("Connections currently checked out", pool["checked_out"]),
+        "crm_db_pool_size": ("Configured pool size", pool["pool_size"]),
+        "crm_db_pool_overflow": ("Connections open beyond pool_size", pool["overflow"]),
+        "crm_db_pool_checkout_timeouts": ("Checkouts that timed out since startup", pool["checkout_timeouts"])
+    })
 
 @app.get("/agent/stats")
-async def get_agent_stats(current_user = Depends(get_current_user)):
+async def get_agent_stats(current_user = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Get agent dashboard stats"""
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Agent access required")
     
-    with engine.begin() as conn:
-        # Get total properties assigned to this agent
-        properties_result = conn.execute(text("""
-            SELECT COUNT(*) FROM properties 
-            WHERE assigned_agent_id = :agent_id
-        """), {"agent_id": current_user.user_id})
-        total_properties = properties_result.fetchone()[0]
-        
-        # Get total leads assigned to this agent
-        leads_result = conn.execute(text("""
-            SELECT COUNT(*) FROM lead_info 
-            WHERE assigned_agent_id = :agent_id
-        """), {"agent_id": current_user.user_id})
-        total_leads = leads_result.fetchone()[0]
-        
-        # Get pending leads for this agent
-        pending_leads_result = conn.execute(text("""
-            SELECT COUNT(*) FROM lead_info 
-            WHERE assigned_agent_id = :agent_id AND status = 'new'
-        """), {"agent_id": current_user.user_id})
-        pending_leads = pending_leads_result.fetchone()[0]
-        
-        # Calculate conversion rate
-        conversion_rate = 0
-        if total_leads > 0:
-            conversion_rate = round(((total_leads - pending_leads) / total_leads) * 100)
-        
-        return {
-            "totalProperties": total_properties,
-            "totalLeads": total_leads,
-            "pendingLeads": pending_leads,
-            "conversionRate": conversion_rate
-        }
+    # Agents with no properties or leads have no row yet
+    stats = await read_stats(conn, current_user.user_id)
+    total_properties = stats.total_properties if stats else 0
+    total_leads = stats.lead_count if stats else 0
+    pending_leads = stats.new_lead_count if stats else 0
+    
+    # Calculate conversion rate
+    conversion_rate = 0
+    if total_leads > 0:
+        conversion_rate = round(((total_leads - pending_leads) / total_leads) * 100)
+    
+    return {
+        "totalProperties": total_properties,
+        "totalLeads": total_leads,
+        "pendingLeads": pending_leads,
+        "conversionRate": conversion_rate
+    }
 
 @app.put("/admin/users/{user_id}/role")
 async def update_user_role(
     user_id: int, 
     role_data: dict,
-    current_user = Depends(require_admin)
+    current_user = Depends(require_admin),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Update user role (admin only)"""
     role = role_data.get("role")
     if not role or role not in ["admin", "agent"]:
         raise HTTPException(status_code=400, detail="Invalid role")
     
-    with engine.begin() as conn:
-        result = conn.execute(
-            text("UPDATE users SET role = :role WHERE user_id = :user_id RETURNING *"),
-            {"role": role, "user_id": user_id}
-        ).fetchone()
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        return {"message": "User role updated successfully"}
+    result = (await conn.execute(
+        text("UPDATE users SET role = :role WHERE user_id = :user_id RETURNING *"),
+        {"role": role, "user_id": user_id}
+    )).fetchone()
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    await conn.commit()
+    return {"message": "User role updated successfully"}
 
 # Admin Property Management
 @app.get("/admin/properties")
 async def admin_list_properties(
     current_user = Depends(require_admin),
     page: int = Query(1, ge=1),
-    page_size: int = Query(100, ge=1, le=1000)
+    page_size: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    count: Optional[str] = Query(None, pattern="^(exact|approximate|none)$"),
+    conn: AsyncConnection = Depends(get_db)
 ):
-    """List all properties (admin only)"""
-    offset = (page - 1) * page_size
+    """List all properties (admin only)
+
+    Pass the returned next_cursor as cursor to page by (created_at, id)
+    instead of OFFSET; page is ignored in that mode.
+    """
+    params = {"limit": page_size + 1}
+    if cursor:
+        params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+        page_filters = [keyset_filter("p.created_at", "p.property_id")]
+        page_clause = "LIMIT :limit"
+    else:
+        params["offset"] = (page - 1) * page_size
+        page_filters = []
+        page_clause = "LIMIT :limit OFFSET :offset"
     
-    with engine.begin() as conn:
-        # Get total count
-        count_result = conn.execute(text("SELECT COUNT(*) FROM properties"))
-        total_count = count_result.fetchone()[0]
-        
-        # Get properties with pagination
-        result = conn.execute(text("""
-            SELECT p.*, u.name as agent_name
-            FROM properties p
-            LEFT JOIN users u ON p.assigned_agent_id = u.user_id
-            ORDER BY p.created_at DESC
-            LIMIT :limit OFFSET :offset
-        """), {"limit": page_size, "offset": offset})
-        
-        properties = []
-        for row in result:
-            properties.append({
-                "property_id": row.property_id,
-                "label": row.label,
-                "description": row.description,
-                "address": row.address,
-                "area": row.area,
-                "beds": row.beds,
-                "baths": row.baths,
-                "price": row.price,
-                "property_type": row.property_type,
-                "status": row.status,
-                "assigned_agent_id": row.assigned_agent_id,
-                "agent_name": row.agent_name,
-                "created_by": row.created_by,
-                "created_at": row.created_at,
-                "updated_at": row.updated_at,
-                "image_url": row.image_url
-            })
-        
-        return {
-            "properties": properties,
-            "total_count": total_count,
-            "page": page,
-            "page_size": page_size
-        }
+    # Get total count
+    total_count = await count_rows(
+        conn, count or ("approximate" if cursor else "exact"),
+        "SELECT COUNT(*) FROM properties", table="properties"
+    )
+    
+    # Get properties with pagination
+    result = await conn.execute(text(property_query(page_filters, property_order_by(), page_clause)), params)
+    rows = result.fetchall()
+    
+    return FastJSONResponse({
+        "properties": PROPERTY_COLUMNS.dicts(rows[:page_size]),
+        "total_count": total_count,
+        "page": None if cursor else page,
+        "page_size": page_size,
+        "next_cursor": next_cursor(rows, page_size, "property_id")
+    })
 
 @app.post("/admin/properties")
 async def admin_create_property(
     property_data: PropertyCreate,
-    current_user = Depends(require_admin)
+    current_user = Depends(require_admin),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Create new property (admin only)"""
-    with engine.begin() as conn:
-        result = conn.execute(text("""
-            INSERT INTO properties (
-                label, description, address, area, beds, baths, 
-                price, property_type, image_url, created_by, status
-            ) VALUES (
-                :label, :description, :address, :area, :beds, :baths,
-                :price, :property_type, :image_url, :created_by, 'active'
-            ) RETURNING *
-        """), {
-            "label": property_data.label,
-            "description": property_data.description,
-            "address": property_data.address,
-            "area": property_data.area,
-            "beds": property_data.beds,
-            "baths": property_data.baths,
-            "price": property_data.price,
-            "property_type": property_data.property_type,
-            "image_url": property_data.image_url,
-            "created_by": current_user.user_id
-        })
-        
-        new_property = result.fetchone()
-        return {
-            "message": "Property created successfully",
-            "property_id": new_property.property_id
-        }
+    result = await conn.execute(text("""
+        INSERT INTO properties (
+            label, description, address, area, beds, baths, 
+            price, property_type, image_url, created_by, status
+        ) VALUES (
+            :label, :description, :address, :area, :beds, :baths,
+            :price, :property_type, :image_url, :created_by, 'active'
+        ) RETURNING *
+    """), {
+        "label": property_data.label,
+        "description": property_data.description,
+        "address": property_data.address,
+        "area": property_data.area,
+        "beds": property_data.beds,
+        "baths": property_data.baths,
+        "price": property_data.price,
+        "property_type": property_data.property_type,
+        "image_url": property_data.image_url,
+        "created_by": current_user.user_id
+    })
+    
+    new_property = result.fetchone()
+    await conn.commit()
+    await property_catalog.refresh(conn, property_ids=[new_property.property_id])
+    return {
+        "message": "Property created successfully",
+        "property_id": new_property.property_id
+    }
+
+# Bulk property operations: each batch is validated with set-based queries
+# and applied in one transaction; invalid items are reported per item and
+# the rest are still applied.
+def check_batch_size(items):
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} items per request")
+
+async def finish_bulk(conn: AsyncConnection, results, property_ids, agent_ids=()):
+    """Commit a bulk operation, refresh the caches it touched and build its response"""
+    await conn.commit()
+    if property_ids:
+        await response_cache.invalidate(*(property_key(property_id) for property_id in property_ids))
+        await invalidate_agent_pages(conn, list(set(agent_ids)))
+        await property_catalog.refresh(conn, property_ids=property_ids)
+    failed = sum(1 for item in results if item["status"] == "error")
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+@app.post("/admin/properties/bulk/create")
+async def admin_bulk_create_properties(
+    batch: PropertyBulkCreate,
+    current_user = Depends(require_admin),
+    conn: AsyncConnection = Depends(get_db)
+):
+    """Create properties as active (admin only)"""
+    check_batch_size(batch.properties)
+    results, property_ids = await bulk_create(conn, batch.properties, current_user.user_id)
+    return await finish_bulk(conn, results, property_ids)
+
+@app.post("/admin/properties/bulk/update")
+async def admin_bulk_update_properties(
+    batch: PropertyBulkUpdate,
+    current_user = Depends(require_admin),
+    conn: AsyncConnection = Depends(get_db)
+):
+    """Update properties; fields left out or null are kept (admin only)"""
+    check_batch_size(batch.properties)
+    return await finish_bulk(conn, *await bulk_update(conn, batch.properties))
+
+@app.post("/admin/properties/bulk/approve")
+async def admin_bulk_approve_properties(
+    batch: PropertyBulkApprove,
+    current_user = Depends(require_admin),
+    conn: AsyncConnection = Depends(get_db)
+):
+    """Approve pending agent-submitted properties (admin only)"""
+    check_batch_size(batch.property_ids)
+    return await finish_bulk(conn, *await bulk_approve(conn, batch.property_ids))
+
+@app.post("/admin/properties/bulk/assign")
+async def admin_bulk_assign_properties(
+    batch: PropertyBulkAssign,
+    current_user = Depends(require_admin),
+    conn: AsyncConnection = Depends(get_db)
+):
+    """Assign properties to agents (admin only)"""
+    check_batch_size(batch.assignments)
+    return await finish_bulk(conn, *await bulk_assign(conn, batch.assignments))
 
 @app.put("/admin/properties/{property_id}")
 async def admin_update_property(
     property_id: int,
     property_data: PropertyUpdate,
-    current_user = Depends(require_admin)
+    current_user = Depends(require_admin),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Update property (admin only)"""
-    with engine.begin() as conn:
-        # Build dynamic update query
-        update_fields = []
-        params = {"property_id": property_id}
-        
-        for field, value in property_data.dict(exclude_unset=True).items():
-            if value is not None:
-                update_fields.append(f"{field} = :{field}")
-                params[field] = value
-        
-        if not update_fields:
-            raise HTTPException(status_code=400, detail="No fields to update")
-        
-        update_fields.append("updated_at = NOW()")
-        
-        query = f"""
-            UPDATE properties 
-            SET {', '.join(update_fields)}
-            WHERE property_id = :property_id
-            RETURNING *
-        """
-        
-        result = conn.execute(text(query), params)
-        updated_property = result.fetchone()
-        
-        if not updated_property:
-            raise HTTPException(status_code=404, detail="Property not found")
-        
-        return {"message": "Property updated successfully"}
+    # Build dynamic update query
+    update_fields = []
+    params = {"property_id": property_id}
+    
+    for field, value in property_data.dict(exclude_unset=True).items():
+        if value is not None:
+            update_fields.append(f"{field} = :{field}")
+            params[field] = value
+    
+    if not update_fields:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    
+    update_fields.append("updated_at = NOW()")
+    
+    query = f"""
+        UPDATE properties 
+        SET {', '.join(update_fields)}
+        WHERE property_id = :property_id
+        RETURNING *
+    """
+    
+    result = await conn.execute(text(query), params)
+    updated_property = result.fetchone()
+    
+    if not updated_property:
+        raise HTTPException(status_code=404, detail="Property not found")
+    
+    await conn.commit()
+    await response_cache.invalidate(property_key(property_id))
+    await invalidate_agent_pages(conn, [updated_property.assigned_agent_id])
+    await property_catalog.refresh(conn, property_ids=[property_id])
+    return {"message": "Property updated successfully"}
 
 @app.post("/admin/properties/{property_id}/assign")
 async def admin_assign_property(
     property_id: int,
     assignment: dict,
-    current_user = Depends(require_admin)
+    current_user = Depends(require_admin),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Assign property to agent (admin only)"""
     try:
@@ -496,34 +628,38 @@ async def admin_assign_property(
         if not agent_id:
             raise HTTPException(status_code=400, detail="agent_id is required")
         
-        with engine.begin() as conn:
-            # Verify property exists
-            prop_result = conn.execute(
-                text("SELECT property_id FROM properties WHERE property_id = :property_id"),
-                {"property_id": property_id}
-            )
-            if not prop_result.fetchone():
-                raise HTTPException(status_code=404, detail="Property not found")
-            
-            # Verify agent exists
-            agent_result = conn.execute(
-                text("SELECT user_id FROM users WHERE user_id = :user_id AND role = 'agent'"),
-                {"user_id": agent_id}
-            )
-            if not agent_result.fetchone():
-                raise HTTPException(status_code=404, detail="Agent not found")
-            
-            # Update property assignment
-            conn.execute(text("""
-                UPDATE properties 
-                SET assigned_agent_id = :agent_id, updated_at = NOW()
-                WHERE property_id = :property_id
-            """), {
-                "agent_id": agent_id,
-                "property_id": property_id
-            })
-            
-            return {"message": "Property assigned successfully"}
+        # Verify property exists
+        prop_result = await conn.execute(
+            text("SELECT property_id, assigned_agent_id FROM properties WHERE property_id = :property_id"),
+            {"property_id": property_id}
+        )
+        existing_property = prop_result.fetchone()
+        if not existing_property:
+            raise HTTPException(status_code=404, detail="Property not found")
+        
+        # Verify agent exists
+        agent_result = await conn.execute(
+            text("SELECT user_id FROM users WHERE user_id = :user_id AND role = 'agent'"),
+            {"user_id": agent_id}
+        )
+        if not agent_result.fetchone():
+            raise HTTPException(status_code=404, detail="Agent not found")
+        
+        # Update property assignment
+        await conn.execute(text("""
+            UPDATE properties 
+            SET assigned_agent_id = :agent_id, updated_at = NOW()
+            WHERE property_id = :property_id
+        """), {
+            "agent_id": agent_id,
+            "property_id": property_id
+        })
+        
+        await conn.commit()
+        await response_cache.invalidate(property_key(property_id))
+        await invalidate_agent_pages(conn, [existing_property.assigned_agent_id, agent_id])
+        await property_catalog.refresh(conn, property_ids=[property_id])
+        return {"message": "Property assigned successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -532,582 +668,683 @@ async def admin_assign_property(
 async def agent_list_properties(
     current_user = Depends(get_current_user),
     page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1, le=100)
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    count: Optional[str] = Query(None, pattern="^(exact|approximate|none)$"),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """List properties assigned to current agent"""
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Agent access required")
     
-    offset = (page - 1) * page_size
+    params = {"agent_id": current_user.user_id, "limit": page_size + 1}
+    if cursor:
+        params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+        page_filter = f"AND {keyset_filter('created_at', 'property_id')}"
+        page_clause = "LIMIT :limit"
+    else:
+        params["offset"] = (page - 1) * page_size
+        page_filter = ""
+        page_clause = "LIMIT :limit OFFSET :offset"
     
-    with engine.begin() as conn:
-        # Get total count for this agent
-        count_result = conn.execute(text("""
-            SELECT COUNT(*) FROM properties 
-            WHERE assigned_agent_id = :agent_id
-        """), {"agent_id": current_user.user_id})
-        total_count = count_result.fetchone()[0]
-        
-        # Get properties assigned to this agent
-        result = conn.execute(text("""
-            SELECT * FROM properties 
-            WHERE assigned_agent_id = :agent_id
-            ORDER BY created_at DESC
-            LIMIT :limit OFFSET :offset
-        """), {
-            "agent_id": current_user.user_id,
-            "limit": page_size,
-            "offset": offset
-        })
-        
-        properties = []
-        for row in result:
-            properties.append({
-                "property_id": row.property_id,
-                "label": row.label,
-                "description": row.description,
-                "address": row.address,
-                "area": row.area,
-                "beds": row.beds,
-                "baths": row.baths,
-                "price": row.price,
-                "property_type": row.property_type,
-                "status": row.status,
-                "created_at": row.created_at,
-                "updated_at": row.updated_at
-            })
-        
-        return {
-            "properties": properties,
-            "total_count": total_count,
-            "page": page,
-            "page_size": page_size
-        }
+    # Get total count for this agent
+    total_count = await count_rows(
+        conn, count or ("approximate" if cursor else "exact"),
+        AGENT_PROPERTY_COUNT_QUERY,
+        {"agent_id": current_user.user_id}
+    )
+    
+    # Get properties assigned to this agent
+    result = await conn.execute(text(agent_property_query(page_filter, page_clause)), params)
+    rows = result.fetchall()
+    
+    return FastJSONResponse({
+        "properties": AGENT_PROPERTY_COLUMNS.dicts(rows[:page_size]),
+        "total_count": total_count,
+        "page": None if cursor else page,
+        "page_size": page_size,
+        "next_cursor": next_cursor(rows, page_size, "property_id")
+    })
 
 @app.post("/agent/properties")
 async def agent_create_property(
     property_data: PropertyCreate,
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Create new property (agent only - pending admin approval)"""
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Agent access required")
     
-    with engine.begin() as conn:
-        result = conn.execute(text("""
-            INSERT INTO properties (
-                label, description, address, area, beds, baths, 
-                price, property_type, created_by, status, assigned_agent_id
-            ) VALUES (
-                :label, :description, :address, :area, :beds, :baths,
-                :price, :property_type, :created_by, 'pending', :agent_id
-            ) RETURNING *
-        """), {
-            "label": property_data.label,
-            "description": property_data.description,
-            "address": property_data.address,
-            "area": property_data.area,
-            "beds": property_data.beds,
-            "baths": property_data.baths,
-            "price": property_data.price,
-            "property_type": property_data.property_type,
-            "created_by": current_user.user_id,
-            "agent_id": current_user.user_id
-        })
-        
-        new_property = result.fetchone()
-        return {
-            "message": "Property created successfully and pending admin approval",
-            "property_id": new_property.property_id
-        }
+    result = await conn.execute(text("""
+        INSERT INTO properties (
+            label, description, address, area, beds, baths, 
+            price, property_type, created_by, status, assigned_agent_id
+        ) VALUES (
+            :label, :description, :address, :area, :beds, :baths,
+            :price, :property_type, :created_by, 'pending', :agent_id
+        ) RETURNING *
+    """), {
+        "label": property_data.label,
+        "description": property_data.description,
+        "address": property_data.address,
+        "area": property_data.area,
+        "beds": property_data.beds,
+        "baths": property_data.baths,
+        "price": property_data.price,
+        "property_type": property_data.property_type,
+        "created_by": current_user.user_id,
+        "agent_id": current_user.user_id
+    })
+    
+    new_property = result.fetchone()
+    await conn.commit()
+    await property_catalog.refresh(conn, property_ids=[new_property.property_id])
+    return {
+        "message": "Property created successfully and pending admin approval",
+        "property_id": new_property.property_id
+    }
 
 @app.put("/agent/properties/{property_id}")
 async def agent_update_property(
     property_id: int,
     property_data: PropertyUpdate,
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Update property (agent only - can only update assigned properties)"""
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Agent access required")
     
-    with engine.begin() as conn:
-        # Verify property is assigned to this agent
-        prop_result = conn.execute(text("""
-            SELECT property_id FROM properties 
-            WHERE property_id = :property_id AND assigned_agent_id = :agent_id
-        """), {
-            "property_id": property_id,
-            "agent_id": current_user.user_id
-        })
-        
-        if not prop_result.fetchone():
-            raise HTTPException(status_code=404, detail="Property not found or not assigned to you")
-        
-        # Build dynamic update query
-        update_fields = []
-        params = {"property_id": property_id}
-        
-        for field, value in property_data.dict(exclude_unset=True).items():
-            if value is not None:
-                update_fields.append(f"{field} = :{field}")
-                params[field] = value
-        
-        if not update_fields:
-            raise HTTPException(status_code=400, detail="No fields to update")
-        
-        update_fields.append("updated_at = NOW()")
-        
-        query = f"""
-            UPDATE properties 
-            SET {', '.join(update_fields)}
-            WHERE property_id = :property_id AND assigned_agent_id = :agent_id
-            RETURNING *
-        """
-        params["agent_id"] = current_user.user_id
-        
-        result = conn.execute(text(query), params)
-        updated_property = result.fetchone()
-        
-        if not updated_property:
-            raise HTTPException(status_code=404, detail="Property not found")
-        
-        return {"message": "Property updated successfully"}
+    # Verify property is assigned to this agent
+    prop_result = await conn.execute(text("""
+        SELECT property_id FROM properties 
+        WHERE property_id = :property_id AND assigned_agent_id = :agent_id
+    """), {
+        "property_id": property_id,
+        "agent_id": current_user.user_id
+    })
+    
+    if not prop_result.fetchone():
+        raise HTTPException(status_code=404, detail="Property not found or not assigned to you")
+    
+    # Build dynamic update query
+    update_fields = []
+    params = {"property_id": property_id}
+    
+    for field, value in property_data.dict(exclude_unset=True).items():
+        if value is not None:
+            update_fields.append(f"{field} = :{field}")
+            params[field] = value
+    
+    if not update_fields:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    
+    update_fields.append("updated_at = NOW()")
+    
+    query = f"""
+        UPDATE properties 
+        SET {', '.join(update_fields)}
+        WHERE property_id = :property_id AND assigned_agent_id = :agent_id
+        RETURNING *
+    """
+    params["agent_id"] = current_user.user_id
+    
+    result = await conn.execute(text(query), params)
+    updated_property = result.fetchone()
+    
+    if not updated_property:
+        raise HTTPException(status_code=404, detail="Property not found")
+    
+    await conn.commit()
+    await response_cache.invalidate(property_key(property_id))
+    await invalidate_agent_pages(conn, [updated_property.assigned_agent_id])
+    await property_catalog.refresh(conn, property_ids=[property_id])
+    return {"message": "Property updated successfully"}
 
 # Agent Profile Management
 @app.get("/agent/profile")
-async def get_agent_profile(current_user = Depends(get_current_user)):
+async def get_agent_profile(current_user = Depends(get_current_user), conn: AsyncConnection = Depends(get_db)):
     """Get current agent's profile"""
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Agent access required")
     
-    with engine.begin() as conn:
-        result = conn.execute(text("""
-            SELECT * FROM agent_profiles 
-            WHERE user_id = :user_id
-        """), {"user_id": current_user.user_id})
-        
-        profile = result.fetchone()
-        if not profile:
-            return {"message": "No profile found", "profile": None}
-        
-        return {
-            "profile_id": profile.profile_id,
-            "user_id": profile.user_id,
-            "public_url": profile.public_url,
-            "bio": profile.bio,
-            "phone": profile.phone,
-            "profile_picture": profile.profile_picture,
-            "is_active": profile.is_active,
-            "created_at": profile.created_at,
-            "updated_at": profile.updated_at
-        }
+    result = await conn.execute(text("""
+        SELECT * FROM agent_profiles 
+        WHERE user_id = :user_id
+    """), {"user_id": current_user.user_id})
+    
+    profile = result.fetchone()
+    if not profile:
+        return {"message": "No profile found", "profile": None}
+    
+    return {
+        "profile_id": profile.profile_id,
+        "user_id": profile.user_id,
+        "public_url": profile.public_url,
+        "bio": profile.bio,
+        "phone": profile.phone,
+        "profile_picture": profile.profile_picture,
+        "is_active": profile.is_active,
+        "created_at": profile.created_at,
+        "updated_at": profile.updated_at
+    }
 
 @app.post("/agent/profile")
 async def create_agent_profile(
     profile_data: AgentProfileCreate,
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Create agent profile"""
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Agent access required")
     
-    with engine.begin() as conn:
-        # Check if profile already exists
-        existing = conn.execute(text("""
-            SELECT profile_id FROM agent_profiles 
-            WHERE user_id = :user_id
-        """), {"user_id": current_user.user_id})
-        
-        if existing.fetchone():
-            raise HTTPException(status_code=400, detail="Profile already exists")
-        
-        # Check if public_url is unique
-        url_check = conn.execute(text("""
-            SELECT profile_id FROM agent_profiles 
-            WHERE public_url = :public_url
-        """), {"public_url": profile_data.public_url})
-        
-        if url_check.fetchone():
-            raise HTTPException(status_code=400, detail="Public URL already taken")
-        
-        # Create profile
-        result = conn.execute(text("""
-            INSERT INTO agent_profiles (
-                user_id, public_url, bio, phone, profile_picture
-            ) VALUES (
-                :user_id, :public_url, :bio, :phone, :profile_picture
-            ) RETURNING *
-        """), {
-            "user_id": current_user.user_id,
-            "public_url": profile_data.public_url,
-            "bio": profile_data.bio,
-            "phone": profile_data.phone,
-            "profile_picture": profile_data.profile_picture
-        })
-        
-        new_profile = result.fetchone()
-        return {
-            "message": "Profile created successfully",
-            "profile_id": new_profile.profile_id
-        }
+    # Check if profile already exists
+    existing = await conn.execute(text("""
+        SELECT profile_id FROM agent_profiles 
+        WHERE user_id = :user_id
+    """), {"user_id": current_user.user_id})
+    
+    if existing.fetchone():
+        raise HTTPException(status_code=400, detail="Profile already exists")
+    
+    # Check if public_url is unique
+    url_check = await conn.execute(text("""
+        SELECT profile_id FROM agent_profiles 
+        WHERE public_url = :public_url
+    """), {"public_url": profile_data.public_url})
+    
+    if url_check.fetchone():
+        raise HTTPException(status_code=400, detail="Public URL already taken")
+    
+    # Create profile
+    result = await conn.execute(text("""
+        INSERT INTO agent_profiles (
+            user_id, public_url, bio, phone, profile_picture
+        ) VALUES (
+            :user_id, :public_url, :bio, :phone, :profile_picture
+        ) RETURNING *
+    """), {
+        "user_id": current_user.user_id,
+        "public_url": profile_data.public_url,
+        "bio": profile_data.bio,
+        "phone": profile_data.phone,
+        "profile_picture": profile_data.profile_picture
+    })
+    
+    new_profile = result.fetchone()
+    await conn.commit()
+    await response_cache.invalidate(agent_page_key(new_profile.public_url))
+    await property_catalog.refresh(conn, agent_ids=[current_user.user_id])
+    return {
+        "message": "Profile created successfully",
+        "profile_id": new_profile.profile_id
+    }
 
 @app.put("/agent/profile")
 async def update_agent_profile(
     profile_data: AgentProfileUpdate,
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Update agent profile"""
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Agent access required")
     
-    with engine.begin() as conn:
-        # Build dynamic update query
-        update_fields = []
-        params = {"user_id": current_user.user_id}
-        
-        for field, value in profile_data.dict(exclude_unset=True).items():
-            if value is not None:
-                update_fields.append(f"{field} = :{field}")
-                params[field] = value
-        
-        if not update_fields:
-            raise HTTPException(status_code=400, detail="No fields to update")
-        
-        update_fields.append("updated_at = NOW()")
-        
-        query = f"""
-            UPDATE agent_profiles 
-            SET {', '.join(update_fields)}
-            WHERE user_id = :user_id
-            RETURNING *
-        """
-        
-        result = conn.execute(text(query), params)
-        updated_profile = result.fetchone()
-        
-        if not updated_profile:
-            raise HTTPException(status_code=404, detail="Profile not found")
-        
-        return {"message": "Profile updated successfully"}
+    # Build dynamic update query
+    update_fields = []
+    params = {"user_id": current_user.user_id}
+    
+    for field, value in profile_data.dict(exclude_unset=True).items():
+        if value is not None:
+            update_fields.append(f"{field} = :{field}")
+            params[field] = value
+    
+    if not update_fields:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    
+    update_fields.append("updated_at = NOW()")
+    
+    query = f"""
+        UPDATE agent_profiles 
+        SET {', '.join(update_fields)}
+        WHERE user_id = :user_id
+        RETURNING *
+    """
+    
+    result = await conn.execute(text(query), params)
+    updated_profile = result.fetchone()
+    
+    if not updated_profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    await conn.commit()
+    await response_cache.invalidate(agent_page_key(updated_profile.public_url))
+    await property_catalog.refresh(conn, agent_ids=[current_user.user_id])
+    return {"message": "Profile updated successfully"}
 
 # Public Agent Pages
 @app.get("/agent/{public_url}")
-async def get_agent_public_page(public_url: str):
-    """Get agent's public page with their properties"""
-    with engine.begin() as conn:
-        # Get agent profile
-        profile_result = conn.execute(text("""
-            SELECT ap.*, u.name, u.email
-            FROM agent_profiles ap
-            JOIN users u ON ap.user_id = u.user_id
-            WHERE ap.public_url = :public_url AND ap.is_active = TRUE
-        """), {"public_url": public_url})
-        
-        profile = profile_result.fetchone()
-        if not profile:
-            raise HTTPException(status_code=404, detail="Agent not found")
-        
-        # Get agent's properties
-        properties_result = conn.execute(text("""
-            SELECT * FROM properties 
-            WHERE assigned_agent_id = :agent_id AND status = 'active'
-            ORDER BY created_at DESC
-        """), {"agent_id": profile.user_id})
-        
-        properties = []
-        for row in properties_result:
-            properties.append({
-                "property_id": row.property_id,
-                "label": row.label,
-                "description": row.description,
-                "address": row.address,
-                "area": row.area,
-                "beds": row.beds,
-                "baths": row.baths,
-                "price": row.price,
-                "property_type": row.property_type
-            })
+async def get_agent_public_page(public_url: str, request: Request):
+    """Get agent's public page with their properties, served from the response cache when possible"""
+    async def load():
+        if property_catalog.ready:
+            page = property_catalog.agent_page(public_url)
+            if page is None:
+                raise HTTPException(status_code=404, detail="Agent not found")
+            profile, entries = page
+            return agent_page(profile, [entry.public_dict() for entry in entries])
+
+        async with db_connection() as conn:
+            # Get agent profile
+            profile_result = await conn.execute(text(AGENT_PROFILE_QUERY), {"public_url": public_url})
+            
+            profile = profile_result.fetchone()
+            if not profile:
+                raise HTTPException(status_code=404, detail="Agent not found")
+            
+            # Get agent's properties
+            properties_result = await conn.execute(text(AGENT_PAGE_PROPERTIES_QUERY), {"agent_id": profile.user_id})
+            
+            properties = PUBLIC_PROPERTY_COLUMNS.dicts(properties_result.fetchall())
         
-        return {
-            "agent": {
-                "name": profile.name,
-                "email": profile.email,
-                "bio": profile.bio,
-                "phone": profile.phone,
-                "profile_picture": profile.profile_picture,
-                "public_url": profile.public_url
-            },
-            "properties": properties
-        }
+        return agent_page(profile, properties)
+    
+    return await response_cache.respond(request, agent_page_key(public_url), load)
+
+def agent_page(profile, properties: list) -> dict:
+    return {
+        "agent": {
+            "name": profile.name,
+            "email": profile.email,
+            "bio": profile.bio,
+            "phone": profile.phone,
+            "profile_picture": profile.profile_picture,
+            "public_url": profile.public_url
+        },
+        "properties": properties
+    }
+
+async def invalidate_agent_pages(conn: AsyncConnection, agent_ids):
+    """Drop the cached public pages of the given agents"""
+    agent_ids = [agent_id for agent_id in agent_ids if agent_id]
+    if not agent_ids:
+        return
+    result = await conn.execute(
+        text("SELECT public_url FROM agent_profiles WHERE user_id = ANY(:agent_ids)"),
+        {"agent_ids": agent_ids}
+    )
+    await response_cache.invalidate(*(agent_page_key(row.public_url) for row in result))
 
 # Lead Management
 @app.get("/agent/leads")
 async def agent_list_leads(
     current_user = Depends(get_current_user),
     page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1, le=100)
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    count: Optional[str] = Query(None, pattern="^(exact|approximate|none)$"),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """List leads assigned to current agent"""
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Agent access required")
     
-    offset = (page - 1) * page_size
+    params = {"agent_id": current_user.user_id, "limit": page_size + 1}
+    if cursor:
+        params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+        page_filter = f"AND {keyset_filter('l.created_at', 'l.lead_id')}"
+        page_clause = "LIMIT :limit"
+    else:
+        params["offset"] = (page - 1) * page_size
+        page_filter = ""
+        page_clause = "LIMIT :limit OFFSET :offset"
     
-    with engine.begin() as conn:
-        # Get total count for this agent
-        count_result = conn.execute(text("""
-            SELECT COUNT(*) FROM leads 
-            WHERE assigned_agent_id = :agent_id
-        """), {"agent_id": current_user.user_id})
-        total_count = count_result.fetchone()[0]
-        
-        # Get leads assigned to this agent
-        result = conn.execute(text("""
-            SELECT l.*, p.label as property_label
-            FROM leads l
-            LEFT JOIN properties p ON l.property_id = p.property_id
-            WHERE l.assigned_agent_id = :agent_id
-            ORDER BY l.created_at DESC
-            LIMIT :limit OFFSET :offset
-        """), {
-            "agent_id": current_user.user_id,
-            "limit": page_size,
-            "offset": offset
+    # Get total count for this agent
+    total_count = await count_rows(
+        conn, count or ("approximate" if cursor else "exact"),
+        AGENT_LEAD_COUNT_QUERY,
+        {"agent_id": current_user.user_id}
+    )
+    
+    # Get leads assigned to this agent
+    result = await conn.execute(text(agent_lead_query(page_filter, page_clause)), params)
+    rows = result.fetchall()
+    
+    leads = []
+    for row in rows[:page_size]:
+        leads.append({
+            "lead_id": row.lead_id,
+            "name": row.name,
+            "email": row.email,
+            "phone": row.phone,
+            "message": row.message,
+            "property_id": row.property_id,
+            "property_label": row.property_label,
+            "status": row.status,
+            "source": row.source,
+            "created_at": row.created_at
         })
-        
-        leads = []
-        for row in result:
-            leads.append({
-                "lead_id": row.lead_id,
-                "name": row.name,
-                "email": row.email,
-                "phone": row.phone,
-                "message": row.message,
-                "property_id": row.property_id,
-                "property_label": row.property_label,
-                "status": row.status,
-                "source": row.source,
-                "created_at": row.created_at
-            })
-        
-        return {
-            "leads": leads,
-            "total_count": total_count,
-            "page": page,
-            "page_size": page_size
-        }
+    
+    return {
+        "leads": leads,
+        "total_count": total_count,
+        "page": None if cursor else page,
+        "page_size": page_size,
+        "next_cursor": next_cursor(rows, page_size, "lead_id")
+    }
 
 @app.post("/agent/leads")
 async def agent_create_lead(
     lead_data: LeadCreate,
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_db)
 ):
     """Create new lead (agent only)"""
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Agent access required")
     
-    with engine.begin() as conn:
-        result = conn.execute(text("""
-            INSERT INTO leads (
-                name, email, phone, message, property_id, 
-                assigned_agent_id, created_by, source
-            ) VALUES (
-                :name, :email, :phone, :message, :property_id,
-                :agent_id, :agent_id, 'agent_created'
-            ) RETURNING *
-        """), {
-            "name": lead_data.name,
-            "email": lead_data.email,
-            "phone": lead_data.phone,
-            "message": lead_data.message,
-            "property_id": lead_data.property_id,
-            "agent_id": current_user.user_id
-        })
-        
-        new_lead = result.fetchone()
-        return {
-            "message": "Lead created successfully",
-            "lead_id": new_lead.lead_id
-        }
-
-# Create interaction tracking table
-def create_interaction_table():
-    with engine.begin() as conn:
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS user_interactions (
-                interaction_id SERIAL PRIMARY KEY,
-                session_id VARCHAR(255) NOT NULL,
-                action_type VARCHAR(50) NOT NULL,
-                element_id VARCHAR(100),
-                page_url VARCHAR(500),
-                property_id VARCHAR(50),
-                property_label VARCHAR(255),
-                phone VARCHAR(50),
-                email VARCHAR(255),
-                referrer VARCHAR(500),
-                user_agent TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                engagement_score INTEGER DEFAULT 0
-            )
-        """))
-
-# Initialize tables
-create_interaction_table()
-
-# Lead scoring function
-def calculate_lead_score(lead_data, interactions=None):
-    score = 0
-    score += 10  # Base score
-    
-    # Original factors
-    if lead_data.get('lead_comments'):
-        message_length = len(lead_data['lead_comments'])
-        if message_length > 100: score += 20
-        elif message_length > 50: score += 15
-        elif message_length > 20: score += 10
-        else: score += 5
-    
-    email = lead_data.get('user_id', '')
-    if email:
-        domain = email.split('@')[-1].lower()
-        if domain in ['gmail.com', 'yahoo.com', 'hotmail.com']: score += 5
-        else: score += 15  # Business email
-    
-    customer_name = lead_data.get('customer_name', '')
-    if customer_name and len(customer_name.split()) >= 2: score += 10
-    
-    if lead_data.get('created_date'): score += 5
-    
-    # New interaction-based scoring
-    if interactions:
-        for interaction in interactions:
-            if interaction['action_type'] == 'property_view':
-                score += 15
-            elif interaction['action_type'] == 'property_detail_view':
-                score += 20
-            elif interaction['action_type'] == 'contact_click':
-                score += 25
-            elif interaction['action_type'] == 'enquiry_form_open':
-                score += 10
-            elif interaction['action_type'] == 'enquiry_submitted':
-                score += 30
-            elif interaction['action_type'] == 'phone_click':
-                score += 20
-            elif interaction['action_type'] == 'email_click':
-                score += 15
-            elif interaction['action_type'] == 'page_view':
-                score += 2
-    
-    return min(score, 100)
+    result = await conn.execute(text("""
+        INSERT INTO leads (
+            name, email, phone, message, property_id, 
+            assigned_agent_id, created_by, source
+        ) VALUES (
+            :name, :email, :phone, :message, :property_id,
+            :agent_id, :agent_id, 'agent_created'
+        ) RETURNING *
+    """), {
+        "name": lead_data.name,
+        "email": lead_data.email,
+        "phone": lead_data.phone,
+        "message": lead_data.message,
+        "property_id": lead_data.property_id,
+        "agent_id": current_user.user_id
+    })
+    
+    new_lead = result.fetchone()
+    await conn.commit()
+    return {
+        "message": "Lead created successfully",
+        "lead_id": new_lead.lead_id
+    }
 
 # API endpoints
 @app.get("/")
 async def root():
     return {"message": "Real Estate CRM API"}
 
-def get_optional_user(request: Request) -> Optional[TokenData]:
-    """Get current user if Authorization header is present"""
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return None
-    
-    try:
-        token = auth_header.split(" ")[1]
-        return verify_token(token)
-    except:
-        return None
+# Default and maximum page size for the public listings
+LISTING_PAGE_SIZE = 50
+MAX_LISTING_PAGE_SIZE = 200
 
-@app.get("/properties")
-async def list_properties(request: Request, current_user: Optional[TokenData] = Depends(get_optional_user)):
-    """List properties - filtered by agent if logged in as agent"""
-    with engine.connect() as conn:
-        if current_user and current_user.role == "agent":
-            # For agents, only show their assigned properties
-            result = conn.execute(text("""
-                SELECT p.*, u.name as agent_name
-                FROM properties p
-                LEFT JOIN users u ON p.assigned_agent_id = u.user_id
-                WHERE p.assigned_agent_id = :agent_id
-                ORDER BY p.created_at DESC
-            """), {"agent_id": current_user.user_id})
+def catalog_listing(agent_id, filters: dict, sort, order, page, page_size, cursor, count) -> Response:
+    """GET /properties from the property catalog, with the same rows and shape as the SQL below"""
+    entries = property_catalog.listing(sort, order, agent_id=agent_id, **filters)
+    if page is None and page_size is None and cursor is None:
+        return Response(content=encode_entries(entries), media_type="application/json")
+
+    page = page or 1
+    page_size = page_size or LISTING_PAGE_SIZE
+    total_count = None if count == "none" else len(entries)
+    if cursor:
+        if sort != "created_at":
+            raise HTTPException(status_code=400, detail="cursor paging requires sort=created_at")
+        position = decode_cursor(cursor)
+        if order == "desc":
+            entries = [e for e in entries if (e.created_at, e.property_id) < position]
         else:
-            # For public users and admins, show all properties
-            result = conn.execute(text("""
-                SELECT p.*, u.name as agent_name
-                FROM properties p
-                LEFT JOIN users u ON p.assigned_agent_id = u.user_id
-                ORDER BY p.created_at DESC
-            """))
+            entries = [e for e in entries if (e.created_at, e.property_id) > position]
+        rows = entries[:page_size + 1]
+    else:
+        offset = (page - 1) * page_size
+        rows = entries[offset:offset + page_size + 1]
+
+    return Response(content=encode_page(
+        rows[:page_size],
+        total_count=total_count,
+        page=None if cursor else page,
+        page_size=page_size,
+        next_cursor=next_cursor(rows, page_size, "property_id") if sort == "created_at" else None
+    ), media_type="application/json")
+
+@app.get("/properties")
+async def list_properties(
+    request: Request,
+    status: Optional[str] = Query(None),
+    property_type: Optional[str] = Query(None),
+    area: Optional[str] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_beds: Optional[int] = Query(None, ge=0),
+    min_baths: Optional[int] = Query(None, ge=0),
+    agent_id: Optional[int] = Query(None),
+    sort: str = Query("created_at", pattern="^(created_at|price|beds|baths|label)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    page: Optional[int] = Query(None, ge=1),
+    page_size: Optional[int] = Query(None, ge=1, le=MAX_LISTING_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    count: Optional[str] = Query(None, pattern="^(exact|approximate|none)$"),
+    current_user: Optional[TokenData] = Depends(get_optional_user)
+):
+    """List properties - filtered by agent if logged in as agent
+
+    Without page, page_size or cursor the matching properties are streamed
+    as a bare array (the original response shape). With any of them a
+    single page is returned with total_count and next_cursor; cursor
+    paging is only available when sorting by created_at.
+    """
+    # The catalog can't reproduce the database collation, so label sorts always query
+    if property_catalog.ready and sort != "label":
+        return catalog_listing(
+            current_user.user_id if current_user and current_user.role == "agent" else agent_id,
+            {
+                "status": status, "property_type": property_type, "area": area, "min_price": min_price,
+                "max_price": max_price, "min_beds": min_beds, "min_baths": min_baths
+            },
+            sort, order, page, page_size, cursor, count
+        )
+
+    filters = []
+    params = {}
+    if current_user and current_user.role == "agent":
+        # For agents, only show their assigned properties
+        filters.append("p.assigned_agent_id = :agent_id")
+        params["agent_id"] = current_user.user_id
+    elif agent_id is not None:
+        filters.append("p.assigned_agent_id = :agent_id")
+        params["agent_id"] = agent_id
+    if status:
+        filters.append("p.status = :status")
+        params["status"] = status
+    if property_type:
+        filters.append("p.property_type = :property_type")
+        params["property_type"] = property_type
+    if area:
+        filters.append("LOWER(p.area) = LOWER(:area)")
+        params["area"] = area
+    if min_price is not None:
+        filters.append("p.price >= :min_price")
+        params["min_price"] = min_price
+    if max_price is not None:
+        filters.append("p.price <= :max_price")
+        params["max_price"] = max_price
+    if min_beds is not None:
+        filters.append("p.beds >= :min_beds")
+        params["min_beds"] = min_beds
+    if min_baths is not None:
+        filters.append("p.baths >= :min_baths")
+        params["min_baths"] = min_baths
+    
+    order_by = property_order_by(sort, order)
+    
+    if page is None and page_size is None and cursor is None:
+        batches = (
+            PROPERTY_COLUMNS.dicts(rows)
+            async for rows in stream_rows(property_query(filters, order_by), params)
+        )
+        return stream_json_array(batches)
+    
+    page = page or 1
+    page_size = page_size or LISTING_PAGE_SIZE
+    count_query = property_count_query(filters)
+    count_params = dict(params)
+    
+    if cursor:
+        if sort != "created_at":
+            raise HTTPException(status_code=400, detail="cursor paging requires sort=created_at")
+        params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+        filters.append(keyset_filter("p.created_at", "p.property_id", order))
+        page_clause = "LIMIT :limit"
+    else:
+        params["offset"] = (page - 1) * page_size
+        page_clause = "LIMIT :limit OFFSET :offset"
+    
+    async with db_connection() as conn:
+        total_count = await count_rows(
+            conn, count or ("approximate" if cursor else "exact"),
+            count_query, count_params,
+            table=None if count_params else "properties"
+        )
         
-        properties = []
-        for row in result:
-            properties.append({
-                "property_id": row.property_id,
-                "label": row.label,
-                "description": row.description,
-                "address": row.address,
-                "area": row.area,
-                "beds": row.beds,
-                "baths": row.baths,
-                "price": row.price,
-                "property_type": row.property_type,
-                "status": row.status,
-                "assigned_agent_id": row.assigned_agent_id,
-                "agent_name": row.agent_name,
-                "created_by": row.created_by,
-                "created_at": row.created_at,
-                "updated_at": row.updated_at,
-                "image_url": row.image_url
-            })
-        return properties
+        result = await conn.execute(
+            text(property_query(filters, order_by, page_clause)),
+            {**params, "limit": page_size + 1}
+        )
+        rows = result.fetchall()
+    
+    return FastJSONResponse({
+        "properties": PROPERTY_COLUMNS.dicts(rows[:page_size]),
+        "total_count": total_count,
+        "page": None if cursor else page,
+        "page_size": page_size,
+        "next_cursor": next_cursor(rows, page_size, "property_id") if sort == "created_at" else None
+    })
+
+@app.get("/properties/search")
+async def search_properties(
+    q: Optional[str] = Query(None, max_length=200),
+    status: Optional[str] = Query(None),
+    property_type: Optional[str] = Query(None),
+    area: Optional[str] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_beds: Optional[int] = Query(None, ge=0),
+    max_beds: Optional[int] = Query(None, ge=0),
+    min_baths: Optional[int] = Query(None, ge=0),
+    max_baths: Optional[int] = Query(None, ge=0),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(LISTING_PAGE_SIZE, ge=1, le=MAX_LISTING_PAGE_SIZE)
+):
+    """Full-text property search with facet counts
+
+    q uses web search syntax ("quoted phrases", -excluded, or) over label,
+    area, address and description; results are ordered by relevance, or
+    newest first without q. facets counts property_type, area and price
+    buckets, each ignoring its own filter.
+    """
+    # Filters every facet respects
+    base_filters = []
+    params = {"price_buckets": list(PRICE_BUCKETS)}
+    q = (q or "").strip()
+    if q:
+        base_filters.append(SEARCH_FILTER)
+        params["q"] = q
+    if status:
+        base_filters.append("p.status = :status")
+        params["status"] = status
+    for column, bound, operator in (
+        ("beds", min_beds, ">="), ("beds", max_beds, "<="),
+        ("baths", min_baths, ">="), ("baths", max_baths, "<=")
+    ):
+        if bound is not None:
+            name = f"{'min' if operator == '>=' else 'max'}_{column}"
+            base_filters.append(f"p.{column} {operator} :{name}")
+            params[name] = bound
+
+    # Faceted filters, each left out of its own facet's counts
+    facet_filters = {}
+    if property_type:
+        facet_filters["type_filter"] = "p.property_type = :property_type"
+        params["property_type"] = property_type
+    if area:
+        facet_filters["area_filter"] = "LOWER(p.area::text) = LOWER(:area)"
+        params["area"] = area
+    price_filters = []
+    if min_price is not None:
+        price_filters.append("p.price >= :min_price")
+        params["min_price"] = min_price
+    if max_price is not None:
+        price_filters.append("p.price <= :max_price")
+        params["max_price"] = max_price
+    if price_filters:
+        facet_filters["price_filter"] = f"({' AND '.join(price_filters)})"
+
+    filters = base_filters + list(facet_filters.values())
+    if q:
+        rank = SEARCH_RANK
+        order_by = "rank DESC, p.property_id"
+    else:
+        rank = "NULL::real"
+        order_by = property_order_by()
+
+    async with db_connection() as conn:
+        facet_rows = (await conn.execute(text(facet_query(base_filters, **facet_filters)), params)).fetchall()
+        result = await conn.execute(
+            text(search_query(filters, rank, order_by)),
+            {**params, "limit": page_size, "offset": (page - 1) * page_size}
+        )
+        rows = result.fetchall()
+
+    total_count, facets = build_facets(facet_rows)
+    return FastJSONResponse({
+        "properties": PROPERTY_COLUMNS.dicts(rows),
+        "total_count": total_count,
+        "page": page,
+        "page_size": page_size,
+        "facets": facets
+    })
 
 @app.get("/properties/{property_id}")
-async def get_property(property_id: int):
-    with engine.connect() as conn:
-        result = conn.execute(text("""
-            SELECT p.*, u.name as agent_name
-            FROM properties p
-            LEFT JOIN users u ON p.assigned_agent_id = u.user_id
-            WHERE p.property_id = :property_id
-        """), {"property_id": property_id})
-        row = result.fetchone()
+async def get_property(property_id: int, request: Request):
+    """Get property details, served from the response cache when possible"""
+    async def load():
+        if property_catalog.ready:
+            entry = property_catalog.get(property_id)
+            if entry is None:
+                raise HTTPException(status_code=404, detail="Property not found")
+            return entry.dict()
+
+        async with db_connection() as conn:
+            result = await conn.execute(text(PROPERTY_DETAIL_QUERY), {"property_id": property_id})
+            row = result.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Property not found")
         
-        return {
-            "property_id": row.property_id,
-            "label": row.label,
-            "description": row.description,
-            "address": row.address,
-            "area": row.area,
-            "beds": row.beds,
-            "baths": row.baths,
-            "price": row.price,
-            "property_type": row.property_type,
-            "status": row.status,
-            "assigned_agent_id": row.assigned_agent_id,
-            "agent_name": row.agent_name,
-            "created_by": row.created_by,
-            "created_at": row.created_at,
-            "updated_at": row.updated_at,
-            "image_url": row.image_url
-        }
+        return PROPERTY_COLUMNS.dict(row)
+    
+    return await response_cache.respond(request, property_key(property_id), load)
 
 @app.post("/enquiry")
-async def create_enquiry(enquiry: Enquiry, request: Request):
-    # Get current user if logged in
-    current_user = None
-    auth_header = request.headers.get("Authorization")
-    if auth_header and auth_header.startswith("Bearer "):
-        try:
-            token = auth_header.split(" ")[1]
-            current_user = verify_token(token)
-        except:
-            pass
-    with engine.begin() as conn:
-        # Insert or update user_basic_info
-        upsert_user = text("""
+async def create_enquiry(
+    enquiry: Enquiry,
+    request: Request,
+    current_user: Optional[TokenData] = Depends(get_optional_user),
+    conn: AsyncConnection = Depends(get_db)
+):
+    # Split name into first and last name
+    name_parts = enquiry.name.split(' ', 1)
+    first_name = name_parts[0] if name_parts else enquiry.name
+    last_name = name_parts[1] if len(name_parts) > 1 else ''
+    
+    # Enquiries made by an agent also create (or re-assign) the customer's
+    # user account and assign the lead to that agent
+    agent_id = current_user.user_id if current_user and current_user.role == "agent" else None
+    
+    # One round trip: every write is a data-modifying CTE, and the property
+    # label is resolved inline while inserting the lead
+    create_lead = text("""
+        WITH basic_info AS (
             INSERT INTO user_basic_info (email_id, first_name, last_name, display_name)
             VALUES (:email, :first_name, :last_name, :display_name)
             ON CONFLICT (email_id) 
@@ -1115,475 +1352,343 @@ async def create_enquiry(enquiry: Enquiry, request: Request):
                 first_name = EXCLUDED.first_name,
                 last_name = EXCLUDED.last_name,
                 display_name = EXCLUDED.display_name
-        """)
-        
-        # Split name into first and last name
-        name_parts = enquiry.name.split(' ', 1)
-        first_name = name_parts[0] if name_parts else enquiry.name
-        last_name = name_parts[1] if len(name_parts) > 1 else ''
-        
-        conn.execute(upsert_user, {
-            "email": enquiry.email,
-            "first_name": first_name,
-            "last_name": last_name,
-            "display_name": enquiry.name
-        })
-
-        # Insert into lead_info
-        insert_lead = text("""
-            INSERT INTO lead_info (user_id, price, status, category, sub_category, lead_scode, lead_comments)
-            VALUES (:email, NULL, 'new', NULL, NULL, NULL, :message)
-            RETURNING lead_id
-        """)
-        result = conn.execute(insert_lead, {
-            "email": enquiry.email,
-            "message": enquiry.message
-        })
-        lead_id = result.fetchone()[0]
-
-        # Get property label if property_id is provided
-        property_label = "General Inquiry"
-        if enquiry.property_id:
-            prop_result = conn.execute(
-                text("SELECT label FROM property_info WHERE property_id = :property_id"),
-                {"property_id": enquiry.property_id}
+        ),
+        customer AS (
+            INSERT INTO users (email, name, role, assigned_agent_id, created_at, last_login)
+            SELECT :email, :name, 'customer', CAST(:agent_id AS INTEGER), NOW(), NOW()
+            WHERE CAST(:agent_id AS INTEGER) IS NOT NULL
+            ON CONFLICT (email) DO UPDATE SET assigned_agent_id = EXCLUDED.assigned_agent_id
+        ),
+        lead AS (
+            INSERT INTO lead_info (
+                user_id, price, status, category, sub_category, lead_scode, lead_comments,
+                property_interested, assigned_agent_id
             )
-            prop_row = prop_result.fetchone()
-            if prop_row:
-                property_label = prop_row.label
-
-        # Insert into lead_additional_info
-        insert_additional = text("""
+            VALUES (
+                :email, NULL, 'new', NULL, NULL, NULL, :message,
+                COALESCE(
+                    (SELECT label FROM property_info WHERE property_id = CAST(:property_id AS INTEGER)),
+                    'General Inquiry'
+                ),
+                CAST(:agent_id AS INTEGER)
+            )
+            RETURNING lead_id
+        ),
+        additional_info AS (
             INSERT INTO lead_additional_info (lead_id, created_by, created_date, created_time, source)
-            VALUES (:lead_id, :email, CURRENT_DATE, CURRENT_TIME, 'website')
-        """)
-        conn.execute(insert_additional, {"lead_id": lead_id, "email": enquiry.email})
-
-        # Update lead_info with property_interested and agent assignment
-        if current_user and current_user.role == "agent":
-            # Check if user already exists
-            existing_user = conn.execute(
-                text("SELECT user_id FROM users WHERE email = :email"),
-                {"email": enquiry.email}
-            ).fetchone()
-            
-            if not existing_user:
-                # Create new user entry
-                user_result = conn.execute(text("""
-                    INSERT INTO users (email, name, role, created_at, last_login)
-                    VALUES (:email, :name, 'customer', NOW(), NOW())
-                    RETURNING user_id
-                """), {
-                    "email": enquiry.email,
-                    "name": enquiry.name
-                })
-                user_id = user_result.fetchone()[0]
-            else:
-                user_id = existing_user.user_id
-            
-            # Assign to current agent in users table
-            conn.execute(text("""
-                UPDATE users 
-                SET assigned_agent_id = :agent_id 
-                WHERE user_id = :user_id
-            """), {
-                "agent_id": current_user.user_id,
-                "user_id": user_id
-            })
-            
-            # Also assign the lead to the agent in lead_info table
-            update_lead = text("""
-                UPDATE lead_info 
-                SET property_interested = :property_label, assigned_agent_id = :agent_id
-                WHERE lead_id = :lead_id
-            """)
-            conn.execute(update_lead, {
-                "lead_id": lead_id, 
-                "property_label": property_label,
-                "agent_id": current_user.user_id
-            })
-        else:
-            # For public enquiries, just update property_interested
-            update_lead = text("""
-                UPDATE lead_info 
-                SET property_interested = :property_label
-                WHERE lead_id = :lead_id
-            """)
-            conn.execute(update_lead, {"lead_id": lead_id, "property_label": property_label})
+            SELECT lead_id, :email, CURRENT_DATE, CURRENT_TIME, 'website' FROM lead
+        )
+        SELECT lead_id FROM lead
+    """)
+    lead_id = (await conn.execute(create_lead, {
+        "email": enquiry.email,
+        "first_name": first_name,
+        "last_name": last_name,
+        "display_name": enquiry.name,
+        "name": enquiry.name,
+        "message": enquiry.message,
+        "property_id": enquiry.property_id or None,
+        "agent_id": agent_id
+    })).scalar()
 
+    await conn.commit()
     return {"message": "Enquiry submitted successfully", "lead_id": lead_id}
 
+def scored_lead_dicts(rows, lead_scores):
+    """Leads as dicts, with the freshly computed scores in place of the stored ones"""
+    leads = LEAD_COLUMNS.dicts(rows)
+    for lead in leads:
+        lead["lead_score"] = lead_scores[lead["lead_id"]]
+    return leads
+
+async def stream_scored_leads(query: str, params: dict):
+    """Stream lead rows in chunks, scoring and persisting each chunk as it goes"""
+    async with db_connection() as conn:
+        result = await conn.stream(text(query), params)
+        async for rows in result.partitions(STREAM_CHUNK_SIZE):
+            lead_scores = await conn.run_sync(score_leads, rows)
+            yield scored_lead_dicts(rows, lead_scores)
+        await conn.commit()
+
 @app.get("/leads")
-async def list_leads(request: Request):
-    # Get current user if logged in
-    current_user = None
-    auth_header = request.headers.get("Authorization")
-    if auth_header and auth_header.startswith("Bearer "):
-        try:
-            token = auth_header.split(" ")[1]
-            current_user = verify_token(token)
-        except:
-            pass
-    with engine.connect() as conn:
-        # Build query based on user role
-        if current_user and current_user.role == "agent":
-            # For agents, only show leads assigned to them
-            query = text("""
-                SELECT 
-                    l.lead_id,
-                    u.display_name as customer_name,
-                    l.user_id as email,
-                    l.status,
-                    l.lead_comments,
-                    l.created_date,
-                    l.property_interested,
-                    l.lead_score
-                FROM lead_info l
-                LEFT JOIN user_basic_info u ON l.user_id = u.email_id
-                WHERE l.assigned_agent_id = :agent_id
-                ORDER BY l.created_date DESC
-            """)
-            result = conn.execute(query, {"agent_id": current_user.user_id})
-        else:
-            # For admins and public, show all leads
-            result = conn.execute(text("""
-                SELECT 
-                    l.lead_id,
-                    u.display_name as customer_name,
-                    l.user_id as email,
-                    l.status,
-                    l.lead_comments,
-                    l.created_date,
-                    l.property_interested,
-                    l.lead_score
-                FROM lead_info l
-                LEFT JOIN user_basic_info u ON l.user_id = u.email_id
-                ORDER BY l.created_date DESC
-            """))
+async def list_leads(
+    request: Request,
+    status: Optional[str] = Query(None),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    sort: str = Query("created_date", pattern="^(created_date|lead_score)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    page: Optional[int] = Query(None, ge=1),
+    page_size: Optional[int] = Query(None, ge=1, le=MAX_LISTING_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    count: Optional[str] = Query(None, pattern="^(exact|approximate|none)$"),
+    current_user: Optional[TokenData] = Depends(get_optional_user)
+):
+    """List leads - filtered by agent if logged in as agent
+
+    Filters and paging behave like GET /properties. Score filters and
+    sorting use the stored lead_score; the returned scores are recomputed.
+    """
+    # Build query based on user role
+    filters = []
+    params = {}
+    if current_user and current_user.role == "agent":
+        # For agents, only show leads assigned to them
+        filters.append("l.assigned_agent_id = :agent_id")
+        params["agent_id"] = current_user.user_id
+    if status:
+        filters.append("l.status = :status")
+        params["status"] = status
+    if min_score is not None:
+        filters.append("l.lead_score >= :min_score")
+        params["min_score"] = min_score
+    if max_score is not None:
+        filters.append("l.lead_score <= :max_score")
+        params["max_score"] = max_score
+    if created_from is not None:
+        filters.append("l.created_date >= :created_from")
+        params["created_from"] = created_from
+    if created_to is not None:
+        filters.append("l.created_date <= :created_to")
+        params["created_to"] = created_to
+    
+    order_by = lead_order_by(sort, order)
+    
+    if page is None and page_size is None and cursor is None:
+        return stream_json_array(stream_scored_leads(lead_query(filters, order_by), params))
+    
+    page = page or 1
+    page_size = page_size or LISTING_PAGE_SIZE
+    count_query = lead_count_query(filters)
+    count_params = dict(params)
+    
+    if cursor:
+        if sort != "created_date":
+            raise HTTPException(status_code=400, detail="cursor paging requires sort=created_date")
+        params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+        filters.append(keyset_filter("l.created_date", "l.lead_id", order))
+        page_clause = "LIMIT :limit"
+    else:
+        params["offset"] = (page - 1) * page_size
+        page_clause = "LIMIT :limit OFFSET :offset"
+    
+    async with db_connection() as conn:
+        total_count = await count_rows(
+            conn, count or ("approximate" if cursor else "exact"),
+            count_query, count_params,
+            table=None if count_params else "lead_info"
+        )
         
-        leads = []
-        for row in result:
-            # Get interactions for this lead
-            interactions_result = conn.execute(text("""
-                SELECT action_type, COUNT(*) as count
-                FROM user_interactions 
-                WHERE email = :email
-                GROUP BY action_type
-            """), {"email": row.email})
-            
-            interactions = [{"action_type": r.action_type, "count": r.count} for r in interactions_result]
-            
-            # Calculate lead score
-            lead_data = {
-                "lead_comments": row.lead_comments,
-                "user_id": row.email,
-                "customer_name": row.customer_name,
-                "created_date": row.created_date
-            }
-            
-            lead_score = calculate_lead_score(lead_data, interactions)
-            
-            # Update lead score in database
-            conn.execute(text("""
-                UPDATE lead_info 
-                SET lead_score = :score 
-                WHERE lead_id = :lead_id
-            """), {"score": lead_score, "lead_id": row.lead_id})
-            
-            leads.append({
-                "lead_id": row.lead_id,
-                "customer_name": row.customer_name,
-                "email": row.email,
-                "phone": None,  # Phone not available in current schema
-                "status": row.status,
-                "lead_score": lead_score,
-                "property_interested": row.property_interested,
-                "created_date": row.created_date,
-                "lead_comments": row.lead_comments
-            })
+        result = await conn.execute(
+            text(lead_query(filters, order_by, page_clause)),
+            {**params, "limit": page_size + 1}
+        )
+        rows = result.fetchall()
         
-        return leads
+        # Score the page with one interaction query and one bulk update
+        lead_scores = await conn.run_sync(score_leads, rows[:page_size])
+        await conn.commit()
+    
+    return FastJSONResponse({
+        "leads": scored_lead_dicts(rows[:page_size], lead_scores),
+        "total_count": total_count,
+        "page": None if cursor else page,
+        "page_size": page_size,
+        "next_cursor": next_cursor(rows, page_size, "lead_id", "created_date") if sort == "created_date" else None
+    })
 
 @app.get("/leads/{lead_id}")
-async def get_lead_detail(lead_id: int):
-    with engine.connect() as conn:
-        result = conn.execute(text("""
-            SELECT 
-                l.lead_id,
-                u.display_name as customer_name,
-                l.user_id as email,
-                l.status,
-                l.lead_comments,
-                l.created_date,
-                l.property_interested,
-                l.lead_score
-            FROM lead_info l
-            LEFT JOIN user_basic_info u ON l.user_id = u.email_id
-            WHERE l.lead_id = :lead_id
-        """), {"lead_id": lead_id})
-        
-        row = result.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Lead not found")
-        
-        return {
-            "lead_id": row.lead_id,
-            "customer_name": row.customer_name,
-            "email": row.email,
-            "phone": None,  # Phone not available in current schema
-            "status": row.status,
-            "lead_score": row.lead_score,
-            "property_interested": row.property_interested,
-            "created_date": row.created_date,
-            "lead_comments": row.lead_comments
-        }
+async def get_lead_detail(lead_id: int, conn: AsyncConnection = Depends(get_db)):
+    result = await conn.execute(text("""
+        SELECT 
+            l.lead_id,
+            u.display_name as customer_name,
+            l.user_id as email,
+            l.status,
+            l.lead_comments,
+            l.created_date,
+            l.property_interested,
+            l.lead_score
+        FROM lead_info l
+        LEFT JOIN user_basic_info u ON l.user_id = u.email_id
+        WHERE l.lead_id = :lead_id
+    """), {"lead_id": lead_id})
+    
+    row = result.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    
+    return {
+        "lead_id": row.lead_id,
+        "customer_name": row.customer_name,
+        "email": row.email,
+        "phone": None,  # Phone not available in current schema
+        "status": row.status,
+        "lead_score": row.lead_score,
+        "property_interested": row.property_interested,
+        "created_date": row.created_date,
+        "lead_comments": row.lead_comments
+    }
 
 @app.put("/leads/{lead_id}/status")
-async def update_lead_status(lead_id: int, update: LeadUpdate):
-    with engine.connect() as conn:
-        update_query = text("""
-            UPDATE lead_info 
-            SET status = COALESCE(:status, status)
-            WHERE lead_id = :lead_id
+async def update_lead_status(lead_id: int, update: LeadUpdate, conn: AsyncConnection = Depends(get_db)):
+    update_query = text("""
+        UPDATE lead_info 
+        SET status = COALESCE(:status, status)
+        WHERE lead_id = :lead_id
+    """)
+    await conn.execute(update_query, {"lead_id": lead_id, "status": update.status})
+    
+    if update.notes:
+        # Add notes to lead_additional_info
+        insert_notes = text("""
+            INSERT INTO lead_additional_info (lead_id, created_by, created_date, created_time, source)
+            VALUES (:lead_id, 'system', CURRENT_DATE, CURRENT_TIME, 'notes')
         """)
-        conn.execute(update_query, {"lead_id": lead_id, "status": update.status})
-        
-        if update.notes:
-            # Add notes to lead_additional_info
-            insert_notes = text("""
-                INSERT INTO lead_additional_info (lead_id, created_by, created_date, created_time, source)
-                VALUES (:lead_id, 'system', CURRENT_DATE, CURRENT_TIME, 'notes')
-            """)
-            conn.execute(insert_notes, {"lead_id": lead_id})
-        
-        conn.commit()
+        await conn.execute(insert_notes, {"lead_id": lead_id})
+    
+    await conn.commit()
     
     return {"message": "Lead status updated successfully"}
 
 @app.get("/leads/stats/summary")
-async def get_lead_stats():
-    with engine.connect() as conn:
-        # Total leads
-        total_result = conn.execute(text("SELECT COUNT(*) as total FROM lead_info"))
-        total_leads = total_result.fetchone().total
+async def get_lead_stats(conn: AsyncConnection = Depends(get_db)):
+    # Served from dashboard_stats, at most STATS_MAX_AGE old
+    stats = await read_stats(conn)
+    avg_score = round(stats.average_lead_score, 1) if stats.average_lead_score else 0
+    
+    return {
+        "total_leads": stats.lead_count,
+        "status_breakdown": stats.lead_status_breakdown,
+        "average_lead_score": avg_score
+    }
+
+@app.post("/track-interaction", status_code=202)
+async def track_interaction(interaction: Interaction):
+    # Engagement score from the same weights table as lead scoring
+    engagement_score = get_scoring_config().action_score(interaction.action)
+    
+    # Queue the interaction; the background worker inserts it and
+    # updates the lead score in its next batch
+    accepted = interaction_queue.enqueue({
+        "session_id": interaction.sessionId,
+        "action_type": interaction.action,
+        "element_id": interaction.element,
+        "page_url": interaction.page,
+        "property_id": interaction.propertyId,
+        "property_label": interaction.propertyLabel,
+        "phone": interaction.phone,
+        "email": interaction.email,
+        "referrer": interaction.referrer,
+        "user_agent": interaction.userAgent,
+        "engagement_score": engagement_score
+    })
+    
+    if not accepted:
+        raise HTTPException(
+            status_code=503,
+            detail="Interaction queue is full, please retry",
+            headers={"Retry-After": "1"}
+        )
+    
+    return {
+        "message": "Interaction tracked successfully",
+        "engagementScore": engagement_score
+    }
+
+@app.delete("/leads/bulk-delete")
+async def bulk_delete_leads(request: BulkDeleteRequest, conn: AsyncConnection = Depends(get_db)):
+    try:
+        # Delete from lead_additional_info first (due to foreign key constraint)
+        delete_additional = text("""
+            DELETE FROM lead_additional_info 
+            WHERE lead_id = ANY(:lead_ids)
+        """)
+        await conn.execute(delete_additional, {"lead_ids": request.lead_ids})
         
-        # Status breakdown
-        status_result = conn.execute(text("""
-            SELECT status, COUNT(*) as count 
-            FROM lead_info 
-            GROUP BY status
-        """))
-        status_breakdown = {row.status: row.count for row in status_result}
+        # Delete from lead_info
+        delete_leads = text("""
+            DELETE FROM lead_info 
+            WHERE lead_id = ANY(:lead_ids)
+        """)
+        result = await conn.execute(delete_leads, {"lead_ids": request.lead_ids})
         
-        # Average lead score
-        score_result = conn.execute(text("""
-            SELECT AVG(lead_score) as avg_score 
-            FROM lead_info 
-            WHERE lead_score IS NOT NULL
-        """))
-        avg_score_row = score_result.fetchone()
-        avg_score = round(avg_score_row.avg_score, 1) if avg_score_row.avg_score else 0
+        deleted_count = result.rowcount
+        await conn.commit()
         
         return {
-            "total_leads": total_leads,
-            "status_breakdown": status_breakdown,
-            "average_lead_score": avg_score
+            "message": f"Successfully deleted {deleted_count} leads",
+            "deleted_count": deleted_count,
+            "deleted_ids": request.lead_ids
         }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting leads: {str(e)}")
 
-@app.post("/track-interaction")
-async def track_interaction(interaction: Interaction):
-    with engine.connect() as conn:
-        # Calculate engagement score based on action
-        engagement_score = 0
-        if interaction.action == "property_view":
-            engagement_score = 15
-        elif interaction.action == "property_detail_view":
-            engagement_score = 20
-        elif interaction.action == "contact_click":
-            engagement_score = 25
-        elif interaction.action == "enquiry_form_open":
-            engagement_score = 10
-        elif interaction.action == "enquiry_submitted":
-            engagement_score = 30
-        elif interaction.action == "phone_click":
-            engagement_score = 20
-        elif interaction.action == "email_click":
-            engagement_score = 15
-        elif interaction.action == "page_view":
-            engagement_score = 2
-        
-        # Insert interaction
-        insert_query = text("""
-            INSERT INTO user_interactions (
-                session_id, action_type, element_id, page_url, property_id, 
-                property_label, phone, email, referrer, user_agent, engagement_score
-            ) VALUES (
-                :session_id, :action_type, :element_id, :page_url, :property_id,
-                :property_label, :phone, :email, :referrer, :user_agent, :engagement_score
-            )
+@app.post("/leads/send-message")
+async def send_message(request: MessageRequest, conn: AsyncConnection = Depends(get_db)):
+    try:
+        # Get recipient details
+        recipients_query = text("""
+            SELECT lead_id, customer_name, email, phone, status
+            FROM lead_info 
+            WHERE lead_id = ANY(:lead_ids)
         """)
         
-        conn.execute(insert_query, {
-            "session_id": interaction.sessionId,
-            "action_type": interaction.action,
-            "element_id": interaction.element,
-            "page_url": interaction.page,
-            "property_id": interaction.propertyId,
-            "property_label": interaction.propertyLabel,
-            "phone": interaction.phone,
-            "email": interaction.email,
-            "referrer": interaction.referrer,
-            "user_agent": interaction.userAgent,
-            "engagement_score": engagement_score
-        })
+        result = await conn.execute(recipients_query, {"lead_ids": request.recipients})
+        recipients = [dict(row) for row in result]
         
-        conn.commit()
+        if not recipients:
+            raise HTTPException(status_code=400, detail="No valid recipients found")
         
-        # If we have an email, update lead score
-        if interaction.email:
-            # Get all interactions for this email
-            interactions_result = conn.execute(text("""
-                SELECT action_type, COUNT(*) as count
-                FROM user_interactions 
-                WHERE email = :email
-                GROUP BY action_type
-            """), {"email": interaction.email})
-            
-            interactions = [{"action_type": r.action_type, "count": r.count} for r in interactions_result]
-            
-            # Get lead data
-            lead_result = conn.execute(text("""
-                SELECT l.lead_comments, l.user_id, u.display_name as customer_name, l.created_date
-                FROM lead_info l
-                LEFT JOIN user_basic_info u ON l.user_id = u.email_id
-                WHERE l.user_id = :email
-                ORDER BY l.created_date DESC
-                LIMIT 1
-            """), {"email": interaction.email})
-            
-            lead_row = lead_result.fetchone()
-            if lead_row:
-                lead_data = {
-                    "lead_comments": lead_row.lead_comments,
-                    "user_id": lead_row.user_id,
-                    "customer_name": lead_row.customer_name,
-                    "created_date": lead_row.created_date
-                }
+        # For now, we'll simulate sending messages
+        # In a real implementation, you would integrate with:
+        # - Email service (SendGrid, AWS SES, etc.)
+        # - SMS service (Twilio, AWS SNS, etc.)
+        
+        sent_messages = []
+        failed_messages = []
+        
+        for recipient in recipients:
+            try:
+                # Personalize message
+                personalized_body = request.body.replace("{{name}}", recipient.get('customer_name', 'there'))
+                personalized_subject = request.subject.replace("{{name}}", recipient.get('customer_name', 'there')) if request.subject else None
                 
-                new_score = calculate_lead_score(lead_data, interactions)
+                # Simulate sending
+                message_data = {
+                    "recipient_id": recipient['lead_id'],
+                    "recipient_name": recipient['customer_name'],
+                    "type": request.type,
+                    "to": recipient['email'] if request.type == 'email' else recipient['phone'],
+                    "subject": personalized_subject,
+                    "body": personalized_body,
+                    "template": request.template,
+                    "status": "sent",  # In real implementation, this would be updated based on actual delivery status
+                    "sent_at": datetime.now().isoformat()
+                }
                 
-                # Update lead score
-                conn.execute(text("""
-                    UPDATE lead_info 
-                    SET lead_score = :score 
-                    WHERE user_id = :email
-                """), {"score": new_score, "email": interaction.email})
+                sent_messages.append(message_data)
                 
-                conn.commit()
+                # Log the message (in real implementation, you'd store this in a messages table)
+                print(f"Sending {request.type} to {recipient['customer_name']}: {message_data}")
                 
-                return {
-                    "message": "Interaction tracked successfully",
-                    "leadScore": new_score,
-                    "engagementScore": engagement_score
-                }
+            except Exception as e:
+                failed_messages.append({
+                    "recipient_id": recipient['lead_id'],
+                    "recipient_name": recipient['customer_name'],
+                    "error": str(e)
+                })
         
         return {
-            "message": "Interaction tracked successfully",
-            "engagementScore": engagement_score
-        }
-
-@app.delete("/leads/bulk-delete")
-async def bulk_delete_leads(request: BulkDeleteRequest):
-    try:
-        with engine.begin() as conn:
-            # Delete from lead_additional_info first (due to foreign key constraint)
-            delete_additional = text("""
-                DELETE FROM lead_additional_info 
-                WHERE lead_id = ANY(:lead_ids)
-            """)
-            conn.execute(delete_additional, {"lead_ids": request.lead_ids})
-            
-            # Delete from lead_info
-            delete_leads = text("""
-                DELETE FROM lead_info 
-                WHERE lead_id = ANY(:lead_ids)
-            """)
-            result = conn.execute(delete_leads, {"lead_ids": request.lead_ids})
-            
-            deleted_count = result.rowcount
-            
-        return {
-            "message": f"Successfully deleted {deleted_count} leads",
-            "deleted_count": deleted_count,
-            "deleted_ids": request.lead_ids
+            "message": f"Message sending completed",
+            "sent_count": len(sent_messages),
+            "failed_count": len(failed_messages),
+            "sent_messages": sent_messages,
+            "failed_messages": failed_messages
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error deleting leads: {str(e)}")
-
-@app.post("/leads/send-message")
-async def send_message(request: MessageRequest):
-    try:
-        with engine.connect() as conn:
-            # Get recipient details
-            recipients_query = text("""
-                SELECT lead_id, customer_name, email, phone, status
-                FROM lead_info 
-                WHERE lead_id = ANY(:lead_ids)
-            """)
-            
-            result = conn.execute(recipients_query, {"lead_ids": request.recipients})
-            recipients = [dict(row) for row in result]
-            
-            if not recipients:
-                raise HTTPException(status_code=400, detail="No valid recipients found")
-            
-            # For now, we'll simulate sending messages
-            # In a real implementation, you would integrate with:
-            # - Email service (SendGrid, AWS SES, etc.)
-            # - SMS service (Twilio, AWS SNS, etc.)
-            
-            sent_messages = []
-            failed_messages = []
-            
-            for recipient in recipients:
-                try:
-                    # Personalize message
-                    personalized_body = request.body.replace("{{name}}", recipient.get('customer_name', 'there'))
-                    personalized_subject = request.subject.replace("{{name}}", recipient.get('customer_name', 'there')) if request.subject else None
-                    
-                    # Simulate sending
-                    message_data = {
-                        "recipient_id": recipient['lead_id'],
-                        "recipient_name": recipient['customer_name'],
-                        "type": request.type,
-                        "to": recipient['email'] if request.type == 'email' else recipient['phone'],
-                        "subject": personalized_subject,
-                        "body": personalized_body,
-                        "template": request.template,
-                        "status": "sent",  # In real implementation, this would be updated based on actual delivery status
-                        "sent_at": datetime.now().isoformat()
-                    }
-                    
-                    sent_messages.append(message_data)
-                    
-                    # Log the message (in real implementation, you'd store this in a messages table)
-                    print(f"Sending {request.type} to {recipient['customer_name']}: {message_data}")
-                    
-                except Exception as e:
-                    failed_messages.append({
-                        "recipient_id": recipient['lead_id'],
-                        "recipient_name": recipient['customer_name'],
-                        "error": str(e)
-                    })
-            
-            return {
-                "message": f"Message sending completed",
-                "sent_count": len(sent_messages),
-                "failed_count": len(failed_messages),
-                "sent_messages": sent_messages,
-                "failed_messages": failed_messages
-            }
-            
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending messages: {str(e)}")
 
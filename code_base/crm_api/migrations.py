@@ -0,0 +1,446 @@
+import os
+from sqlalchemy import text
+from database import engine
+
+# Run pending migrations at startup instead of failing the version check
+AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', 'false').lower() == 'true'
+
+# Serializes concurrent migration runs (arbitrary application-wide key)
+MIGRATION_LOCK_ID = 74232001
+
+def create_base_tables(conn):
+    """Tables the API was creating on import before migrations existed"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id SERIAL PRIMARY KEY,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            role VARCHAR(50) NOT NULL DEFAULT 'agent',
+            profile_picture TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP,
+            is_active BOOLEAN DEFAULT TRUE
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS agent_profiles (
+            profile_id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(user_id) ON DELETE CASCADE,
+            public_url VARCHAR(255) UNIQUE NOT NULL,
+            bio TEXT,
+            phone VARCHAR(20),
+            profile_picture TEXT,
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS properties (
+            property_id SERIAL PRIMARY KEY,
+            label VARCHAR(255) NOT NULL,
+            description TEXT,
+            address TEXT,
+            area VARCHAR(100),
+            beds INTEGER,
+            baths INTEGER,
+            price DECIMAL(12,2),
+            property_type VARCHAR(100),
+            status VARCHAR(50) DEFAULT 'active',
+            assigned_agent_id INTEGER REFERENCES users(user_id),
+            created_by INTEGER REFERENCES users(user_id),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    conn.execute(text("""
+        ALTER TABLE properties
+        ADD COLUMN IF NOT EXISTS assigned_agent_id INTEGER REFERENCES users(user_id),
+        ADD COLUMN IF NOT EXISTS created_by INTEGER REFERENCES users(user_id),
+        ADD COLUMN IF NOT EXISTS status VARCHAR(50) DEFAULT 'active',
+        ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS property_assignments (
+            assignment_id SERIAL PRIMARY KEY,
+            property_id INTEGER REFERENCES properties(property_id) ON DELETE CASCADE,
+            agent_id INTEGER REFERENCES users(user_id) ON DELETE CASCADE,
+            assigned_by INTEGER REFERENCES users(user_id),
+            assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(50) DEFAULT 'active',
+            UNIQUE(property_id, agent_id)
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS leads (
+            lead_id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            phone VARCHAR(50),
+            message TEXT,
+            property_id INTEGER REFERENCES properties(property_id),
+            assigned_agent_id INTEGER REFERENCES users(user_id),
+            created_by INTEGER REFERENCES users(user_id),
+            status VARCHAR(50) DEFAULT 'new',
+            source VARCHAR(100) DEFAULT 'website',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS enquiries (
+            enquiry_id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            phone VARCHAR(50),
+            message TEXT,
+            property_id INTEGER REFERENCES properties(property_id),
+            assigned_agent_id INTEGER REFERENCES users(user_id),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(50) DEFAULT 'new'
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS user_interactions (
+            interaction_id SERIAL PRIMARY KEY,
+            session_id VARCHAR(255) NOT NULL,
+            action_type VARCHAR(50) NOT NULL,
+            element_id VARCHAR(100),
+            page_url VARCHAR(500),
+            property_id VARCHAR(50),
+            property_label VARCHAR(255),
+            phone VARCHAR(50),
+            email VARCHAR(255),
+            referrer VARCHAR(500),
+            user_agent TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            engagement_score INTEGER DEFAULT 0
+        )
+    """))
+
+    # Running per-email interaction counts used for lead scoring
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS interaction_counts (
+            email VARCHAR(255) NOT NULL,
+            action_type VARCHAR(50) NOT NULL,
+            interaction_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (email, action_type)
+        )
+    """))
+
+def update_schema_columns(conn):
+    """Tables, columns, indexes and the default admin from update_database_schema.py"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS lead_info (
+            lead_id SERIAL PRIMARY KEY,
+            customer_name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            phone VARCHAR(50),
+            status VARCHAR(50) DEFAULT 'new',
+            lead_score INTEGER DEFAULT 0,
+            property_interested VARCHAR(255),
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            lead_comments TEXT,
+            assigned_agent_id INTEGER REFERENCES users(user_id),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS interactions (
+            interaction_id SERIAL PRIMARY KEY,
+            session_id VARCHAR(255) NOT NULL,
+            action VARCHAR(100) NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            page VARCHAR(255),
+            user_agent TEXT,
+            element VARCHAR(255),
+            property_id VARCHAR(50),
+            property_label VARCHAR(255),
+            phone VARCHAR(50),
+            email VARCHAR(255),
+            referrer VARCHAR(500)
+        )
+    """))
+
+    columns_to_add = [
+        ("properties", "image_url", "TEXT"),
+        ("properties", "assigned_agent_id", "INTEGER REFERENCES users(user_id)"),
+        ("properties", "created_by", "INTEGER REFERENCES users(user_id)"),
+        ("properties", "updated_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        ("properties", "price", "DECIMAL(12,2)"),
+        ("properties", "property_type", "VARCHAR(100)"),
+        ("properties", "status", "VARCHAR(50) DEFAULT 'active'"),
+        ("properties", "area", "INTEGER"),
+        ("properties", "beds", "INTEGER"),
+        ("properties", "baths", "INTEGER"),
+        ("users", "assigned_agent_id", "INTEGER REFERENCES users(user_id)"),
+        ("users", "role", "VARCHAR(50) DEFAULT 'agent'"),
+        ("users", "profile_picture", "TEXT"),
+        ("users", "updated_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        ("agent_profiles", "specialization", "VARCHAR(255)"),
+        ("agent_profiles", "bio", "TEXT"),
+        ("agent_profiles", "public_url", "VARCHAR(255) NOT NULL DEFAULT 'agent'"),
+        ("agent_profiles", "phone", "VARCHAR(50)"),
+        ("agent_profiles", "updated_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        ("lead_info", "assigned_agent_id", "INTEGER REFERENCES users(user_id)"),
+        ("lead_info", "created_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        ("lead_info", "updated_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        ("lead_info", "lead_score", "INTEGER DEFAULT 0"),
+        ("lead_info", "property_interested", "VARCHAR(255)"),
+        ("lead_info", "lead_comments", "TEXT")
+    ]
+    for table, column, column_type in columns_to_add:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}"))
+
+    indexes = [
+        "CREATE INDEX IF NOT EXISTS idx_properties_assigned_agent ON properties(assigned_agent_id)",
+        "CREATE INDEX IF NOT EXISTS idx_properties_status ON properties(status)",
+        "CREATE INDEX IF NOT EXISTS idx_properties_type ON properties(property_type)",
+        "CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)",
+        "CREATE INDEX IF NOT EXISTS idx_lead_info_assigned_agent ON lead_info(assigned_agent_id)",
+        "CREATE INDEX IF NOT EXISTS idx_lead_info_status ON lead_info(status)",
+        "CREATE INDEX IF NOT EXISTS idx_interactions_session ON interactions(session_id)",
+        "CREATE INDEX IF NOT EXISTS idx_interactions_timestamp ON interactions(timestamp)"
+    ]
+    for index_sql in indexes:
+        conn.execute(text(index_sql))
+
+    user_count = conn.execute(text("SELECT COUNT(*) FROM users")).fetchone()[0]
+    if user_count == 0:
+        conn.execute(text("""
+            INSERT INTO users (email, name, role)
+            VALUES ('admin@realestate.com', 'System Administrator', 'admin')
+        """))
+
+def create_query_indexes(conn):
+    """Indexes for the hot API queries, as first listed in index_migrations.py"""
+    from index_migrations import apply_indexes
+    apply_indexes(conn, [
+        ("idx_properties_created", "properties", "(created_at DESC, property_id DESC)"),
+        ("idx_properties_agent_created", "properties",
+         "(assigned_agent_id, created_at DESC, property_id DESC) INCLUDE (status)"),
+        ("idx_properties_active_agent", "properties", "(assigned_agent_id, created_at DESC) WHERE status = 'active'"),
+        ("idx_agent_profiles_active_url", "agent_profiles", "(public_url) WHERE is_active = TRUE"),
+        ("idx_lead_info_created", "lead_info", "(created_date DESC, lead_id DESC)"),
+        ("idx_lead_info_agent_created", "lead_info",
+         "(assigned_agent_id, created_date DESC, lead_id DESC) INCLUDE (status)"),
+        ("idx_lead_info_user_created", "lead_info", "(user_id, created_date DESC)"),
+        ("idx_user_basic_info_email", "user_basic_info", "(email_id)"),
+        ("idx_leads_agent_created", "leads", "(assigned_agent_id, created_at DESC, lead_id DESC)"),
+        ("idx_user_interactions_email_action", "user_interactions", "(email, action_type) WHERE email IS NOT NULL"),
+    ])
+
+def create_dashboard_stats(conn):
+    """Materialized view behind the dashboard stats endpoints (see dashboard_stats.py)"""
+    conn.execute(text("""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS dashboard_stats AS
+        SELECT
+            0 AS agent_id,
+            (SELECT COUNT(*) FROM properties) AS total_properties,
+            (SELECT COUNT(*) FROM properties WHERE status = 'pending') AS pending_properties,
+            (SELECT COUNT(*) FROM users) AS total_users,
+            (SELECT COUNT(*) FROM leads) AS total_leads,
+            (SELECT COUNT(*) FROM lead_info) AS lead_count,
+            (SELECT COUNT(*) FROM lead_info WHERE status = 'new') AS new_lead_count,
+            (
+                SELECT COALESCE(jsonb_object_agg(status, count), '{}'::jsonb)
+                FROM (
+                    SELECT COALESCE(status, 'null') AS status, COUNT(*) AS count
+                    FROM lead_info
+                    GROUP BY 1
+                ) s
+            ) AS lead_status_breakdown,
+            (SELECT AVG(lead_score) FROM lead_info WHERE lead_score IS NOT NULL) AS average_lead_score,
+            NOW() AS refreshed_at
+        UNION ALL
+        SELECT
+            agent_id,
+            SUM(is_property) AS total_properties,
+            0 AS pending_properties,
+            0 AS total_users,
+            0 AS total_leads,
+            SUM(is_lead) AS lead_count,
+            SUM(is_new_lead) AS new_lead_count,
+            NULL AS lead_status_breakdown,
+            NULL AS average_lead_score,
+            NOW() AS refreshed_at
+        FROM (
+            SELECT assigned_agent_id AS agent_id, 1 AS is_property, 0 AS is_lead, 0 AS is_new_lead
+            FROM properties
+            WHERE assigned_agent_id IS NOT NULL
+            UNION ALL
+            SELECT assigned_agent_id, 0, 1, CASE WHEN status = 'new' THEN 1 ELSE 0 END
+            FROM lead_info
+            WHERE assigned_agent_id IS NOT NULL
+        ) agent_rows
+        GROUP BY agent_id
+    """))
+    # REFRESH ... CONCURRENTLY needs a unique index
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_dashboard_stats_agent ON dashboard_stats (agent_id)"))
+
+def add_score_version(conn):
+    """Weights version each stored lead score was computed with (see scoring_config.py)"""
+    conn.execute(text("ALTER TABLE lead_info ADD COLUMN IF NOT EXISTS score_version VARCHAR(16)"))
+
+def create_property_search(conn):
+    """Full-text search column and GIN index behind GET /properties/search (see property_search.py)"""
+    from index_migrations import create_index
+    # Matches in the label rank above area, address and description
+    conn.execute(text("""
+        ALTER TABLE properties
+        ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', COALESCE(label, '')), 'A') ||
+            setweight(to_tsvector('english', COALESCE(area::text, '')), 'B') ||
+            setweight(to_tsvector('english', COALESCE(address, '')), 'C') ||
+            setweight(to_tsvector('english', COALESCE(description, '')), 'D')
+        ) STORED
+    """))
+    create_index(conn, "idx_properties_search", "properties", "USING GIN (search_vector)")
+
+def create_catalog_notifications(conn):
+    """NOTIFY triggers that keep the in-process property catalog current (see catalog.py)"""
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION notify_property_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('catalog_changes', 'property:' ||
+                CASE TG_OP WHEN 'DELETE' THEN OLD.property_id ELSE NEW.property_id END);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION notify_agent_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('catalog_changes', 'agent:' ||
+                CASE TG_OP WHEN 'DELETE' THEN OLD.user_id ELSE NEW.user_id END);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS properties_catalog_notify ON properties;
+        CREATE TRIGGER properties_catalog_notify
+            AFTER INSERT OR UPDATE OR DELETE ON properties
+            FOR EACH ROW EXECUTE FUNCTION notify_property_change();
+
+        DROP TRIGGER IF EXISTS agent_profiles_catalog_notify ON agent_profiles;
+        CREATE TRIGGER agent_profiles_catalog_notify
+            AFTER INSERT OR UPDATE OR DELETE ON agent_profiles
+            FOR EACH ROW EXECUTE FUNCTION notify_agent_change();
+
+        -- Agent names and emails are copied into properties and public pages
+        DROP TRIGGER IF EXISTS users_catalog_notify ON users;
+        CREATE TRIGGER users_catalog_notify
+            AFTER UPDATE OF name, email ON users
+            FOR EACH ROW EXECUTE FUNCTION notify_agent_change();
+    """))
+
+def require_listing_timestamps(conn):
+    """Backfill and require the timestamps the keyset-paged listings sort and page on"""
+    # Rows with no creation time sort as if created when last updated, else at the epoch
+    conn.execute(text("""
+        UPDATE properties SET created_at = COALESCE(updated_at, 'epoch') WHERE created_at IS NULL;
+        UPDATE lead_info SET created_date = COALESCE(created_at, updated_at, 'epoch') WHERE created_date IS NULL;
+        UPDATE leads SET created_at = COALESCE(updated_at, 'epoch') WHERE created_at IS NULL;
+
+        ALTER TABLE properties ALTER COLUMN created_at SET NOT NULL;
+        ALTER TABLE lead_info ALTER COLUMN created_date SET NOT NULL;
+        ALTER TABLE leads ALTER COLUMN created_at SET NOT NULL;
+    """))
+
+# (version, description, function, transactional)
+# Append new migrations at the end; never edit or reorder applied ones.
+# Each migration carries its own SQL rather than importing it from the
+# module that uses the schema, so later edits there cannot change what
+# a fresh database gets.
+# Non-transactional migrations get an autocommit connection (e.g. for
+# CREATE INDEX CONCURRENTLY) and must be safe to re-run.
+MIGRATIONS = [
+    (1, "base tables", create_base_tables, True),
+    (2, "columns and indexes from update_database_schema", update_schema_columns, True),
+    (3, "query indexes", create_query_indexes, False),
+    (4, "dashboard stats view", create_dashboard_stats, True),
+    (5, "lead score version", add_score_version, True),
+    (6, "property search vector", create_property_search, False),
+    (7, "property catalog notifications", create_catalog_notifications, True),
+    (8, "required listing timestamps", require_listing_timestamps, True),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def _ensure_version_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+def current_version(conn):
+    """Highest applied migration, or 0 for a database that has none"""
+    if not conn.execute(text("SELECT to_regclass('schema_migrations') IS NOT NULL")).scalar():
+        return 0
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+def migrate(target=SCHEMA_VERSION):
+    """Apply every pending migration up to target; returns the versions applied"""
+    applied = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        # Session-level lock so parallel deploys apply each migration once
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            _ensure_version_table(lock_conn)
+            version = current_version(lock_conn)
+
+            for migration_version, description, fn, transactional in MIGRATIONS:
+                if migration_version <= version or migration_version > target:
+                    continue
+                print(f"🔄 Applying migration {migration_version}: {description}...")
+                if transactional:
+                    with engine.begin() as conn:
+                        fn(conn)
+                        _record(conn, migration_version, description)
+                else:
+                    fn(lock_conn)
+                    _record(lock_conn, migration_version, description)
+                print(f"✅ Migration {migration_version} applied")
+                applied.append(migration_version)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+    return applied
+
+def _record(conn, version, description):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+        {"version": version, "description": description}
+    )
+
+async def check_schema_version(async_engine):
+    """Startup check: one cheap query comparing the database to SCHEMA_VERSION
+
+    With AUTO_MIGRATE=true pending migrations are applied instead of
+    failing, which suits local development.
+    """
+    async with async_engine.connect() as conn:
+        version = await conn.run_sync(current_version)
+
+    if version < SCHEMA_VERSION:
+        if AUTO_MIGRATE:
+            from starlette.concurrency import run_in_threadpool
+            await run_in_threadpool(migrate)
+            return
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {SCHEMA_VERSION}. "
+            f"Run `python update_database_schema.py` before starting the API."
+        )
+    if version > SCHEMA_VERSION:
+        print(f"⚠️ Database schema version {version} is newer than this build ({SCHEMA_VERSION})")
@@ -46,6 +46,32 @@ class PropertyAssignment(BaseModel):
     property_id: int
     agent_id: int
 
+# Bulk Property Models (/admin/properties/bulk)
+class PropertyBulkUpdateItem(BaseModel):
+    property_id: int
+    label: Optional[str] = None
+    description: Optional[str] = None
+    address: Optional[str] = None
+    area: Optional[str] = None
+    beds: Optional[int] = None
+    baths: Optional[int] = None
+    price: Optional[float] = None
+    property_type: Optional[str] = None
+    status: Optional[str] = None
+    image_url: Optional[str] = None
+
+class PropertyBulkCreate(BaseModel):
+    properties: List[PropertyCreate]
+
+class PropertyBulkUpdate(BaseModel):
+    properties: List[PropertyBulkUpdateItem]
+
+class PropertyBulkApprove(BaseModel):
+    property_ids: List[int]
+
+class PropertyBulkAssign(BaseModel):
+    assignments: List[PropertyAssignment]
+
 # Agent Profile Models
 class AgentProfile(BaseModel):
     profile_id: int
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import threading
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import text
+
+# Seconds an exact count is reused when an approximate count is requested
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "60"))
+# Most distinct filter combinations whose counts are kept (LRU)
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "1000"))
+
+COUNT_MODES = ("exact", "approximate", "none")
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    payload = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Decode a cursor from encode_cursor into (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def next_cursor(rows, page_size: int, id_column: str, time_column: str = "created_at") -> Optional[str]:
+    """Cursor for the page after rows, or None on the last page
+
+    rows is fetched with LIMIT page_size + 1; the extra row only signals
+    that another page exists and is dropped by the caller.
+    """
+    if len(rows) <= page_size:
+        return None
+    last = rows[page_size - 1]
+    return encode_cursor(getattr(last, time_column), getattr(last, id_column))
+
+class CountCache:
+    """Bounded LRU of exact row counts, each reused for COUNT_CACHE_TTL seconds"""
+
+    def __init__(self, max_entries: int = COUNT_CACHE_MAX_ENTRIES, ttl: float = COUNT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._counts[key]
+                return None
+            self._counts.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._counts[key] = (value, time.monotonic() + self.ttl)
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+count_cache = CountCache()
+
+async def table_estimate(conn, table: str) -> Optional[int]:
+    """Planner row estimate for a table from pg_class.reltuples"""
+    result = await conn.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table}
+    )
+    row = result.fetchone()
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    if not row or row[0] < 0:
+        return None
+    return row[0]
+
+async def count_rows(conn, mode: str, count_query: str, params: dict = None, table: str = None):
+    """Count rows for a listing according to mode
+
+    exact runs count_query every time. approximate uses the pg_class
+    estimate when the listing covers the whole table (table given) and
+    otherwise a recently cached exact count. none skips counting.
+    """
+    if mode == "none":
+        return None
+    if mode == "approximate":
+        if table:
+            estimate = await table_estimate(conn, table)
+            if estimate is not None:
+                return estimate
+        key = (count_query, tuple(sorted((params or {}).items())))
+        cached = count_cache.get(key)
+        if cached is not None:
+            return cached
+        total = (await conn.execute(text(count_query), params or {})).scalar()
+        count_cache.set(key, total)
+        return total
+    return (await conn.execute(text(count_query), params or {})).scalar()
@@ -1,7 +1,7 @@
 import os
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy import text
 from dotenv import load_dotenv
+from db_engine import get_engine
 
 class PostgreUtil:
     def __init__(self):
@@ -30,10 +30,10 @@ class PostgreUtil:
         USE_CLOUD = os.getenv('USE_CLOUD_DB', 'true').lower() == 'true'
         
         if USE_CLOUD:
-            self.engine = create_engine(CLOUD_DATABASE_URL, pool_pre_ping=True)
+            self.engine = get_engine(CLOUD_DATABASE_URL)
             print("Using Cloud Database (PostgreUtil)")
         else:
-            self.engine = create_engine(LOCAL_DATABASE_URL, pool_pre_ping=True)
+            self.engine = get_engine(LOCAL_DATABASE_URL)
             print("Using Local Database (PostgreUtil)")
 
     def custom_query(self, query, params=None):
@@ -0,0 +1,79 @@
+# Text search configuration of the search queries; search_vector is generated
+# with the same one (migration 6)
+SEARCH_CONFIG = "english"
+
+SEARCH_QUERY = f"websearch_to_tsquery('{SEARCH_CONFIG}', :q)"
+
+# Upper bounds of the price facet buckets; the last bucket is open ended
+PRICE_BUCKETS = (100000, 250000, 500000, 1000000, 2000000)
+
+# Most common values returned for the property_type and area facets
+FACET_LIMIT = 20
+
+def facet_query(base_filters, type_filter="TRUE", area_filter="TRUE", price_filter="TRUE") -> str:
+    """Total and facet counts for a search in one statement
+
+    Each facet is counted with every filter except its own, so the
+    counts show what choosing another value would return.
+    """
+    where = f"WHERE {' AND '.join(base_filters)}" if base_filters else ""
+    return f"""
+        WITH matched AS (
+            SELECT
+                p.property_type,
+                p.area::text AS area,
+                p.price,
+                {type_filter} AS type_ok,
+                {area_filter} AS area_ok,
+                {price_filter} AS price_ok
+            FROM properties p
+            {where}
+        )
+        SELECT 'total' AS facet, NULL AS value, COUNT(*) AS count
+        FROM matched
+        WHERE type_ok AND area_ok AND price_ok
+        UNION ALL
+        SELECT 'property_type', property_type, COUNT(*)
+        FROM matched
+        WHERE area_ok AND price_ok AND property_type IS NOT NULL
+        GROUP BY property_type
+        UNION ALL
+        SELECT 'area', area, COUNT(*)
+        FROM matched
+        WHERE type_ok AND price_ok AND area IS NOT NULL
+        GROUP BY area
+        UNION ALL
+        SELECT 'price', width_bucket(price, CAST(:price_buckets AS NUMERIC[]))::text, COUNT(*)
+        FROM matched
+        WHERE type_ok AND area_ok AND price IS NOT NULL
+        GROUP BY 2
+    """
+
+def price_bucket_bounds(bucket: int):
+    """(min, max) of a width_bucket() result over PRICE_BUCKETS; None is unbounded"""
+    low = PRICE_BUCKETS[bucket - 1] if bucket > 0 else 0
+    high = PRICE_BUCKETS[bucket] if bucket < len(PRICE_BUCKETS) else None
+    return low, high
+
+def build_facets(rows):
+    """(total, facets) from the rows of facet_query"""
+    total = 0
+    values = {"property_type": [], "area": []}
+    buckets = {}
+    for row in rows:
+        if row.facet == "total":
+            total = row.count
+        elif row.facet == "price":
+            buckets[int(row.value)] = row.count
+        else:
+            values[row.facet].append({"value": row.value, "count": row.count})
+
+    facets = {
+        name: sorted(counts, key=lambda item: (-item["count"], item["value"]))[:FACET_LIMIT]
+        for name, counts in values.items()
+    }
+    facets["price"] = []
+    for bucket in range(len(PRICE_BUCKETS) + 1):
+        low, high = price_bucket_bounds(bucket)
+        facets["price"].append({"min": low, "max": high, "count": buckets.get(bucket, 0)})
+    return total, facets
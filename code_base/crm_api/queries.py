@@ -0,0 +1,146 @@
+from serialization import RowEncoder
+from catalog import PROPERTY_FIELDS, PUBLIC_PROPERTY_FIELDS
+from property_search import SEARCH_QUERY
+
+# SQL for the listing and detail endpoints in main.py, shared with
+# check_query_plans.py so the plan check runs the statements the API runs
+
+PROPERTY_SORT_COLUMNS = {
+    "created_at": "p.created_at",
+    "price": "p.price",
+    "beds": "p.beds",
+    "baths": "p.baths",
+    "label": "p.label"
+}
+
+LEAD_SORT_COLUMNS = {
+    "created_date": "l.created_date",
+    "lead_score": "l.lead_score"
+}
+
+# Same fields as the catalog's pre-encoded entries
+PROPERTY_COLUMNS = RowEncoder(*PROPERTY_FIELDS)
+
+# GET /agent/properties
+AGENT_PROPERTY_COLUMNS = RowEncoder(
+    "property_id", "label", "description", "address", "area", "beds", "baths", "price",
+    "property_type", "status", "created_at", "updated_at"
+)
+
+# Properties on an agent's public page
+PUBLIC_PROPERTY_COLUMNS = RowEncoder(*PUBLIC_PROPERTY_FIELDS)
+
+LEAD_COLUMNS = RowEncoder(
+    "lead_id", "customer_name", "email", "phone", "status", "lead_score",
+    "property_interested", "created_date", "lead_comments"
+)
+
+# Select lists for the encoders above, so listings skip search_vector
+PROPERTY_SELECT = ", ".join(f"p.{column}" for column in PROPERTY_COLUMNS.columns if column != "agent_name")
+AGENT_PROPERTY_SELECT = ", ".join(AGENT_PROPERTY_COLUMNS.columns)
+PUBLIC_PROPERTY_SELECT = ", ".join(PUBLIC_PROPERTY_COLUMNS.columns)
+
+# Full-text match and relevance for GET /properties/search
+SEARCH_FILTER = f"p.search_vector @@ {SEARCH_QUERY}"
+SEARCH_RANK = f"ts_rank_cd(p.search_vector, {SEARCH_QUERY})"
+
+def where(filters) -> str:
+    return f"WHERE {' AND '.join(filters)}" if filters else ""
+
+def keyset_filter(time_column: str, id_column: str, order: str = "desc") -> str:
+    """Rows after the (:cursor_created_at, :cursor_id) position from decode_cursor"""
+    comparison = "<" if order == "desc" else ">"
+    return f"({time_column}, {id_column}) {comparison} (:cursor_created_at, :cursor_id)"
+
+def property_order_by(sort: str = "created_at", order: str = "desc") -> str:
+    direction = order.upper()
+    # created_at keeps the default null ordering so idx_properties_created serves it
+    nulls = "" if sort == "created_at" else " NULLS LAST"
+    return f"{PROPERTY_SORT_COLUMNS[sort]} {direction}{nulls}, p.property_id {direction}"
+
+def lead_order_by(sort: str = "created_date", order: str = "desc") -> str:
+    direction = order.upper()
+    nulls = "" if sort == "created_date" else " NULLS LAST"
+    return f"{LEAD_SORT_COLUMNS[sort]} {direction}{nulls}, l.lead_id {direction}"
+
+def property_query(filters=(), order_by: str = None, page_clause: str = "", extra_columns: str = "") -> str:
+    """Properties with their agent's name, as GET /properties and the admin listing return them"""
+    return f"""
+        SELECT {PROPERTY_SELECT}, u.name as agent_name{extra_columns}
+        FROM properties p
+        LEFT JOIN users u ON p.assigned_agent_id = u.user_id
+        {where(filters)}
+        {f"ORDER BY {order_by}" if order_by else ""}
+        {page_clause}
+    """
+
+def property_count_query(filters=()) -> str:
+    return f"SELECT COUNT(*) FROM properties p {where(filters)}"
+
+PROPERTY_DETAIL_QUERY = property_query(["p.property_id = :property_id"])
+
+def search_query(filters, rank: str, order_by: str) -> str:
+    return property_query(filters, order_by, "LIMIT :limit OFFSET :offset", f", {rank} AS rank")
+
+def agent_property_query(page_filter: str = "", page_clause: str = "") -> str:
+    """GET /agent/properties; page_filter is an AND clause"""
+    return f"""
+        SELECT {AGENT_PROPERTY_SELECT} FROM properties
+        WHERE assigned_agent_id = :agent_id
+        {page_filter}
+        ORDER BY created_at DESC, property_id DESC
+        {page_clause}
+    """
+
+AGENT_PROPERTY_COUNT_QUERY = "SELECT COUNT(*) FROM properties WHERE assigned_agent_id = :agent_id"
+
+AGENT_PROFILE_QUERY = """
+    SELECT ap.*, u.name, u.email
+    FROM agent_profiles ap
+    JOIN users u ON ap.user_id = u.user_id
+    WHERE ap.public_url = :public_url AND ap.is_active = TRUE
+"""
+
+AGENT_PAGE_PROPERTIES_QUERY = f"""
+    SELECT {PUBLIC_PROPERTY_SELECT} FROM properties
+    WHERE assigned_agent_id = :agent_id AND status = 'active'
+    ORDER BY created_at DESC
+"""
+
+def agent_lead_query(page_filter: str = "", page_clause: str = "") -> str:
+    """GET /agent/leads; page_filter is an AND clause"""
+    return f"""
+        SELECT l.*, p.label as property_label
+        FROM leads l
+        LEFT JOIN properties p ON l.property_id = p.property_id
+        WHERE l.assigned_agent_id = :agent_id
+        {page_filter}
+        ORDER BY l.created_at DESC, l.lead_id DESC
+        {page_clause}
+    """
+
+AGENT_LEAD_COUNT_QUERY = "SELECT COUNT(*) FROM leads WHERE assigned_agent_id = :agent_id"
+
+def lead_query(filters=(), order_by: str = None, page_clause: str = "") -> str:
+    """GET /leads, with the columns scored_lead_dicts and score_leads need"""
+    return f"""
+        SELECT
+            l.lead_id,
+            u.display_name as customer_name,
+            l.user_id as email,
+            NULL as phone,  -- Phone not available in current schema
+            l.status,
+            l.lead_comments,
+            l.created_date,
+            l.property_interested,
+            l.lead_score,
+            l.score_version
+        FROM lead_info l
+        LEFT JOIN user_basic_info u ON l.user_id = u.email_id
+        {where(filters)}
+        {f"ORDER BY {order_by}" if order_by else ""}
+        {page_clause}
+    """
+
+def lead_count_query(filters=()) -> str:
+    return f"SELECT COUNT(*) FROM lead_info l {where(filters)}"
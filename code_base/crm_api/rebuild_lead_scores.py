@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Lead Score Reconciliation Script
+Rebuilds the running interaction counts from user_interactions and
+rescores every lead. Run after changing scoring weights or if the
+counts drift from the interaction history.
+
+Leads are scored with the vectorized batch engine in batch_scoring.py
+and written back one chunk (and transaction) at a time.
+
+Usage:
+    python rebuild_lead_scores.py                  # rebuild counts, rescore all leads
+    python rebuild_lead_scores.py --skip-counts    # rescore only
+    python rebuild_lead_scores.py --stale-only     # rescore only leads scored with other weights
+    python rebuild_lead_scores.py --dry-run        # count the scores that would change
+"""
+
+import time
+import argparse
+from database import engine
+from lead_scoring import rebuild_interaction_counts
+from batch_scoring import BATCH_SCORE_CHUNK_ROWS, batch_rescore_leads
+from scoring_config import get_scoring_config
+
+def rebuild_lead_scores(skip_counts=False, dry_run=False, stale_only=False, chunk_rows=BATCH_SCORE_CHUNK_ROWS):
+    """Rebuild interaction_counts and recompute all lead scores"""
+    print(f"🔄 Rebuilding lead scores with weights version {get_scoring_config().version}...")
+
+    try:
+        if not skip_counts and not dry_run:
+            print("📋 Rebuilding interaction counts...")
+            with engine.begin() as conn:
+                count_rows = rebuild_interaction_counts(conn)
+            print(f"✅ {count_rows} email/action counts rebuilt")
+
+        print("📊 Rescoring leads..." + (" (dry run)" if dry_run else ""))
+        started = time.perf_counter()
+        lead_count, changed = batch_rescore_leads(
+            engine, chunk_rows, dry_run=dry_run, stale_only=stale_only,
+            progress=lambda scored, changed: print(f"   {scored} leads scored, {changed} changed")
+        )
+        elapsed = time.perf_counter() - started
+        rate = lead_count / elapsed if elapsed else 0.0
+        print(f"✅ {lead_count} leads rescored, {changed} {'would change' if dry_run else 'changed'} "
+              f"in {elapsed:.1f}s ({rate:,.0f} leads/s)")
+
+        print("🎉 Lead score rebuild completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Error rebuilding lead scores: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild interaction counts and rescore every lead")
+    parser.add_argument("--skip-counts", action="store_true", help="keep interaction_counts as they are")
+    parser.add_argument("--dry-run", action="store_true", help="score without writing anything")
+    parser.add_argument("--stale-only", action="store_true",
+                        help="rescore only leads whose score_version is not the current weights version")
+    parser.add_argument("--chunk-rows", type=int, default=BATCH_SCORE_CHUNK_ROWS, help="leads per chunk/transaction")
+    args = parser.parse_args()
+
+    rebuild_lead_scores(args.skip_counts or args.stale_only, args.dry_run, args.stale_only, args.chunk_rows)
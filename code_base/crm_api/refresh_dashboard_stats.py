@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Dashboard Stats Rebuild Script
+Refreshes the dashboard_stats materialized view right away instead of
+waiting for the API's background refresher. Pass --recreate to drop and
+rebuild the view, e.g. after changing its definition in dashboard_stats.py.
+"""
+
+import sys
+from sqlalchemy import text
+from database import engine
+from dashboard_stats import rebuild_stats_view
+
+def refresh_dashboard_stats(recreate=False):
+    """Refresh (or recreate) dashboard_stats and print the global row"""
+    print("🔄 Rebuilding dashboard stats...")
+
+    with engine.begin() as conn:
+        try:
+            if recreate:
+                print("📋 Recreating dashboard_stats view...")
+                rebuild_stats_view(conn)
+            else:
+                conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY dashboard_stats"))
+
+            row = conn.execute(text("SELECT * FROM dashboard_stats WHERE agent_id = 0")).fetchone()
+            agents = conn.execute(text("SELECT COUNT(*) FROM dashboard_stats WHERE agent_id <> 0")).scalar()
+            print(f"✅ {row.total_properties} properties, {row.total_users} users, "
+                  f"{row.lead_count} leads, {agents} agent row(s)")
+            print("🎉 Dashboard stats rebuild completed successfully!")
+
+        except Exception as e:
+            print(f"❌ Error rebuilding dashboard stats: {e}")
+            raise
+
+if __name__ == "__main__":
+    refresh_dashboard_stats(recreate="--recreate" in sys.argv[1:])
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+# JSON file overriding any of DEFAULT_WEIGHTS; empty uses the defaults
+SCORING_CONFIG_PATH = os.getenv("SCORING_CONFIG_PATH", "")
+# Seconds between checks of the file for changes (hot reload)
+SCORING_RELOAD_INTERVAL = float(os.getenv("SCORING_RELOAD_INTERVAL", "5"))
+
+logger = logging.getLogger("crm.scoring")
+
+DEFAULT_WEIGHTS = {
+    "base": 10,
+    # [longer than, points] for lead_comments, first match wins; no comment scores 0
+    "message_length": [[100, 20], [50, 15], [20, 10], [0, 5]],
+    "free_mail_domains": ["gmail.com", "yahoo.com", "hotmail.com"],
+    "free_mail": 5,
+    "business_email": 15,
+    # Customer name of at least two words
+    "full_name": 10,
+    "created_date": 5,
+    # Points per action type the visitor has done (also the engagement score of /track-interaction)
+    "actions": {
+        "property_view": 15,
+        "property_detail_view": 20,
+        "contact_click": 25,
+        "enquiry_form_open": 10,
+        "enquiry_submitted": 30,
+        "phone_click": 20,
+        "email_click": 15,
+        "page_view": 2
+    },
+    "max_score": 100
+}
+
+class ScoringConfig:
+    """Lead scoring weights compiled into lookup tables
+
+    version is a hash of the weights, so it changes with any weight and
+    is stamped on every stored score (lead_info.score_version).
+    """
+    __slots__ = (
+        "weights", "version", "base", "message_thresholds", "message_table", "free_mail_domains",
+        "free_mail", "business_email", "full_name", "created_date", "action_points", "max_score"
+    )
+
+    def __init__(self, weights: dict):
+        unknown = set(weights) - set(DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown scoring weights: {', '.join(sorted(unknown))}")
+        weights = {**DEFAULT_WEIGHTS, **weights}
+
+        self.weights = weights
+        self.version = hashlib.sha1(json.dumps(weights, sort_keys=True).encode()).hexdigest()[:12]
+        self.base = int(weights["base"])
+        self.free_mail_domains = frozenset(domain.lower() for domain in weights["free_mail_domains"])
+        self.free_mail = int(weights["free_mail"])
+        self.business_email = int(weights["business_email"])
+        self.full_name = int(weights["full_name"])
+        self.created_date = int(weights["created_date"])
+        self.action_points = {action: int(points) for action, points in weights["actions"].items()}
+        self.max_score = int(weights["max_score"])
+
+        self.message_thresholds = [(int(longer_than), int(points)) for longer_than, points in weights["message_length"]]
+        # Points for every comment length up to the longest threshold + 1; longer comments use the last entry
+        table_size = max([longer_than for longer_than, _ in self.message_thresholds], default=0) + 2
+        self.message_table = tuple(self._message_points(length) for length in range(table_size))
+
+    def _message_points(self, length: int) -> int:
+        for longer_than, points in self.message_thresholds:
+            if length > longer_than:
+                return points
+        return 0
+
+    def message_score(self, comments) -> int:
+        if not comments:
+            return 0
+        return self.message_table[min(len(comments), len(self.message_table) - 1)]
+
+    def email_score(self, email) -> int:
+        if not email:
+            return 0
+        if email.split('@')[-1].lower() in self.free_mail_domains:
+            return self.free_mail
+        return self.business_email  # Business email
+
+    def name_score(self, customer_name) -> int:
+        return self.full_name if customer_name and len(customer_name.split()) >= 2 else 0
+
+    def action_score(self, action_type) -> int:
+        return self.action_points.get(action_type, 0)
+
+    def score(self, lead_data, interactions=None) -> int:
+        score = self.base
+        score += self.message_score(lead_data.get('lead_comments'))
+        score += self.email_score(lead_data.get('user_id', ''))
+        score += self.name_score(lead_data.get('customer_name', ''))
+        if lead_data.get('created_date'):
+            score += self.created_date
+        if interactions:
+            action_points = self.action_points
+            for interaction in interactions:
+                score += action_points.get(interaction['action_type'], 0)
+        return min(score, self.max_score)
+
+class ScoringConfigStore:
+    """Holds the current ScoringConfig and reloads it when its file changes
+
+    A file that fails to load is logged and the previous weights stay in use.
+    """
+
+    def __init__(self, path: str = SCORING_CONFIG_PATH, reload_interval: float = SCORING_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._config = ScoringConfig({})
+        self._mtime = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ScoringConfig:
+        with open(self.path) as f:
+            return ScoringConfig(json.load(f))
+
+    def reload(self, force=False) -> ScoringConfig:
+        """Load the file if it changed since the last load (or always, with force)"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if not self.path:
+                return self._config
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if force or mtime != self._mtime:
+                    config = self._load()
+                    if config.version != self._config.version:
+                        logger.info("Scoring weights %s loaded from %s", config.version, self.path)
+                    self._config = config
+                    self._mtime = mtime
+            except (OSError, ValueError, TypeError, KeyError) as e:
+                logger.error("Keeping scoring weights %s, could not load %s: %s", self._config.version, self.path, e)
+                if force:
+                    raise
+            return self._config
+
+    def current(self) -> ScoringConfig:
+        if self.path and (self._checked_at is None or time.monotonic() - self._checked_at >= self.reload_interval):
+            return self.reload()
+        return self._config
+
+scoring_config = ScoringConfigStore()
+
+def get_scoring_config() -> ScoringConfig:
+    return scoring_config.current()
@@ -0,0 +1,58 @@
+import time
+from decimal import Decimal
+from operator import itemgetter
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from instrumentation import record_serialization
+
+def _default(obj):
+    # Same as FastAPI's encoder: integral Decimals become ints, others floats
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    return jsonable_encoder(obj)
+
+def dumps_json(content) -> bytes:
+    """Encode content as compact UTF-8 JSON
+
+    datetimes, dates and UUIDs are encoded natively by orjson; anything
+    else it does not know (Decimal, pydantic models) goes through _default.
+    """
+    started = time.perf_counter()
+    body = orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    record_serialization(time.perf_counter() - started)
+    return body
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson
+
+    Returning it from a handler also skips FastAPI's jsonable_encoder
+    pass over the content, which dominates the cost of large listings.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+class RowEncoder:
+    """Turns result rows into dicts of a fixed set of columns, ready for dumps_json
+
+    Column positions are resolved once per batch, so each row costs a
+    single dict(zip(...)) instead of one attribute lookup per field.
+    """
+
+    def __init__(self, *columns: str):
+        self.columns = columns
+
+    def dicts(self, rows) -> list:
+        if not rows:
+            return []
+        fields = rows[0]._fields
+        getter = itemgetter(*(fields.index(column) for column in self.columns))
+        columns = self.columns
+        if len(columns) == 1:
+            return [{columns[0]: getter(row)} for row in rows]
+        return [dict(zip(columns, getter(row))) for row in rows]
+
+    def dict(self, row) -> dict:
+        return self.dicts([row])[0]
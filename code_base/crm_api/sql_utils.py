@@ -1,9 +1,148 @@
 import os
+import io
+import json
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from psycopg2 import sql
 from postgre_util import PostgreUtil
 from sqlalchemy import text
 
+# Export configuration
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '50000'))
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', '4'))
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+# Import configuration
+IMPORT_CHUNK_ROWS = int(os.getenv('IMPORT_CHUNK_ROWS', '50000'))
+IMPORT_SAMPLE_ROWS = int(os.getenv('IMPORT_SAMPLE_ROWS', '10000'))
+
+IMPORT_MODES = ('append', 'upsert', 'replace')
+
+BOOLEAN_VALUES = {'t', 'f', 'true', 'false', 'y', 'n', 'yes', 'no', 'on', 'off', '1', '0'}
+
+# Only empty fields are NULL; text such as "NA" or "None" is loaded as written
+CSV_NA_OPTIONS = {'keep_default_na': False, 'na_values': ['']}
+
+class ExportResult:
+    """Row and byte counts for one exported table"""
+
+    def __init__(self, table_name, path, rows, bytes_written, seconds):
+        self.table_name = table_name
+        self.path = path
+        self.rows = rows
+        self.bytes_written = bytes_written
+        self.seconds = seconds
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_sec(self):
+        return self.bytes_written / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.table_name}: {self.rows} rows, {self.bytes_written} bytes in {self.seconds:.2f}s "
+            f"({self.rows_per_sec:,.0f} rows/s, {self.bytes_per_sec / 1024 / 1024:,.2f} MB/s)"
+        )
+
+class ImportResult:
+    """Loaded and rejected row counts for one CSV import"""
+
+    def __init__(self, table_name, mode, rows, rejected, seconds, reject_path=None):
+        self.table_name = table_name
+        self.mode = mode
+        self.rows = rows
+        self.rejected = rejected
+        self.seconds = seconds
+        self.reject_path = reject_path
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        summary = (
+            f"{self.table_name} ({self.mode}): {self.rows} rows loaded, {self.rejected} rejected "
+            f"in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s)"
+        )
+        if self.rejected:
+            summary += f", rejects in {self.reject_path}"
+        return summary
+
+class _CountingWriter:
+    """File wrapper that counts the bytes written through it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.f.write(data)
+
+def _arrow_column(udt_name):
+    """Arrow type and Python value converter for a Postgres column type"""
+    import pyarrow as pa
+    types = {
+        'int2': pa.int16(), 'int4': pa.int32(), 'int8': pa.int64(),
+        'float4': pa.float32(), 'float8': pa.float64(), 'numeric': pa.float64(),
+        'bool': pa.bool_(), 'date': pa.date32(),
+        'timestamp': pa.timestamp('us'), 'timestamptz': pa.timestamp('us', tz='UTC')
+    }
+    if udt_name == 'numeric':
+        return types[udt_name], float
+    if udt_name in types:
+        return types[udt_name], None
+    if udt_name in ('json', 'jsonb'):
+        return pa.string(), json.dumps
+    # Text, varchar, uuid and anything else are written as strings
+    return pa.string(), str
+
+def infer_column_types(sample):
+    """Postgres column types for a sample DataFrame read with pandas' own inference"""
+    types = {}
+    for column in sample.columns:
+        dtype = sample[column].dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            types[column] = 'BOOLEAN'
+        elif pd.api.types.is_integer_dtype(dtype):
+            types[column] = 'BIGINT'
+        elif pd.api.types.is_float_dtype(dtype):
+            values = sample[column].dropna()
+            # Integer columns with blanks come back as float
+            types[column] = 'BIGINT' if len(values) and (values % 1 == 0).all() else 'DOUBLE PRECISION'
+        else:
+            values = sample[column].dropna().astype(str)
+            try:
+                if len(values):
+                    pd.to_datetime(values, format='ISO8601')
+                    types[column] = 'TIMESTAMP'
+                    continue
+            except (ValueError, TypeError):
+                pass
+            types[column] = 'TEXT'
+    return types
+
+def _invalid_values(values, pg_type):
+    """Boolean mask of non-null string values that will not cast to pg_type"""
+    present = values.notna()
+    pg_type = pg_type.upper()
+    if pg_type in ('BIGINT', 'INTEGER', 'SMALLINT', 'INT', 'INT8', 'INT4', 'INT2'):
+        return present & ~values.str.fullmatch(r'\s*[+-]?\d+\s*').fillna(False)
+    if pg_type in ('DOUBLE PRECISION', 'REAL', 'FLOAT8', 'FLOAT4') or pg_type.startswith('NUMERIC'):
+        return present & pd.to_numeric(values, errors='coerce').isna()
+    if pg_type in ('BOOLEAN', 'BOOL'):
+        return present & ~values.str.strip().str.lower().isin(BOOLEAN_VALUES)
+    if pg_type.startswith(('TIMESTAMP', 'DATE')):
+        return present & pd.to_datetime(values, errors='coerce', format='mixed').isna()
+    # Text and types we cannot check here are left to Postgres
+    return pd.Series(False, index=values.index)
+
 class SqlUtils:
     def __init__(self):
         load_dotenv()
@@ -12,29 +151,373 @@ class SqlUtils:
         self.export_table_csv_path = os.getenv('EXPORT_TABLE_CSV_PATH') or ''
         self.users_table = os.getenv('POSTGRES_USERS_TABLE') or ''
 
-    def create_table_from_csv(self, csv_path=None, table_name=None, drop=False):
-        csv_path = csv_path if csv_path is not None else self.create_table_csv_path
+    def create_table_from_csv(self, csv_path=None, table_name=None, drop=False, mode='replace',
+                              column_types=None, key_columns=None, chunk_rows=IMPORT_CHUNK_ROWS,
+                              reject_path=None):
+        """Load a CSV into a typed table in chunks through COPY FROM STDIN
+
+        mode is append (add rows), upsert (insert or update on key_columns)
+        or replace (load a staging table and swap it in, so readers never
+        see an empty table). Column types come from the existing table,
+        otherwise from column_types and then inference on the first
+        IMPORT_SAMPLE_ROWS rows. Replacing an existing table keeps its
+        columns, defaults, constraints and indexes, and is refused while
+        views, foreign keys or triggers depend on it. Rows whose values
+        do not fit their column type are written to reject_path (default
+        <csv_path>.rejected.csv) instead of failing the load. drop=True
+        is kept for callers of the old signature and means replace.
+        """
+        csv_path = str(csv_path if csv_path is not None else self.create_table_csv_path)
         table_name = table_name if table_name is not None else self.users_table
-        df = pd.read_csv(str(csv_path))
-        columns = ', '.join([f'"{col}" TEXT' for col in df.columns])
-        create_query = f'CREATE TABLE IF NOT EXISTS {table_name} ({columns});'
-        self.pg_util.create_table_query(create_query, drop=drop)
-        # Insert data
-        df.to_sql(table_name, self.pg_util.engine, if_exists='replace', index=False)
+        mode = 'replace' if drop else mode
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"Unsupported import mode: {mode}")
+        if mode == 'upsert' and not key_columns:
+            raise ValueError("upsert mode requires key_columns")
+        reject_path = reject_path or f"{csv_path}.rejected.csv"
+
+        started = time.perf_counter()
+        raw = self.pg_util.engine.raw_connection()
+        try:
+            with raw.cursor() as cur:
+                existing_types = self._table_column_types(cur, table_name)
+                sample = pd.read_csv(csv_path, nrows=IMPORT_SAMPLE_ROWS, **CSV_NA_OPTIONS)
+                types = infer_column_types(sample)
+                types.update(column_types or {})
+                if existing_types:
+                    types.update({c: t for c, t in existing_types.items() if c in types})
+                columns = list(sample.columns)
+
+                if mode == 'append':
+                    self._create_typed_table(cur, table_name, columns, types, key_columns, if_not_exists=True)
+                    target = table_name
+                elif mode == 'upsert':
+                    self._create_typed_table(cur, table_name, columns, types, key_columns, if_not_exists=True)
+                    target = f"{table_name}__import"
+                    cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+                        sql.Identifier(target), sql.Identifier(table_name)
+                    ))
+                else:
+                    target = f"{table_name}__staging"
+                    cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(target)))
+                    if existing_types:
+                        self._check_replaceable(cur, table_name, columns, existing_types)
+                        cur.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING ALL)").format(
+                            sql.Identifier(target), sql.Identifier(table_name)
+                        ))
+                    else:
+                        self._create_typed_table(cur, target, columns, types, key_columns)
+
+                rows, rejected = self._copy_csv_chunks(cur, csv_path, target, columns, types, chunk_rows, reject_path)
+
+                if mode == 'upsert':
+                    self._merge_staging(cur, target, table_name, columns, key_columns)
+                elif mode == 'replace':
+                    self._swap_staging(cur, target, table_name, existing=bool(existing_types))
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+        result = ImportResult(table_name, mode, rows, rejected, time.perf_counter() - started,
+                              reject_path if rejected else None)
+        print(f"✅ {result}")
+        return result
+
+    def _table_column_types(self, cur, table_name):
+        cur.execute("""
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = %s
+            ORDER BY ordinal_position
+        """, (table_name,))
+        return dict(cur.fetchall())
+
+    def _create_typed_table(self, cur, table_name, columns, types, key_columns=None, if_not_exists=False):
+        definitions = [
+            sql.SQL("{} {}").format(sql.Identifier(column), sql.SQL(types[column]))
+            for column in columns
+        ]
+        if key_columns:
+            definitions.append(sql.SQL("PRIMARY KEY ({})").format(
+                sql.SQL(', ').join(map(sql.Identifier, key_columns))
+            ))
+        cur.execute(sql.SQL("CREATE TABLE {}{} ({})").format(
+            sql.SQL("IF NOT EXISTS ") if if_not_exists else sql.SQL(""),
+            sql.Identifier(table_name),
+            sql.SQL(', ').join(definitions)
+        ))
+
+    def _copy_csv_chunks(self, cur, csv_path, target, columns, types, chunk_rows, reject_path):
+        """COPY the CSV into target chunk by chunk; returns (loaded, rejected)"""
+        copy = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.Identifier(target), sql.SQL(', ').join(map(sql.Identifier, columns))
+        )
+        if os.path.exists(reject_path):
+            os.remove(reject_path)
+
+        loaded = rejected = 0
+        started = time.perf_counter()
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, dtype=str, **CSV_NA_OPTIONS):
+            reasons = pd.Series('', index=chunk.index)
+            for column in columns:
+                invalid = _invalid_values(chunk[column], types[column])
+                reasons[invalid] += f"{column}: not {types[column]}; "
+            bad = reasons != ''
+
+            if bad.any():
+                rejects = chunk[bad].assign(_reject_reason=reasons[bad].str.rstrip('; '))
+                rejects.to_csv(reject_path, mode='a', index=False, header=not os.path.exists(reject_path))
+                rejected += int(bad.sum())
+
+            buffer = io.StringIO()
+            chunk[~bad].to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cur.copy_expert(copy, buffer)
+            loaded += int((~bad).sum())
+
+            elapsed = time.perf_counter() - started
+            print(f"⏳ {target}: {loaded} rows loaded, {rejected} rejected ({loaded / elapsed if elapsed else 0:,.0f} rows/s)")
+        return loaded, rejected
+
+    def _merge_staging(self, cur, staging, table_name, columns, key_columns):
+        updates = [column for column in columns if column not in key_columns]
+        column_list = sql.SQL(', ').join(map(sql.Identifier, columns))
+        key_list = sql.SQL(', ').join(map(sql.Identifier, key_columns))
+        action = sql.SQL("DO UPDATE SET {}").format(sql.SQL(', ').join(
+            sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(column)) for column in updates
+        )) if updates else sql.SQL("DO NOTHING")
+        # Later rows in the file win when a key appears more than once
+        cur.execute(sql.SQL("""
+            INSERT INTO {table} ({columns})
+            SELECT DISTINCT ON ({keys}) {columns} FROM {staging}
+            ORDER BY {keys}, ctid DESC
+            ON CONFLICT ({keys}) {action}
+        """).format(
+            table=sql.Identifier(table_name), staging=sql.Identifier(staging),
+            columns=column_list, keys=key_list, action=action
+        ))
+
+    def _check_replaceable(self, cur, table_name, columns, existing_types):
+        """Raise ValueError unless table_name can be swapped for a copy loaded from the CSV
+
+        Views, foreign keys and triggers would be lost with the old table,
+        so they have to be dropped (or the import run as upsert) first.
+        """
+        unknown = [column for column in columns if column not in existing_types]
+        if unknown:
+            raise ValueError(f"Columns not in {table_name}: {', '.join(unknown)}")
+        cur.execute("""
+            SELECT 'view ' || v.oid::regclass::text
+            FROM pg_depend d
+            JOIN pg_rewrite r ON r.oid = d.objid
+            JOIN pg_class v ON v.oid = r.ev_class
+            WHERE d.classid = 'pg_rewrite'::regclass
+              AND d.refobjid = to_regclass(quote_ident(%(table)s))
+              AND v.oid <> d.refobjid
+            UNION
+            SELECT 'foreign key ' || conname || ' on ' || conrelid::regclass::text
+            FROM pg_constraint
+            WHERE contype = 'f'
+              AND to_regclass(quote_ident(%(table)s)) IN (conrelid, confrelid)
+            UNION
+            SELECT 'trigger ' || tgname
+            FROM pg_trigger
+            WHERE tgrelid = to_regclass(quote_ident(%(table)s)) AND NOT tgisinternal
+            ORDER BY 1
+        """, {'table': table_name})
+        dependents = [dependent for (dependent,) in cur.fetchall()]
+        if dependents:
+            raise ValueError(
+                f"Cannot replace {table_name} while other objects depend on it ({', '.join(dependents)}); "
+                "drop them first or import with mode='upsert'"
+            )
+
+    def _index_names(self, cur, table_name):
+        """Index names of a table keyed by their definition without the index and table names"""
+        cur.execute("""
+            SELECT c.relname, i.indisprimary, i.indisunique, substring(pg_get_indexdef(i.indexrelid) FROM ' USING .*$')
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass(quote_ident(%s))
+            ORDER BY c.relname
+        """, (table_name,))
+        names = {}
+        for name, *definition in cur.fetchall():
+            names.setdefault(tuple(definition), []).append(name)
+        return names
+
+    def _swap_staging(self, cur, staging, table_name, existing):
+        """Rename the loaded staging table over the live one in the current transaction
+
+        The staging copy takes over the live table's sequences and index
+        names, so the swap leaves nothing behind that refers to the old
+        table.
+        """
+        if not existing:
+            cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(staging), sql.Identifier(table_name)))
+            return
+
+        # Serial defaults copied by LIKE still use the live table's sequences
+        cur.execute("""
+            SELECT s.oid::regclass::text, a.attname
+            FROM pg_depend d
+            JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+            JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+            WHERE d.classid = 'pg_class'::regclass
+              AND d.refobjid = to_regclass(quote_ident(%s))
+              AND d.deptype = 'a'
+        """, (table_name,))
+        for sequence, column in cur.fetchall():
+            cur.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.{}").format(
+                sql.SQL(sequence), sql.Identifier(staging), sql.Identifier(column)
+            ))
+        index_names = self._index_names(cur, table_name)
+
+        old = f"{table_name}__old"
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(old)))
+        cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(table_name), sql.Identifier(old)))
+        cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(staging), sql.Identifier(table_name)))
+        cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(old)))
+
+        # Renaming an index also renames the constraint it backs
+        for definition, names in self._index_names(cur, table_name).items():
+            for name, original in zip(names, index_names.get(definition, [])):
+                if name != original:
+                    cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                        sql.Identifier(name), sql.Identifier(original)
+                    ))
 
     def export_table_to_csv(self, table_name=None, export_path=None):
+        """Stream a table to CSV with COPY TO STDOUT; memory use does not grow with the table"""
+        table_name = table_name if table_name is not None else self.users_table
+        export_path = export_path if export_path is not None else self.export_table_csv_path
+        return self.export_table(table_name, export_path, fmt='csv')
+
+    def export_table_to_parquet(self, table_name=None, export_path=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Stream a table to Parquet from a server-side cursor, one row group per chunk"""
         table_name = table_name if table_name is not None else self.users_table
         export_path = export_path if export_path is not None else self.export_table_csv_path
-        query = f'SELECT * FROM {table_name}'
-        df = pd.read_sql(query, self.pg_util.engine)
+        return self.export_table(table_name, export_path, fmt='parquet', chunk_rows=chunk_rows)
+
+    def export_table(self, table_name, export_path, fmt='csv', chunk_rows=EXPORT_CHUNK_ROWS):
+        """Export one table to export_path as csv or parquet; returns an ExportResult"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
         export_dir = os.path.dirname(str(export_path))
-        os.makedirs(export_dir, exist_ok=True)
-        df.to_csv(str(export_path), index=False)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+
+        started = time.perf_counter()
+        if fmt == 'csv':
+            rows, bytes_written = self._copy_table_to_csv(table_name, str(export_path))
+        else:
+            rows, bytes_written = self._stream_table_to_parquet(table_name, str(export_path), chunk_rows)
+        return ExportResult(table_name, str(export_path), rows, bytes_written, time.perf_counter() - started)
+
+    def _copy_table_to_csv(self, table_name, export_path):
+        raw = self.pg_util.engine.raw_connection()
+        try:
+            with raw.cursor() as cur, open(export_path, 'wb') as f:
+                out = _CountingWriter(f)
+                copy = sql.SQL("COPY (SELECT * FROM {}) TO STDOUT WITH (FORMAT csv, HEADER)").format(
+                    sql.Identifier(table_name)
+                )
+                cur.copy_expert(copy, out)
+                rows = cur.rowcount
+            raw.commit()
+        finally:
+            raw.close()
+        return rows, out.bytes_written
+
+    def _stream_table_to_parquet(self, table_name, export_path, chunk_rows):
+        # Optional dependency, only needed for Parquet exports
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        raw = self.pg_util.engine.raw_connection()
+        try:
+            with raw.cursor() as cur:
+                cur.execute("""
+                    SELECT column_name, udt_name
+                    FROM information_schema.columns
+                    WHERE table_schema = 'public' AND table_name = %s
+                    ORDER BY ordinal_position
+                """, (table_name,))
+                columns = cur.fetchall()
+            if not columns:
+                raise ValueError(f"Table not found: {table_name}")
+
+            converters = []
+            fields = []
+            for column_name, udt_name in columns:
+                arrow_type, convert = _arrow_column(udt_name)
+                fields.append(pa.field(column_name, arrow_type))
+                converters.append(convert)
+            schema = pa.schema(fields)
+
+            rows = 0
+            # A named cursor keeps the result set on the server
+            with raw.cursor(name=f"export_{table_name}") as cur:
+                cur.itersize = chunk_rows
+                cur.execute(sql.SQL("SELECT * FROM {}").format(sql.Identifier(table_name)))
+                with pq.ParquetWriter(export_path, schema) as writer:
+                    while True:
+                        chunk = cur.fetchmany(chunk_rows)
+                        if not chunk:
+                            break
+                        arrays = []
+                        for i, convert in enumerate(converters):
+                            values = [row[i] for row in chunk]
+                            if convert:
+                                values = [None if v is None else convert(v) for v in values]
+                            arrays.append(pa.array(values, type=schema.field(i).type))
+                        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                        rows += len(chunk)
+            raw.commit()
+        finally:
+            raw.close()
+        return rows, os.path.getsize(export_path)
+
+    def export_tables(self, table_names, export_dir, fmt='csv', workers=EXPORT_WORKERS, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Export several tables in parallel, one pooled connection per worker
+
+        Prints each table's throughput as it finishes and returns the
+        ExportResults in completion order.
+        """
+        results = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                pool.submit(
+                    self.export_table, table_name,
+                    os.path.join(export_dir, f"{table_name}.{fmt}"), fmt, chunk_rows
+                ): table_name
+                for table_name in table_names
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ Export of {futures[future]} failed: {e}")
+                    continue
+                print(f"✅ {result}")
+                results.append(result)
+
+        elapsed = time.perf_counter() - started
+        total_rows = sum(r.rows for r in results)
+        total_bytes = sum(r.bytes_written for r in results)
+        print(
+            f"📦 Exported {len(results)}/{len(futures)} tables, {total_rows} rows, {total_bytes} bytes in {elapsed:.2f}s "
+            f"({total_rows / elapsed if elapsed else 0:,.0f} rows/s, {total_bytes / elapsed / 1024 / 1024 if elapsed else 0:,.2f} MB/s)"
+        )
+        return results
 
-    def export_all_tables_to_csv(self, export_dir=None):
+    def export_all_tables_to_csv(self, export_dir=None, fmt='csv', workers=EXPORT_WORKERS):
         export_dir = export_dir if export_dir is not None else os.path.dirname(self.export_table_csv_path)
         with self.pg_util.engine.connect() as conn:
-            tables = conn.execute(text("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"))
-            for (table_name,) in tables:
-                export_path = os.path.join(export_dir, f"{table_name}.csv")
-                self.export_table_to_csv(table_name=table_name, export_path=export_path) 
\ No newline at end of file
+            tables = conn.execute(text("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND table_type = 'BASE TABLE'"))
+            table_names = [table_name for (table_name,) in tables]
+        return self.export_tables(table_names, export_dir, fmt=fmt, workers=workers)
@@ -0,0 +1,30 @@
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from database import db_connection
+from serialization import dumps_json
+
+# Rows fetched from the server-side cursor per round-trip
+STREAM_CHUNK_SIZE = 500
+
+async def _json_array(batches):
+    yield b"["
+    first = True
+    async for batch in batches:
+        if not batch:
+            continue
+        # Encode the whole batch in one call and splice it in without its brackets
+        items = dumps_json(batch)[1:-1]
+        yield items if first else b"," + items
+        first = False
+    yield b"]"
+
+def stream_json_array(batches) -> StreamingResponse:
+    """Stream an async iterator of item lists as one JSON array"""
+    return StreamingResponse(_json_array(batches), media_type="application/json")
+
+async def stream_rows(query: str, params: dict = None, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Yield lists of rows from a server-side cursor on a dedicated connection"""
+    async with db_connection() as conn:
+        result = await conn.stream(text(query), params or {})
+        async for rows in result.partitions(chunk_size):
+            yield rows
@@ -0,0 +1,35 @@
+import os
+import sys
+import pytest
+
+# Tests always use their own database; TRUNCATEs here must never reach a real one
+TEST_POSTGRES_DB = os.getenv("TEST_POSTGRES_DB", "crm_api_test")
+os.environ["CLOUD_POSTGRES_DB"] = TEST_POSTGRES_DB
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def migrated_database():
+    """The test database at the current schema version; skips when Postgres is unreachable"""
+    import psycopg2
+    from psycopg2 import sql
+    from database import POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT
+
+    try:
+        admin = psycopg2.connect(
+            user=POSTGRES_USER, password=POSTGRES_PASSWORD, host=POSTGRES_HOST,
+            port=POSTGRES_PORT, dbname="postgres", connect_timeout=3
+        )
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres not available: {e}")
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (TEST_POSTGRES_DB,))
+        if not cursor.fetchone():
+            cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(TEST_POSTGRES_DB)))
+    admin.close()
+
+    from migrations import migrate
+    migrate()
+    from database import engine
+    return engine
@@ -0,0 +1,184 @@
+import random
+import string
+import pandas as pd
+import pytest
+from batch_scoring import interaction_bonus, score_frame
+from lead_scoring import calculate_lead_score
+from scoring_config import DEFAULT_WEIGHTS, ScoringConfig
+
+SEEDS = range(20)
+LEADS_PER_SEED = 300
+
+# Includes whitespace only Python's str.split() knows about, and \u200b, which is not whitespace
+ALPHABET = string.ascii_letters + string.digits + "  \t\n\x0b\x1c\x85\xa0\u2028\u3000\u200b\xe9\xfc@."
+
+CORPORATE_DOMAINS = ["acme.co", "example.org", "gmail.com.evil", "mail.gmail.co"]
+
+def reference_scores(leads: pd.DataFrame, counts: pd.DataFrame, config: ScoringConfig) -> list:
+    """calculate_lead_score for each lead, with interactions as fetch_interaction_counts returns them"""
+    interactions_by_email = {}
+    for email, action_type in zip(counts["email"], counts["action_type"]):
+        interactions_by_email.setdefault(email, []).append({"action_type": action_type})
+
+    # Missing values as None, the way score_leads sees them from the driver
+    leads = leads.astype(object).where(leads.notna(), None)
+    scores = []
+    for row in leads.itertuples(index=False):
+        lead_data = {
+            "lead_comments": row.lead_comments,
+            "user_id": row.email,
+            "customer_name": row.customer_name,
+            "created_date": row.created_date
+        }
+        # fetch_interaction_counts never returns counts for an empty email
+        interactions = interactions_by_email.get(row.email) if row.email else None
+        scores.append(calculate_lead_score(lead_data, interactions, config))
+    return scores
+
+def assert_matches_reference(leads: pd.DataFrame, counts: pd.DataFrame, config: ScoringConfig):
+    vectorized = [int(score) for score in score_frame(leads, interaction_bonus(counts, config), config)]
+    reference = reference_scores(leads, counts, config)
+    mismatches = [
+        (leads.iloc[i].to_dict(), vectorized[i], reference[i])
+        for i in range(len(leads)) if vectorized[i] != reference[i]
+    ]
+    assert not mismatches, f"{len(mismatches)} mismatches, first: {mismatches[0]}"
+
+def lead_frame(emails=None, names=None, comments=None, created=None, count=None) -> pd.DataFrame:
+    count = count or len(next(column for column in (emails, names, comments, created) if column is not None))
+    return pd.DataFrame({
+        "email": emails if emails is not None else ["user@acme.co"] * count,
+        "customer_name": names if names is not None else ["Ada Lovelace"] * count,
+        "lead_comments": comments if comments is not None else ["x" * 30] * count,
+        "created_date": created if created is not None else [pd.Timestamp("2024-01-01")] * count
+    })
+
+def no_counts() -> pd.DataFrame:
+    return pd.DataFrame(columns=["email", "action_type"])
+
+def random_config(rng: random.Random) -> ScoringConfig:
+    """A weight set with random points, thresholds, domains and cap"""
+    thresholds = sorted(rng.sample(range(0, 300), rng.randint(0, 5)), reverse=True)
+    return ScoringConfig({
+        "base": rng.randint(0, 40),
+        "message_length": [[longer_than, rng.randint(0, 40)] for longer_than in thresholds],
+        "free_mail_domains": rng.sample(["gmail.com", "Yahoo.com", "hotmail.com", "proton.me", "gmx.de"], rng.randint(0, 4)),
+        "free_mail": rng.randint(0, 20),
+        "business_email": rng.randint(0, 30),
+        "full_name": rng.randint(0, 20),
+        "created_date": rng.randint(0, 10),
+        "actions": {action: rng.randint(0, 40) for action in rng.sample(list(DEFAULT_WEIGHTS["actions"]), 5)},
+        "max_score": rng.choice([50, 100, 150, 1000])
+    })
+
+def random_text(rng: random.Random, max_length: int, boundaries=()) -> str:
+    length = rng.choice([0, 1, *boundaries, rng.randint(0, max_length)])
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+def random_email(rng: random.Random, config: ScoringConfig) -> str:
+    domains = sorted(config.free_mail_domains) + ["GMAIL.COM", "gmail.com ", ""] + CORPORATE_DOMAINS
+    domain = rng.choice(domains)
+    return rng.choice([f"user{rng.randint(0, 50)}@{domain}", f"a@b@{domain}", "no-at-sign", ""])
+
+def random_name(rng: random.Random) -> str:
+    words = [random_text(rng, 8) for _ in range(rng.randint(0, 4))]
+    return rng.choice([" ", "  ", "\t", "\u3000", "\u200b"]).join(words)
+
+def random_leads(rng: random.Random, count: int, config: ScoringConfig):
+    """(leads, counts) frames that hit every scoring boundary"""
+    # Comment lengths on and just past every message_length threshold
+    boundaries = [n for longer_than, _ in config.message_thresholds for n in (longer_than, longer_than + 1)]
+    leads = pd.DataFrame({
+        "email": [rng.choice([None, random_email(rng, config)]) for _ in range(count)],
+        "customer_name": [rng.choice([None, random_name(rng), random_text(rng, 30)]) for _ in range(count)],
+        "lead_comments": [rng.choice([None, random_text(rng, 320, boundaries)]) for _ in range(count)],
+        "created_date": [rng.choice([None, pd.Timestamp("2024-01-01")]) for _ in range(count)]
+    })
+    actions = list(DEFAULT_WEIGHTS["actions"]) + ["unknown_action"]
+    pairs = {
+        (email, action_type)
+        for email in leads["email"].dropna().unique()
+        for action_type in rng.sample(actions, rng.randint(0, len(actions)))
+    }
+    return leads, pd.DataFrame(sorted(pairs), columns=["email", "action_type"])
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_random_leads_and_weights_match_calculate_lead_score(seed):
+    rng = random.Random(seed)
+    config = ScoringConfig({}) if seed == 0 else random_config(rng)
+
+    leads, counts = random_leads(rng, LEADS_PER_SEED, config)
+
+    assert_matches_reference(leads, counts, config)
+
+def test_message_length_boundaries():
+    config = ScoringConfig({})
+    lengths = sorted({0, 1} | {n + d for n, _ in config.message_thresholds for d in (-1, 0, 1, 2) if n + d >= 0})
+    leads = lead_frame(comments=[None] + ["x" * length for length in lengths])
+
+    assert_matches_reference(leads, no_counts(), config)
+    points = score_frame(leads, interaction_bonus(no_counts(), config), config) - score_frame(
+        lead_frame(comments=[None] * len(leads)), interaction_bonus(no_counts(), config), config
+    )
+    assert dict(zip([None] + lengths, points.tolist())) == {
+        length: config.message_score("x" * length if length is not None else None) for length in [None] + lengths
+    }
+
+def test_free_mail_and_corporate_domains():
+    config = ScoringConfig({"free_mail_domains": ["gmail.com", "Yahoo.com"]})
+    emails = [
+        "a@gmail.com", "a@GMAIL.COM", "a@yahoo.com", "a@b@gmail.com",
+        "a@gmail.com ", "a@acme.co", "a@gmail.com.evil", "no-at-sign", "", None
+    ]
+
+    assert_matches_reference(lead_frame(emails=emails), no_counts(), config)
+    scores = score_frame(lead_frame(emails=emails), interaction_bonus(no_counts(), config), config).tolist()
+    free, corporate, missing = scores[0], scores[5], scores[-1]
+    assert scores[:4] == [free] * 4
+    assert scores[4:8] == [corporate] * 4
+    assert scores[8:] == [missing] * 2
+    assert (corporate - free, free - missing) == (config.business_email - config.free_mail, config.free_mail)
+
+def test_one_two_and_three_word_names():
+    config = ScoringConfig({})
+    names = ["Ada", "Ada Lovelace", "Ada King Lovelace", " Ada ", "Ada\tLovelace", "Ada\u3000Lovelace",
+             "Ada\u200bLovelace", "", None]
+
+    assert_matches_reference(lead_frame(names=names), no_counts(), config)
+    scores = score_frame(lead_frame(names=names), interaction_bonus(no_counts(), config), config).tolist()
+    one, two = scores[0], scores[1]
+    assert two - one == config.full_name
+    assert scores == [one, two, two, one, two, two, one, one, one]
+
+@pytest.mark.parametrize("max_score", [100, 60])
+def test_totals_above_max_score_are_capped(max_score):
+    config = ScoringConfig({"max_score": max_score})
+    emails = [f"lead{i}@acme.co" for i in range(4)]
+    leads = lead_frame(emails=emails, comments=["x" * 500] * 4)
+    # Every action for the first two, none for the others
+    counts = pd.DataFrame(
+        [(email, action) for email in emails[:2] for action in config.action_points],
+        columns=["email", "action_type"]
+    )
+
+    assert_matches_reference(leads, counts, config)
+    scores = score_frame(leads, interaction_bonus(counts, config), config).tolist()
+    assert scores[:2] == [max_score, max_score]
+    uncapped = score_frame(leads, interaction_bonus(counts, config), ScoringConfig({"max_score": 10 ** 6})).tolist()
+    assert uncapped[0] > max_score
+    assert scores[2:] == uncapped[2:]
+
+def test_interaction_bonus_counts_each_known_action_once():
+    config = ScoringConfig({})
+    counts = pd.DataFrame(
+        [("a@acme.co", "property_view"), ("a@acme.co", "contact_click"), ("b@acme.co", "unknown_action")],
+        columns=["email", "action_type"]
+    )
+
+    bonus = interaction_bonus(counts, config)
+
+    assert bonus.to_dict() == {
+        "a@acme.co": config.action_points["property_view"] + config.action_points["contact_click"],
+        "b@acme.co": 0
+    }
+    assert interaction_bonus(no_counts(), config).empty
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from bulk_properties import bulk_create
+from models import PropertyCreate
+
+BATCH_SIZE = 300
+CONCURRENT_BATCHES = 4
+
+@pytest.fixture
+def properties(migrated_database):
+    with migrated_database.begin() as conn:
+        conn.execute(text("TRUNCATE properties CASCADE"))
+    return migrated_database
+
+def items(batch, count=BATCH_SIZE):
+    return [
+        PropertyCreate(
+            label=f"batch {batch} item {index}", description=None, address=None, area=None,
+            beds=index % 5, baths=None, price=1000 + index, property_type=None
+        )
+        for index in range(count)
+    ]
+
+def create_concurrently(batches):
+    """Run bulk_create for every batch at once, each on its own connection and transaction"""
+    from database import async_engine
+
+    async def create(batch_items):
+        async with async_engine.connect() as conn:
+            created = await bulk_create(conn, batch_items, created_by=None)
+            await conn.commit()
+            return created
+
+    async def run():
+        try:
+            return await asyncio.gather(*(create(batch_items) for batch_items in batches))
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(run())
+
+def stored_labels(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(text("SELECT property_id, label FROM properties")).fetchall())
+
+def test_each_result_names_the_property_created_from_its_item(properties):
+    batches = [items(batch) for batch in range(CONCURRENT_BATCHES)]
+
+    created = create_concurrently(batches)
+
+    labels = stored_labels(properties)
+    assert len(labels) == BATCH_SIZE * CONCURRENT_BATCHES
+    for batch_items, (results, property_ids) in zip(batches, created):
+        assert [result["index"] for result in results] == list(range(BATCH_SIZE))
+        assert [result["property_id"] for result in results] == property_ids
+        assert [labels[property_id] for property_id in property_ids] == [item.label for item in batch_items]
+
+def test_empty_batch_creates_nothing(properties):
+    assert create_concurrently([[]]) == [([], [])]
+    assert stored_labels(properties) == {}
@@ -0,0 +1,107 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from interaction_queue import InteractionQueue
+
+class RejectedRecord(Exception):
+    """A data error, as the driver reports a NOT NULL violation"""
+    orig = SimpleNamespace(sqlstate="23502")
+
+class DatabaseDown(Exception):
+    orig = SimpleNamespace(sqlstate="08006")
+
+def records(count, start=0):
+    return [{"session_id": f"s{i}", "action_type": "property_view", "email": f"v{i}@example.com"}
+            for i in range(start, start + count)]
+
+def queue_with(flush, spill_path="", **options):
+    options.setdefault("flush_interval", 0.001)
+    queue = InteractionQueue(batch_size=10, spill_path=spill_path, **options)
+    queue._flush = flush
+    return queue
+
+def test_stop_flushes_everything_queued():
+    flushed = []
+
+    async def flush(batch):
+        await asyncio.sleep(0)
+        flushed.append(list(batch))
+
+    async def main():
+        queue = queue_with(flush, flush_interval=60)
+        await queue.start()
+        for record in records(25):
+            assert queue.enqueue(record)
+        await queue.stop()
+        assert not queue.enqueue(records(1)[0])
+
+    asyncio.run(main())
+
+    assert [record for batch in flushed for record in batch] == records(25)
+    assert max(len(batch) for batch in flushed) <= 10
+
+def test_flush_isolating_drops_only_the_rejected_record():
+    written = []
+    bad = records(1, start=7)[0]
+
+    async def flush(batch):
+        if bad in batch:
+            raise RejectedRecord()
+        written.extend(batch)
+
+    queue = queue_with(flush)
+
+    remaining = asyncio.run(queue._flush_isolating(records(20)))
+
+    assert remaining == []
+    assert sorted(written, key=lambda record: int(record["session_id"][1:])) == [r for r in records(20) if r != bad]
+    assert queue.dead_lettered == 1
+
+def test_flush_isolating_returns_the_rest_when_the_database_fails():
+    async def flush(batch):
+        raise DatabaseDown()
+
+    queue = queue_with(flush)
+
+    remaining = asyncio.run(queue._flush_isolating(records(5)))
+
+    assert sorted(remaining, key=lambda record: record["session_id"]) == records(5)
+    assert queue.dead_lettered == 0
+
+def test_failed_final_flush_is_retried_then_spilled_and_requeued(tmp_path):
+    spill_path = str(tmp_path / "spill.jsonl")
+    attempts = []
+
+    async def failing_flush(batch):
+        attempts.append(len(batch))
+        raise DatabaseDown()
+
+    async def shut_down_while_down():
+        queue = queue_with(failing_flush, spill_path, shutdown_retries=2)
+        await queue.start()
+        for record in records(25):
+            queue.enqueue(record)
+        await queue.stop()
+
+    asyncio.run(shut_down_while_down())
+
+    # The first batch: one flush, then a retry (which splits it while isolating) after each of the two backoffs
+    assert attempts.count(10) == 3
+    with open(spill_path) as f:
+        spilled = [json.loads(line) for line in f]
+    assert sorted(spilled, key=lambda record: int(record["session_id"][1:])) == records(25)
+
+    flushed = []
+
+    async def flush(batch):
+        flushed.extend(batch)
+
+    async def restart():
+        queue = queue_with(flush, spill_path)
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(restart())
+
+    assert sorted(flushed, key=lambda record: int(record["session_id"][1:])) == records(25)
+    assert list(tmp_path.iterdir()) == []
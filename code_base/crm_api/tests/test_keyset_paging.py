@@ -0,0 +1,92 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import text
+from migrations import require_listing_timestamps
+from pagination import decode_cursor, next_cursor
+from queries import agent_lead_query, keyset_filter, property_order_by, property_query
+
+PAGE_SIZE = 2
+
+# created_at, updated_at; several rows predate the timestamps and have neither
+TIMESTAMPS = [
+    (None, None), (datetime(2024, 3, 1), datetime(2024, 3, 5)), (None, datetime(2024, 2, 1)),
+    (datetime(2024, 2, 1), None), (None, None), (datetime(2024, 3, 1), None), (None, None)
+]
+
+LISTED_PROPERTIES = "p.label LIKE 'keyset %'"
+
+@pytest.fixture
+def legacy_rows(migrated_database):
+    """Properties and agent leads with NULL timestamps, as written before migration 8; rolled back after"""
+    with migrated_database.connect() as conn:
+        with conn.begin() as transaction:
+            conn.execute(text("""
+                ALTER TABLE properties ALTER COLUMN created_at DROP NOT NULL;
+                ALTER TABLE leads ALTER COLUMN created_at DROP NOT NULL
+            """))
+            agent_id = conn.execute(text("""
+                INSERT INTO users (email, name, role) VALUES ('keyset-agent@example.com', 'Keyset Agent', 'agent')
+                RETURNING user_id
+            """)).scalar()
+            for index, (created_at, updated_at) in enumerate(TIMESTAMPS):
+                conn.execute(text("""
+                    INSERT INTO properties (label, created_at, updated_at) VALUES (:label, :created_at, :updated_at)
+                """), {"label": f"keyset {index}", "created_at": created_at, "updated_at": updated_at})
+                conn.execute(text("""
+                    INSERT INTO leads (name, email, assigned_agent_id, created_at, updated_at)
+                    VALUES (:name, 'lead@example.com', :agent_id, :created_at, :updated_at)
+                """), {"name": f"keyset {index}", "agent_id": agent_id, "created_at": created_at,
+                       "updated_at": updated_at})
+            require_listing_timestamps(conn)
+            yield conn, agent_id
+            transaction.rollback()
+
+def page_ids(conn, query, params, id_column):
+    """Every id a client sees following next_cursor from the first page"""
+    ids, cursor = [], None
+    while True:
+        page_params = dict(params, limit=PAGE_SIZE + 1)
+        if cursor:
+            page_params["cursor_created_at"], page_params["cursor_id"] = decode_cursor(cursor)
+        rows = conn.execute(text(query(cursor is not None)), page_params).fetchall()
+        ids += [getattr(row, id_column) for row in rows[:PAGE_SIZE]]
+        cursor = next_cursor(rows, PAGE_SIZE, id_column)
+        if cursor is None:
+            return ids
+
+def test_properties_without_created_at_are_paged(legacy_rows):
+    conn, _ = legacy_rows
+
+    def query(after_cursor):
+        filters = [LISTED_PROPERTIES] + ([keyset_filter("p.created_at", "p.property_id")] if after_cursor else [])
+        return property_query(filters, property_order_by(), "LIMIT :limit")
+
+    listed = [row.property_id for row in conn.execute(text(property_query([LISTED_PROPERTIES], property_order_by())))]
+    assert len(listed) == len(TIMESTAMPS)
+    assert page_ids(conn, query, {}, "property_id") == listed
+
+def test_agent_leads_without_created_at_are_paged(legacy_rows):
+    conn, agent_id = legacy_rows
+
+    def query(after_cursor):
+        return agent_lead_query(f"AND {keyset_filter('l.created_at', 'l.lead_id')}" if after_cursor else "",
+                                "LIMIT :limit")
+
+    listed = [row.lead_id for row in conn.execute(text(agent_lead_query()), {"agent_id": agent_id})]
+    assert len(listed) == len(TIMESTAMPS)
+    assert page_ids(conn, query, {"agent_id": agent_id}, "lead_id") == listed
+
+def test_backfill_keeps_known_times_and_requires_them(legacy_rows):
+    conn, _ = legacy_rows
+
+    created = conn.execute(text(f"SELECT created_at FROM properties p WHERE {LISTED_PROPERTIES} ORDER BY label"))
+    assert [row.created_at for row in created] == [
+        created_at or updated_at or datetime(1970, 1, 1) for created_at, updated_at in TIMESTAMPS
+    ]
+    nullable = conn.execute(text("""
+        SELECT table_name, column_name FROM information_schema.columns
+        WHERE (table_name, column_name) IN (('properties', 'created_at'), ('lead_info', 'created_date'),
+                                            ('leads', 'created_at'))
+        AND is_nullable = 'YES'
+    """)).fetchall()
+    assert nullable == []
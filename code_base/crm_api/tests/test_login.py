@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+import auth_utils
+from auth_utils import get_or_create_user
+
+CONCURRENT_LOGINS = 20
+
+@pytest.fixture
+def users(migrated_database):
+    """Empty users table, with get_or_create_user back in its first-user mode"""
+    with migrated_database.begin() as conn:
+        conn.execute(text("TRUNCATE users CASCADE"))
+    auth_utils._users_exist = False
+    yield migrated_database
+    auth_utils._users_exist = False
+
+@pytest.fixture
+def admin_signup(users, monkeypatch):
+    """users, with the first user and admin emails allowed to sign up"""
+    monkeypatch.setattr(auth_utils, "ALLOW_ADMIN_SIGNUP", True)
+    return users
+
+def add_user(engine, email, role="agent"):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO users (email, name, role, last_login)
+            VALUES (:email, :email, :role, NOW() - INTERVAL '1 day')
+        """), {"email": email, "role": role})
+
+def user_info(email):
+    return {"email": email, "name": email.split("@")[0], "picture": None}
+
+def login_concurrently(infos):
+    """Log every user in at once, each on its own connection and transaction"""
+    from database import async_engine
+
+    async def login(info):
+        async with async_engine.connect() as conn:
+            user = await get_or_create_user(conn, info)
+            await conn.commit()
+            return user
+
+    async def run():
+        try:
+            return await asyncio.gather(*(login(info) for info in infos))
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(run())
+
+def user_rows(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT user_id, email, role FROM users ORDER BY user_id")).fetchall()
+
+def test_unknown_users_are_not_signed_up_by_default(users, monkeypatch):
+    monkeypatch.setattr(auth_utils, "ADMIN_EMAILS", ["boss@example.com"])
+
+    assert login_concurrently([user_info("first@example.com"), user_info("boss@example.com")]) == [None, None]
+    assert user_rows(users) == []
+
+def test_unlisted_unknown_email_is_refused_once_users_exist(users):
+    add_user(users, "agent@example.com")
+
+    assert login_concurrently([user_info("stranger@example.com")]) == [None]
+    assert [row.email for row in user_rows(users)] == ["agent@example.com"]
+
+def test_concurrent_first_logins_of_one_email_create_one_admin(admin_signup):
+    results = login_concurrently([user_info("first@example.com")] * CONCURRENT_LOGINS)
+
+    rows = user_rows(admin_signup)
+    assert [(row.email, row.role) for row in rows] == [("first@example.com", "admin")]
+    assert {user.user_id for user in results} == {rows[0].user_id}
+
+def test_concurrent_first_logins_of_different_emails_create_only_the_first_user(admin_signup):
+    results = login_concurrently([user_info(f"user{i}@example.com") for i in range(CONCURRENT_LOGINS)])
+
+    rows = user_rows(admin_signup)
+    assert len(rows) == 1 and rows[0].role == "admin"
+    assert [user.email for user in results if user] == [rows[0].email]
+
+def test_concurrent_admin_email_signups_create_one_user(admin_signup, monkeypatch):
+    login_concurrently([user_info("first@example.com")])
+    monkeypatch.setattr(auth_utils, "ADMIN_EMAILS", ["boss@example.com"])
+    assert auth_utils._users_exist
+
+    results = login_concurrently([user_info("boss@example.com")] * CONCURRENT_LOGINS)
+
+    boss = [row for row in user_rows(admin_signup) if row.email == "boss@example.com"]
+    assert len(boss) == 1 and boss[0].role == "admin"
+    assert {user.user_id for user in results} == {boss[0].user_id}
+
+@pytest.mark.parametrize("allow_admin_signup", [False, True])
+def test_existing_user_login_refreshes_last_login(users, monkeypatch, allow_admin_signup):
+    monkeypatch.setattr(auth_utils, "ALLOW_ADMIN_SIGNUP", allow_admin_signup)
+    add_user(users, "agent@example.com")
+
+    [user] = login_concurrently([user_info("agent@example.com")])
+
+    assert (user.email, user.role) == ("agent@example.com", "agent")
+    with users.connect() as conn:
+        age = conn.execute(text("SELECT NOW() - last_login FROM users WHERE email = 'agent@example.com'")).scalar()
+    assert age.total_seconds() < 60
+
+def test_unlisted_email_is_not_signed_up_once_users_exist_even_with_admin_signup(admin_signup):
+    login_concurrently([user_info("first@example.com")])
+
+    assert login_concurrently([user_info("stranger@example.com")]) == [None]
+    assert [row.email for row in user_rows(admin_signup)] == ["first@example.com"]
@@ -0,0 +1,229 @@
+import json
+import functools
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+import auth_utils
+import jwks
+from http_client import close_http_client
+
+GOOGLE_CLIENT_ID = "google-client"
+MICROSOFT_CLIENT_ID = "microsoft-client"
+TENANT_ID = "tenant-1"
+MICROSOFT_ISSUER = f"https://login.microsoftonline.com/{TENANT_ID}/v2.0"
+
+@functools.lru_cache(maxsize=None)
+def signing_key(kid, variant=""):
+    """(private PEM, public JWK) for an RS256 key, generated once per test run"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public = jwk.construct(key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ), "RS256").to_dict()
+    public.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return private, public
+
+class StubProvider:
+    """Local JWKS and Graph /me endpoints"""
+
+    def __init__(self):
+        self.keys = {}
+        self.graph_user = {"mail": "graph@example.com", "displayName": "Graph User"}
+        self.graph_status = 200
+        self.requests = []
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                provider.requests.append((self.path, self.headers.get("Authorization")))
+                if self.path == "/keys":
+                    status, body = 200, {"keys": [public for _, public in provider.keys.values()]}
+                elif self.path == "/me":
+                    status, body = provider.graph_status, provider.graph_user
+                else:
+                    status, body = 404, {}
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+    def add_key(self, kid):
+        self.keys[kid] = signing_key(kid)
+
+    def token(self, kid, private_key=None, **claims):
+        now = int(time.time())
+        claims = {"iat": now, "exp": now + 300, **claims}
+        return jwt.encode(claims, private_key or self.keys[kid][0], algorithm="RS256", headers={"kid": kid})
+
+    def paths(self, path):
+        return [request for request in self.requests if request[0] == path]
+
+@pytest.fixture
+def provider(monkeypatch):
+    stub = StubProvider()
+    stub.add_key("key-1")
+    monkeypatch.setattr(auth_utils, "GOOGLE_CLIENT_ID", GOOGLE_CLIENT_ID)
+    monkeypatch.setattr(auth_utils, "MICROSOFT_CLIENT_ID", MICROSOFT_CLIENT_ID)
+    monkeypatch.setattr(auth_utils, "MICROSOFT_TENANT_ID", "common")
+    monkeypatch.setattr(auth_utils, "MICROSOFT_GRAPH_ME_URL", stub.url + "/me")
+    # Fresh caches, so every test starts without keys
+    monkeypatch.setattr(auth_utils, "google_jwks", jwks.JWKSCache(stub.url + "/keys"))
+    monkeypatch.setattr(auth_utils, "microsoft_jwks", jwks.JWKSCache(stub.url + "/keys"))
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+def run(coro):
+    """Run a verification on a fresh loop, closing the shared HTTP client it opened"""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close_http_client()
+    return asyncio.run(main())
+
+def google_token(provider, kid="key-1", **claims):
+    claims = {
+        "aud": GOOGLE_CLIENT_ID, "iss": "https://accounts.google.com", "email": "user@example.com",
+        "email_verified": True, "name": "User", **claims
+    }
+    return provider.token(kid, **claims)
+
+def microsoft_token(provider, kid="key-1", **claims):
+    claims = {
+        "aud": MICROSOFT_CLIENT_ID, "iss": MICROSOFT_ISSUER, "tid": TENANT_ID,
+        "preferred_username": "user@example.com", "name": "User", **claims
+    }
+    return provider.token(kid, **{key: value for key, value in claims.items() if value is not None})
+
+def assert_rejected(coro, status_code=401):
+    with pytest.raises(HTTPException) as error:
+        run(coro)
+    assert error.value.status_code == status_code
+
+# Google
+
+def test_google_valid_token(provider):
+    user = run(auth_utils.verify_google_token(google_token(provider)))
+
+    assert user == {"email": "user@example.com", "name": "User", "picture": None, "email_verified": True}
+    assert len(provider.paths("/keys")) == 1
+
+def test_google_keys_are_cached(provider):
+    run(auth_utils.verify_google_token(google_token(provider)))
+    run(auth_utils.verify_google_token(google_token(provider)))
+
+    assert len(provider.paths("/keys")) == 1
+
+def test_google_bad_signature(provider):
+    forged_key, _ = signing_key("key-1", "forged")
+
+    assert_rejected(auth_utils.verify_google_token(google_token(provider, private_key=forged_key)))
+
+@pytest.mark.parametrize("claims", [
+    {"aud": "someone-else"},
+    {"iss": "https://evil.example.com"},
+])
+def test_google_wrong_audience_or_issuer(provider, claims):
+    assert_rejected(auth_utils.verify_google_token(google_token(provider, **claims)))
+
+def test_google_expired_token(provider):
+    expired = int(time.time()) - 600
+
+    assert_rejected(auth_utils.verify_google_token(google_token(provider, iat=expired - 300, exp=expired)))
+
+def test_google_unknown_kid_refetches_keys(provider, monkeypatch):
+    monkeypatch.setattr(jwks, "JWKS_MIN_REFETCH_INTERVAL", 0)
+    run(auth_utils.verify_google_token(google_token(provider)))
+    # The provider rotates to a key the cache has not seen
+    provider.add_key("key-2")
+
+    user = run(auth_utils.verify_google_token(google_token(provider, kid="key-2")))
+
+    assert user["email"] == "user@example.com"
+    assert len(provider.paths("/keys")) == 2
+
+def test_google_unknown_kid_refetches_at_most_once_per_interval(provider):
+    run(auth_utils.verify_google_token(google_token(provider)))
+    provider.add_key("key-2")
+
+    assert_rejected(auth_utils.verify_google_token(google_token(provider, kid="key-2")))
+    assert len(provider.paths("/keys")) == 1
+
+def test_google_key_endpoint_down(provider):
+    provider.server.shutdown()
+    provider.server.server_close()
+
+    assert_rejected(auth_utils.verify_google_token(google_token(provider)), 503)
+
+# Microsoft
+
+def test_microsoft_valid_token(provider):
+    user = run(auth_utils.verify_microsoft_token("access-token", microsoft_token(provider)))
+
+    assert (user["email"], user["name"]) == ("user@example.com", "User")
+    assert provider.paths("/me") == []
+
+def test_microsoft_bad_signature(provider):
+    forged_key, _ = signing_key("key-1", "forged")
+
+    assert_rejected(auth_utils.verify_microsoft_token("access-token", microsoft_token(provider, private_key=forged_key)))
+
+@pytest.mark.parametrize("claims", [
+    {"aud": "someone-else"},
+    {"iss": "https://login.microsoftonline.com/tenant-2/v2.0"},
+])
+def test_microsoft_wrong_audience_or_issuer(provider, claims):
+    assert_rejected(auth_utils.verify_microsoft_token("access-token", microsoft_token(provider, **claims)))
+
+def test_microsoft_wrong_tenant(provider, monkeypatch):
+    monkeypatch.setattr(auth_utils, "MICROSOFT_TENANT_ID", "tenant-2")
+
+    assert_rejected(auth_utils.verify_microsoft_token("access-token", microsoft_token(provider)))
+
+def test_microsoft_expired_token(provider):
+    expired = int(time.time()) - 600
+
+    assert_rejected(auth_utils.verify_microsoft_token(
+        "access-token", microsoft_token(provider, iat=expired - 300, exp=expired)
+    ))
+
+def test_microsoft_unknown_kid_refetches_keys(provider, monkeypatch):
+    monkeypatch.setattr(jwks, "JWKS_MIN_REFETCH_INTERVAL", 0)
+    run(auth_utils.verify_microsoft_token("access-token", microsoft_token(provider)))
+    provider.add_key("key-2")
+
+    user = run(auth_utils.verify_microsoft_token("access-token", microsoft_token(provider, kid="key-2")))
+
+    assert user["email"] == "user@example.com"
+    assert len(provider.paths("/keys")) == 2
+
+def test_microsoft_graph_fallback_without_email_claim(provider):
+    token = microsoft_token(provider, preferred_username=None)
+
+    user = run(auth_utils.verify_microsoft_token("access-token", token))
+
+    assert (user["email"], user["name"]) == ("graph@example.com", "Graph User")
+    assert provider.paths("/me") == [("/me", "Bearer access-token")]
+
+def test_microsoft_graph_error(provider):
+    provider.graph_status = 401
+
+    assert_rejected(auth_utils.verify_microsoft_token("access-token", microsoft_token(provider, preferred_username=None)))
@@ -0,0 +1,184 @@
+import asyncio
+import pytest
+from starlette.requests import Request
+from cache import MemoryCache, RedisCache, ResponseCache
+
+TTL = 60
+
+class Clock:
+    """Stands in for time.monotonic, advanced by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+class StubRedis:
+    """In-memory stand-in for the redis.asyncio calls RedisCache makes, expiring keys like SET ... EX"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.values = {}
+
+    async def get(self, name):
+        value, expires_at = self.values.get(name, (None, None))
+        if expires_at is not None and expires_at <= self.clock.monotonic():
+            del self.values[name]
+            return None
+        return value
+
+    async def set(self, name, value, ex=None):
+        self.values[name] = (value, self.clock.monotonic() + ex if ex else None)
+
+    async def delete(self, *names):
+        for name in names:
+            self.values.pop(name, None)
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("cache.time", clock)
+    return clock
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, clock):
+    if request.param == "memory":
+        return MemoryCache(ttl=TTL)
+    return RedisCache(StubRedis(clock), ttl=TTL)
+
+def request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def run(coro):
+    return asyncio.run(coro)
+
+def counting_load(loads, value):
+    async def load():
+        loads.append(1)
+        return value
+    return load
+
+def test_miss_is_loaded_and_stored(backend):
+    cache = ResponseCache(backend)
+    loads = []
+    load = counting_load(loads, {"value": 1})
+
+    async def main():
+        first = await cache.respond(request(), "key", load)
+        second = await cache.respond(request(), "key", load)
+        return first, second
+
+    first, second = run(main())
+
+    assert first.body == second.body == b'{"value":1}'
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert len(loads) == 1
+
+def test_matching_etag_is_answered_with_not_modified(backend):
+    cache = ResponseCache(backend)
+    load = counting_load([], {"value": 1})
+
+    async def main():
+        etag = (await cache.respond(request(), "key", load)).headers["ETag"]
+        return (
+            etag,
+            await cache.respond(request(etag), "key", load),
+            await cache.respond(request(f'"other", W/{etag}'), "key", load),
+            await cache.respond(request('"other"'), "key", load)
+        )
+
+    etag, matched, weak_in_list, other = run(main())
+
+    assert (matched.status_code, matched.body, matched.headers["ETag"]) == (304, b"", etag)
+    assert weak_in_list.status_code == 304
+    assert (other.status_code, other.body) == (200, b'{"value":1}')
+
+def test_entries_expire_after_the_ttl(backend, clock):
+    cache = ResponseCache(backend)
+    loads = []
+    load = counting_load(loads, {"value": 1})
+
+    async def respond_at(seconds):
+        clock.now += seconds
+        return await cache.respond(request(), "key", load)
+
+    run(respond_at(0))
+    run(respond_at(TTL - 1))
+    assert len(loads) == 1
+    run(respond_at(1))
+    assert len(loads) == 2
+
+def test_invalidate_drops_the_entry(backend):
+    cache = ResponseCache(backend)
+    data = {"value": "old"}
+
+    async def main():
+        stale = await cache.respond(request(), "key", lambda: asyncio.sleep(0, dict(data)))
+        data["value"] = "new"
+        await cache.invalidate("key", "other")
+        fresh = await cache.respond(request(), "key", lambda: asyncio.sleep(0, dict(data)))
+        return stale, fresh
+
+    stale, fresh = run(main())
+
+    assert stale.body == b'{"value":"old"}'
+    assert fresh.body == b'{"value":"new"}'
+    assert stale.headers["ETag"] != fresh.headers["ETag"]
+
+def test_load_overlapping_invalidation_is_not_stored(backend):
+    cache = ResponseCache(backend)
+    data = {"value": "old"}
+    read, written = asyncio.Event(), asyncio.Event()
+
+    async def slow_load():
+        # Reads the row, then loses the race with a write and its invalidation
+        snapshot = dict(data)
+        read.set()
+        await written.wait()
+        return snapshot
+
+    async def write():
+        await read.wait()
+        data["value"] = "new"
+        await cache.invalidate("key")
+        written.set()
+
+    async def main():
+        stale, _ = await asyncio.gather(cache.respond(request(), "key", slow_load), write())
+        fresh = await cache.respond(request(), "key", lambda: asyncio.sleep(0, dict(data)))
+        return stale, fresh
+
+    stale, fresh = run(main())
+
+    assert stale.body == b'{"value":"old"}'
+    assert fresh.body == b'{"value":"new"}'
+    assert cache._loading == {}
+
+def test_failed_load_is_not_stored(backend):
+    cache = ResponseCache(backend)
+
+    async def failing_load():
+        raise LookupError
+
+    async def main():
+        try:
+            await cache.respond(request(), "key", failing_load)
+        except LookupError:
+            pass
+        return await cache.backend.get("key")
+
+    assert run(main()) is None
+    assert cache._loading == {}
+
+def test_redis_entries_are_prefixed_and_expire_with_the_ttl(clock):
+    client = StubRedis(clock)
+    cache = ResponseCache(RedisCache(client, ttl=TTL))
+
+    run(cache.respond(request(), "property:1", counting_load([], {"value": 1})))
+
+    [(name, (value, expires_at))] = client.values.items()
+    assert name == "crm:cache:property:1"
+    assert value.endswith(b'\n{"value":1}')
+    assert expires_at == clock.now + TTL